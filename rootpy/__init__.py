@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 import sys
+import time
+from contextlib import contextmanager
 
 IN_NOSETESTS = False
 if sys.argv and sys.argv[0].endswith('nosetests'):  # pragma: no cover
@@ -38,6 +40,8 @@ __all__ = [
     'ROOT_VERSION',
     'QROOT',
     'asrootpy',
+    'asrootpy_many',
+    'profile_asrootpy',
     'lookup',
     'lookup_by_name',
     'lookup_rootpy',
@@ -162,6 +166,13 @@ INIT_REGISTRY = {
     'TH3F': ('plotting.hist.Hist3D', dict(type='F')),
     'TH3D': ('plotting.hist.Hist3D', dict(type='D')),
 
+    'THnSparseT<TArrayC>': ('plotting.hist.HistSparse', dict(type='C')),
+    'THnSparseT<TArrayS>': ('plotting.hist.HistSparse', dict(type='S')),
+    'THnSparseT<TArrayI>': ('plotting.hist.HistSparse', dict(type='I')),
+    'THnSparseT<TArrayL>': ('plotting.hist.HistSparse', dict(type='L')),
+    'THnSparseT<TArrayF>': ('plotting.hist.HistSparse', dict(type='F')),
+    'THnSparseT<TArrayD>': ('plotting.hist.HistSparse', dict(type='D')),
+
     'TEfficiency': 'plotting.hist.Efficiency',
 
     'THStack': 'plotting.hist.HistStack',
@@ -223,6 +234,40 @@ REGISTRY = {}
 REGISTRY_ROOTPY = {}
 
 
+# ROOT class -> (rootpy class, has _post_init, has _clone_post_init) or None
+# if there is no rootpy implementation. Cleared by register().
+_CONVERTERS = {}
+# ROOT class name -> [number of conversions, seconds] while profiling
+_PROFILE = None
+
+
+def _converter(thing_cls):
+    try:
+        return _CONVERTERS[thing_cls]
+    except KeyError:
+        pass
+    rootpy_cls = lookup(thing_cls)
+    if rootpy_cls is None:
+        converter = None
+    else:
+        converter = (rootpy_cls,
+                     hasattr(rootpy_cls, '_post_init'),
+                     hasattr(rootpy_cls, '_clone_post_init'))
+    _CONVERTERS[thing_cls] = converter
+    return converter
+
+
+def _convert(thing, converter, kwargs):
+    rootpy_cls, post_init, clone_post_init = converter
+    # cast
+    thing.__class__ = rootpy_cls
+    if post_init:
+        if clone_post_init and 'obj' not in kwargs:
+            kwargs = dict(kwargs, obj=thing)
+        thing._post_init(**kwargs)
+    return thing
+
+
 def asrootpy(thing, **kwargs):
     # is this thing already converted?
     if isinstance(thing, Object):
@@ -252,23 +297,110 @@ def asrootpy(thing, **kwargs):
         return result
 
     thing_cls = thing.__class__
-    rootpy_cls = lookup(thing_cls)
-    if rootpy_cls is None:
+    if _PROFILE is not None:
+        start = time.time()
+    converter = _converter(thing_cls)
+    if converter is None:
         if warn:
             log.warn(
                 "A subclass of `{0}` is not "
                 "implemented in rootpy".format(
                     thing_cls.__name__))
         return thing
+    thing = _convert(thing, converter, kwargs)
+    if _PROFILE is not None:
+        _profile(thing_cls.__name__, 1, time.time() - start)
+    return thing
 
-    # cast
-    thing.__class__ = rootpy_cls
-    if hasattr(rootpy_cls, '_post_init'):
-        if hasattr(rootpy_cls, '_clone_post_init'):
-            kwargs.setdefault('obj', thing)
-        thing._post_init(**kwargs)
 
-    return thing
+def asrootpy_many(things, **kwargs):
+    """
+    Convert many ROOT objects into their rootpy form. This is equivalent to
+    ``[asrootpy(thing, **kwargs) for thing in things]`` but faster when
+    converting a large number of objects.
+
+    Parameters
+    ----------
+
+    things : iterable
+        The ROOT objects.
+
+    kwargs : additional keyword arguments, optional
+        Passed to :func:`asrootpy` for each object.
+
+    Returns
+    -------
+
+    converted : list
+        The converted objects in the same order.
+
+    """
+    warn = kwargs.pop('warn', False)
+    after_init = kwargs.pop('after_init', False)
+    profile = _PROFILE is not None
+    converted = []
+    append = converted.append
+    # local cache avoids even the global table lookup for runs of objects of
+    # the same class, which is the common case when reading from files
+    last_cls, converter = None, None
+    for thing in things:
+        if isinstance(thing, Object):
+            append(thing)
+            continue
+        if isinstance(thing, QROOT.PyRootType):
+            append(asrootpy(thing, warn=warn, after_init=after_init))
+            continue
+        thing_cls = thing.__class__
+        if profile:
+            start = time.time()
+        if thing_cls is not last_cls:
+            last_cls, converter = thing_cls, _converter(thing_cls)
+        if converter is None:
+            if warn:
+                log.warn(
+                    "A subclass of `{0}` is not "
+                    "implemented in rootpy".format(
+                        thing_cls.__name__))
+            append(thing)
+            continue
+        append(_convert(thing, converter, kwargs))
+        if profile:
+            _profile(thing_cls.__name__, 1, time.time() - start)
+    return converted
+
+
+def _profile(cls_name, count, seconds):
+    stats = _PROFILE.get(cls_name)
+    if stats is None:
+        _PROFILE[cls_name] = [count, seconds]
+    else:
+        stats[0] += count
+        stats[1] += seconds
+
+
+@contextmanager
+def profile_asrootpy():
+    """
+    Measure the time spent converting objects with :func:`asrootpy` and
+    :func:`asrootpy_many` within this context::
+
+        with profile_asrootpy() as stats:
+            hists = [f.Get(name) for name in names]
+        # stats maps ROOT class names to [number of conversions, seconds]
+
+    """
+    global _PROFILE
+    outer = _PROFILE
+    _PROFILE = {}
+    try:
+        yield _PROFILE
+    finally:
+        stats = _PROFILE
+        _PROFILE = outer
+        if outer is not None:
+            # nested contexts also count towards the enclosing context
+            for cls_name, (count, seconds) in stats.items():
+                _profile(cls_name, count, seconds)
 
 
 def _get_class(path, name):
@@ -345,6 +477,7 @@ class register(object):
                     "duplicate registration of "
                     "class `{0}`".format(name))
             REGISTRY[name] = cls
+        _CONVERTERS.clear()
         return cls
 
 
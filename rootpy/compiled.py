@@ -38,6 +38,18 @@ Now automatically compile and load that file or C++ code in a string with:
    >>> C._rootpy_test()
    'Hello, world'
 
+Registered code is only compiled when one of its symbols is first used. All
+registered code can be compiled ahead of time (e.g. when setting up an
+environment for batch jobs) in parallel with:
+
+.. sourcecode:: python
+
+   >>> import rootpy.compiled as C
+   >>> C.build_all(workers=4)
+
+The cached libraries are keyed by the code, the compiler and the versions of
+ROOT and Python, so a library is never reused after any of those changed.
+
 """
 from __future__ import absolute_import
 
@@ -80,12 +92,71 @@ def initialize():
     ROOT.gSystem.SetDynamicPath(path)
 
 
+# rootpy modules that register code
+BUILTIN_MODULES = [
+    'rootpy.stl',
+    'rootpy.memory.ownership',
+    'rootpy.memory.deletion',
+    'rootpy.interactive.canvas_events',
+    'rootpy.tree.tree',
+    'rootpy.tree.entrylist',
+]
+
+
 class Namespace(object):
     """
     Represents a sub-namespace
     """
 
 
+def build_key(source):
+    """
+    Return the key identifying a library compiled from ``source`` with the
+    current compiler, compiler flags and versions of ROOT and Python.
+
+    The include path is not part of the key since it depends on which rootpy
+    modules were imported (e.g. :mod:`rootpy.memory.deletion` adds the
+    path of Python.h) and libraries built by :func:`build_all` must be found
+    by any later process.
+    """
+    digest = hashlib.sha1(source)
+    for item in (ROOT.gROOT.GetVersion(),
+                 str(ROOT.gROOT.GetVersionCode()),
+                 ROOT.gSystem.GetMakeSharedLib(),
+                 ROOT.gSystem.GetFlagsOpt(),
+                 "{0}.{1}".format(*sys.version_info[:2])):
+        digest.update(item.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _compile(filename, name, include_path):
+    """
+    Compile ``filename`` into the library ``name`` in :const:`MODULES_PATH`
+    unless another process already did so while we were waiting for the lock
+    on this library. Returns True if the library was compiled here.
+    """
+    path = pjoin(MODULES_PATH, name + "." + ROOT.gSystem.GetSoExt())
+    # Only processes compiling the same library wait for each other
+    with lock(pjoin(MODULES_PATH, name + ".lock"),
+              poll_interval=5, max_age=60):
+        if exists(path):
+            return False
+        if include_path is not None:
+            ROOT.gSystem.SetIncludePath(include_path)
+        log.info("Compiling {0}".format(path))
+        if ROOT.gSystem.CompileMacro(filename, 'k-', name, MODULES_PATH) != 1:
+            raise RuntimeError("failed to compile {0}".format(filename))
+    return True
+
+
+def _build_worker(args):
+    # never let an exception escape the worker
+    try:
+        return _compile(*args), None
+    except Exception as e:
+        return False, "{0}: {1}".format(args[0], e)
+
+
 class FileCode(object):
 
     def __init__(self, filename, callermodule):
@@ -93,30 +164,48 @@ class FileCode(object):
         self.module = callermodule
         self.name = self.module + "." + basename(self.filename)
         self.loaded = False
+        self._libname = None
 
     @property
     def mtime(self):
         return mtime(self.filename)
 
+    @property
+    def source(self):
+        with open(self.filename, 'rb') as fd:
+            return fd.read()
+
+    @property
+    def libname(self):
+        """
+        The name of the library, keyed by the content of the code, the
+        compiler and the version of ROOT so that a stale library is never
+        loaded. The source is only read and hashed once.
+        """
+        if self._libname is None:
+            self._libname = "{0}.{1}".format(
+                self.name, build_key(self.source))
+        return self._libname
+
     @property
     def compiled_path(self):
         ext = "." + ROOT.gSystem.GetSoExt()
-        return pjoin(MODULES_PATH, self.name + ext)
+        return pjoin(MODULES_PATH, self.libname + ext)
 
     @property
     def compiled(self):
-        return (exists(self.compiled_path) and
-                mtime(self.compiled_path) > self.mtime)
+        return exists(self.compiled_path)
+
+    def build_args(self):
+        return self.filename, self.libname, ROOT.gSystem.GetIncludePath()
 
     def load(self):
-        if not self.compiled:
-            log.info("Compiling {0}".format(self.compiled_path))
-            with lock(pjoin(MODULES_PATH, "lock"), poll_interval=5, max_age=60):
-                ROOT.gSystem.CompileMacro(self.filename, 'k-',
-                                          self.name, MODULES_PATH)
-        else:
-            log.debug("Loading existing {0}".format(self.compiled_path))
-            ROOT.gInterpreter.Load(self.compiled_path)
+        compiled_path = self.compiled_path
+        if exists(compiled_path) or not _compile(*self.build_args()):
+            log.debug("Loading existing {0}".format(compiled_path))
+            if ROOT.gInterpreter.Load(compiled_path) not in (0, 1):
+                raise RuntimeError(
+                    "failed to load {0}".format(compiled_path))
         self.loaded = True
 
     def get(self, name):
@@ -125,12 +214,42 @@ class FileCode(object):
         return getattr(ROOT, name)
 
 
+class StringCode(FileCode):
+    """
+    C++ code registered as a string. The code is only written into
+    :const:`MODULES_PATH` when it is needed.
+    """
+    def __init__(self, code, filename, callermodule):
+        super(StringCode, self).__init__(filename, callermodule)
+        self.code = code
+
+    @property
+    def source(self):
+        if sys.version_info[0] >= 3:
+            return self.code.encode('utf-8')
+        return self.code
+
+    def write(self):
+        if not exists(self.filename):
+            # Only write it if it doesn't exist
+            # (1/4billion chance of collision)
+            with open(self.filename, "w") as fd:
+                fd.write(self.code)
+
+    def build_args(self):
+        self.write()
+        return super(StringCode, self).build_args()
+
+
 @Facade(__name__, expose_internal=False)
 class Compiled(object):
 
     registered_code = {}
     debug = False
     optimize = True
+    # the module is replaced by this facade so the worker function must be
+    # reachable from here to be picklable
+    _build_worker = staticmethod(_build_worker)
 
     def caller_location(self, depth=0):
         caller = sys._getframe(depth+2)
@@ -171,6 +290,7 @@ class Compiled(object):
         If you don't do that, you're better off writing to a temporary
         file and calling `register_file`
         """
+        code = textwrap.dedent(code)
         if sys.version_info[0] >= 3:
             filename = hashlib.sha1(code.encode('utf-8')).hexdigest()[:8] + ".cxx"
         else:
@@ -180,13 +300,8 @@ class Compiled(object):
         _, caller_modulename, lineno = self.caller_location()
 
         #code += "#line {0} {1}".format(caller_modulename, lineno)
-        if not exists(filepath):
-            # Only write it if it doesn't exist
-            # (1/4billion chance of collision)
-            with open(filepath, "w") as fd:
-                fd.write(textwrap.dedent(code))
-
-        code = FileCode(filepath, caller_modulename)
+        # the file is only written when the code is compiled
+        code = StringCode(code, filepath, caller_modulename)
         self.register(code, symbols)
 
     def register(self, code, symbols):
@@ -213,6 +328,57 @@ class Compiled(object):
         code = FileCode(absfile, caller_modulename)
         self.register(code, symbols)
 
+    def build_all(self, workers=None, modules=BUILTIN_MODULES):
+        """Compile all registered code that is not already compiled
+
+        The libraries are compiled in parallel and cached so that later
+        processes (e.g. batch jobs sharing the same home directory) only load
+        them. Nothing is loaded into the current process.
+
+        Parameters
+        ----------
+        workers : int, optional (default=None)
+            The number of compiler processes. If None then use as many
+            processes as there are CPUs.
+        modules : list of str, optional
+            Modules that are imported first so that their code is
+            registered. By default all rootpy modules that register code.
+
+        Returns
+        -------
+        compiled : list
+            The names of the libraries that were compiled.
+        """
+        import importlib
+        import multiprocessing
+        for module in modules:
+            importlib.import_module(module)
+        # the same code may be registered for many symbols
+        codes = dict((id(code), code)
+                     for code in self.registered_code.values())
+        pending = [code.build_args() for code in codes.values()
+                   if not code.loaded and not code.compiled]
+        if not pending:
+            return []
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = min(workers, len(pending))
+        if workers <= 1:
+            results = [_build_worker(args) for args in pending]
+        else:
+            pool = multiprocessing.Pool(workers)
+            try:
+                results = pool.map(_build_worker, pending)
+            finally:
+                pool.close()
+                pool.join()
+        errors = [error for _, error in results if error is not None]
+        if errors:
+            raise RuntimeError(
+                "failed to compile:\n{0}".format('\n'.join(errors)))
+        return [args[1] for args, (built, _) in zip(pending, results)
+                if built]
+
     @computed_once_classproperty
     def python_include_path(self):
         """
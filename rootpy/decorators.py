@@ -16,12 +16,14 @@ __all__ = [
     'chainable',
     'camel_to_snake',
     'snake_case_methods',
+    'resolve_snake_case_methods',
     'sync',
     'cached_property',
 ]
 
 
 CONVERT_SNAKE_CASE = os.getenv('NO_ROOTPY_SNAKE_CASE', False) is False
+LAZY_SNAKE_CASE = os.getenv('ROOTPY_LAZY_SNAKE_CASE', False) is not False
 
 
 def requires_ROOT(version, exception=False):
@@ -128,14 +130,11 @@ def camel_to_snake(name):
     return ALL_CAP_RE.sub(r'\1_\2', s1).lower()
 
 
-def snake_case_methods(cls, debug=False):
+def _snake_case_aliases(cls):
     """
-    A class decorator adding snake_case methods
-    that alias capitalized ROOT methods. cls must subclass
-    a ROOT class and define the _ROOT class variable.
+    Return a dict mapping the snake_case names to the capitalized methods of
+    the ROOT base class of ``cls`` that they alias.
     """
-    if not CONVERT_SNAKE_CASE:
-        return cls
     # get the ROOT base class
     root_base = cls._ROOT
     members = inspect.getmembers(root_base)
@@ -149,6 +148,7 @@ def snake_case_methods(cls, debug=False):
         else:
             names[lower_name] = None
 
+    aliases = {}
     for name, member in members:
         if name.lower() not in names:
             continue
@@ -180,7 +180,55 @@ def snake_case_methods(cls, debug=False):
             value = getattr(cls, name)
         if skip:
             continue
+        aliases[new_name] = value
+    return aliases
+
+
+def resolve_snake_case_methods(cls):
+    """
+    Add the snake_case aliases to a class decorated with
+    :func:`snake_case_methods` now instead of on first use.
+    """
+    if '_snake_case_resolved' in cls.__dict__:
+        return cls
+    for new_name, value in _snake_case_aliases(cls).items():
         setattr(cls, new_name, value)
+    cls._snake_case_resolved = True
+    return cls
+
+
+def snake_case_methods(cls, debug=False, lazy=None):
+    """
+    A class decorator adding snake_case methods
+    that alias capitalized ROOT methods. cls must subclass
+    a ROOT class and define the _ROOT class variable.
+
+    Inspecting the ROOT class is expensive. With ``lazy=True`` (or the
+    environment variable ``ROOTPY_LAZY_SNAKE_CASE`` set) the aliases are only
+    added when a snake_case attribute is first missing on an instance of the
+    class (or when :func:`resolve_snake_case_methods` is called), and then
+    remain on the class. Until then they are not available on the class
+    itself, e.g. ``Hist.get_bin_content`` or ``super().snake_name``.
+    """
+    if not CONVERT_SNAKE_CASE:
+        return cls
+    if lazy is None:
+        lazy = LAZY_SNAKE_CASE
+    if not lazy:
+        return resolve_snake_case_methods(cls)
+    orig_getattr = getattr(cls, '__getattr__', None)
+
+    def __getattr__(self, attr):
+        if attr[0] != '_' and '_snake_case_resolved' not in cls.__dict__:
+            resolve_snake_case_methods(cls)
+            if attr in cls.__dict__:
+                return getattr(self, attr)
+        if orig_getattr is not None:
+            return orig_getattr(self, attr)
+        raise AttributeError("'{0}' object has no attribute '{1}'".format(
+            self.__class__.__name__, attr))
+
+    cls.__getattr__ = __getattr__
     return cls
 
 
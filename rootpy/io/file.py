@@ -10,7 +10,7 @@ from fnmatch import fnmatch
 from collections import defaultdict
 
 from .. import ROOT
-from .. import asrootpy, QROOT
+from .. import asrootpy, asrootpy_many, QROOT
 from ..base import Object, NamedObject
 from ..decorators import snake_case_methods
 from ..context import preserve_current_directory
@@ -315,7 +315,7 @@ class _DirectoryBase(Object):
                 else:
                     keys[name] = key
             return keys.values()
-        return [asrootpy(key) for key in self.GetListOfKeys()]
+        return asrootpy_many(self.GetListOfKeys())
 
     @wrap_path_handling
     def Get(self, path, rootpy=True, **kwargs):
@@ -49,13 +49,20 @@ class Matrix(_MatrixBase):
         The type of the matrix elements.
 
     """
+    # element type -> class, so that all matrices of a type share one class
+    _dynamic_classes = {}
+
     @classmethod
     def dynamic_cls(cls, type='float'):
+        if type in Matrix._dynamic_classes:
+            return Matrix._dynamic_classes[type]
 
-        class Matrix(_MatrixBase, QROOT.TMatrixT(type)):
+        class _Matrix(_MatrixBase, QROOT.TMatrixT(type)):
             _ROOT = QROOT.TMatrixT(type)
 
-        return Matrix
+        _Matrix.__name__ = 'Matrix'
+        Matrix._dynamic_classes[type] = _Matrix
+        return _Matrix
 
     def __new__(cls, *args, **kwargs):
         type = kwargs.pop('type', 'float')
@@ -74,10 +81,16 @@ class SymmetricMatrix(Matrix):
         The type of the matrix elements.
 
     """
+    _dynamic_classes = {}
+
     @classmethod
     def dynamic_cls(cls, type='float'):
+        if type in SymmetricMatrix._dynamic_classes:
+            return SymmetricMatrix._dynamic_classes[type]
 
-        class SymmetricMatrix(_MatrixBase, QROOT.TMatrixTSym(type)):
+        class _SymmetricMatrix(_MatrixBase, QROOT.TMatrixTSym(type)):
             _ROOT = QROOT.TMatrixTSym(type)
 
-        return SymmetricMatrix
+        _SymmetricMatrix.__name__ = 'SymmetricMatrix'
+        SymmetricMatrix._dynamic_classes[type] = _SymmetricMatrix
+        return _SymmetricMatrix
@@ -5,7 +5,8 @@ from .. import IN_IPYTHON_NOTEBOOK
 from .. import QROOT, ROOT
 from ..utils.hook import classhook, super_overridden
 from ..memory.keepalive import keepalive
-from .hist import Hist, Hist1D, Hist2D, Hist3D, Efficiency, HistStack, histogram
+from .hist import (Hist, Hist1D, Hist2D, Hist3D, HistSparse, Efficiency,
+                   HistStack, histogram)
 from .graph import Graph, Graph1D, Graph2D
 from .profile import Profile, Profile1D, Profile2D, Profile3D
 from .func import F1, F2, F3
@@ -14,7 +15,7 @@ from .canvas import Canvas, Pad
 from .style import Style, get_style, set_style
 
 __all__ = [
-    'Hist', 'Hist1D', 'Hist2D', 'Hist3D', 'HistStack',
+    'Hist', 'Hist1D', 'Hist2D', 'Hist3D', 'HistSparse', 'HistStack',
     'Efficiency', 'histogram',
     'Graph', 'Graph1D', 'Graph2D',
     'Profile', 'Profile1D', 'Profile2D', 'Profile3D',
@@ -113,58 +113,54 @@ class BinningMethods(object):
 
     @staticmethod
     def risk(data):
-        import scipy.optimize as optimize
+        """
+        Minimize the L2 risk of the histogram as an estimator of the
+        density, i.e. the cost (2 * mean - variance) / h ** 2 of the bin
+        counts with bin width h, over all numbers of bins at once.
 
+        References
+        ----------
+        .. [1] H. Shimazaki and S. Shinomoto, "A method for selecting the bin
+               size of a time histogram", 2007.
+        """
         m, M = np.min(data), np.max(data)
+        if m == M:
+            return 1
+        n = len(data)
+
+        def variance(nbins, counts, groups):
+            mean = np.asarray(n, dtype=float) / nbins
+            return np.add.reduceat(
+                (counts - np.repeat(mean, nbins)) ** 2, groups) / nbins
 
-        def f(data):
-            def fff(x):  # h is spacing
-                h = x[0]
-                nbins = (M - m) / h
-                binning = np.arange(m, M, h)
-                if not len(binning):
-                    return float("+inf")
-                histo, bincenters = np.histogram(data, binning)
-                bincenters = 0.5 * (bincenters[1:] + bincenters[:-1])
-                mean = 1. / nbins * np.sum(histo)
-                v2 = 1. / nbins * np.sum((histo - mean) ** 2)
-                return (2 * mean - v2) / h ** 2
-            return fff
-
-        k0 = np.sqrt(len(data))
-        h0 = (M - m) / k0
-        h = optimize.fmin(f(data), np.array([h0]), disp=False)[0]
-        return (M - m) / h
+        nbins = _candidate_nbins(n)
+        mean = np.asarray(n, dtype=float) / nbins
+        h = (M - m) / nbins
+        cost = (2 * mean - _reduce_counts(data, nbins, variance)) / h ** 2
+        return nbins[np.argmin(cost)]
 
     @staticmethod
     def knuth(data):
         """
+        Maximize the posterior probability of the number of bins, evaluated
+        for all numbers of bins at once.
+
         References
         ----------
         .. [1] K. Knuth, "Optimal Data-Based Binning for Histograms", 2006.
                http://arxiv.org/pdf/physics/0605197v1.pdf
         """
-        import scipy.optimize as optimize
-
-        def f(data):
-            from scipy.special import gammaln
-
-            m, M = np.min(data), np.max(data)
-            n = len(data)
+        from scipy.special import gammaln
 
-            def fff(x):
-                k = x[0]  # number of bins
-                if k <= 0:
-                    return float("+inf")
-                binning = np.linspace(m, M, k + 1)
-                histo, bincenters = np.histogram(data, binning)
+        def loglike(nbins, counts, groups):
+            return np.add.reduceat(gammaln(counts + 0.5), groups)
 
-                return -(n * np.log(k) + gammaln(k / 2.) - gammaln(n + k / 2.) +
-                         k * gammaln(1. / 2.) + np.sum(gammaln(histo + 0.5)))
-            return fff
-
-        k0 = np.sqrt(len(data))
-        return optimize.fmin(f(data), np.array([k0]), disp=False)[0]
+        n = len(data)
+        nbins = _candidate_nbins(n)
+        logp = (n * np.log(nbins) + gammaln(nbins / 2.) -
+                nbins * gammaln(0.5) - gammaln(n + nbins / 2.) +
+                _reduce_counts(data, nbins, loglike))
+        return nbins[np.argmax(logp)]
 
     @staticmethod
     def wand(data):
@@ -175,3 +171,60 @@ class BinningMethods(object):
                http://web.ipac.caltech.edu/staff/fmasci/home/statistics_refs/OptimumHistogram.pdf
         """
         raise NotImplementedError
+
+
+def _candidate_nbins(n):
+    # the optimum of the risk and knuth methods is well below this bound for
+    # all but pathological data
+    return np.arange(1, max(int(4 * np.sqrt(n)), 10) + 1)
+
+
+# the maximum number of bin edges located with one searchsorted call
+MAX_BATCH_EDGES = 1 << 16
+
+
+def _reduce_counts(data, nbins, func, max_edges=MAX_BATCH_EDGES):
+    """
+    Return ``func(nbins, counts, groups)`` for the bin counts of uniform
+    histograms of ``data`` for each number of bins in ``nbins``, where
+    ``func`` returns one value per histogram. The data is sorted once and the
+    numbers of bins are processed in batches of at most ``max_edges`` bin
+    edges (or one histogram), so memory does not grow with the number of
+    candidates.
+    """
+    data = np.sort(np.asarray(data, dtype=float).ravel())
+    results = []
+    start = 0
+    while start < len(nbins):
+        # the bins of all histograms up to stop fit into the batch
+        nedges = np.cumsum(nbins[start:] + 1)
+        stop = start + max(np.searchsorted(nedges, max_edges, 'right'), 1)
+        batch = nbins[start:stop]
+        counts, groups = _batched_counts(data, batch)
+        results.append(func(batch, counts, groups))
+        start = stop
+    return np.concatenate(results)
+
+
+def _batched_counts(data, nbins):
+    """
+    Return the bin counts of uniform histograms of the sorted ``data`` for
+    each number of bins in ``nbins``, concatenated, and the index where each
+    histogram starts. All bin edges are located with a single searchsorted
+    call.
+    """
+    m, M = data[0], data[-1]
+    nedges = nbins + 1
+    # position of every edge within its histogram
+    starts = np.cumsum(nedges) - nedges
+    frac = (np.arange(nedges.sum()) - np.repeat(starts, nedges)) / \
+        np.repeat(nbins, nedges).astype(float)
+    index = np.searchsorted(data, m + (M - m) * frac, side='left')
+    # as in np.histogram the last bin includes its upper edge
+    index[starts + nbins] = len(data)
+    counts = np.diff(index)
+    # drop the differences between the last edge of one histogram and the
+    # first edge of the next
+    counts = np.delete(counts, (starts + nbins)[:-1])
+    groups = np.cumsum(nbins) - nbins
+    return counts, groups
@@ -0,0 +1,193 @@
+"""
+Render and save many plots in parallel.
+
+Each plot is described by a :class:`PlotSpec` and rendered in a pool of worker
+processes. Every worker runs in ROOT's batch mode and draws each plot on a
+fresh canvas with its own style, so ROOT's global state (gStyle, gPad and the
+batch flag) is never shared between plots::
+
+    from rootpy.plotting.batch import PlotSpec, render
+
+    specs = [PlotSpec('{0}.pdf'.format(h.name), h, style='ATLAS')
+             for h in hists]
+    render(specs, processes=8)
+
+The plottables are pickled when sent to the workers. Custom drawing is
+possible by passing a function (which must be picklable, i.e. defined at the
+module level) that receives the canvas and the plottables.
+"""
+from __future__ import absolute_import
+
+import multiprocessing
+import traceback
+
+from .. import ROOT, asrootpy, log; log = log[__name__]
+from ..extern.six import string_types
+from ..context import preserve_current_style, preserve_batch_state
+from .canvas import Canvas
+from .style import set_style
+from .utils import draw
+
+__all__ = [
+    'PlotSpec',
+    'render',
+]
+
+
+class PlotSpec(object):
+    """
+    The description of one plot to be rendered by :func:`render`.
+
+    Parameters
+    ----------
+
+    output : string or list of strings
+        The file name(s) the canvas is saved as with ``Canvas.SaveAs``.
+
+    plottables : Hist, Graph, HistStack, or list of such objects, optional
+        The objects to draw.
+
+    func : callable, optional (default=None)
+        If None then the plottables are drawn with
+        :func:`rootpy.plotting.utils.draw`. Otherwise this function is called
+        as ``func(canvas, plottables, **draw_kwargs)`` to draw the plot.
+
+    style : string or TStyle, optional (default=None)
+        The style used for this plot. If None then the current style of the
+        worker is used.
+
+    width, height : int, optional (default=None)
+        The canvas dimensions. If None then the style defaults are used.
+
+    draw_kwargs : additional keyword arguments, optional
+        Passed to :func:`rootpy.plotting.utils.draw` or ``func``.
+
+    """
+    def __init__(self, output, plottables=None, func=None, style=None,
+                 width=None, height=None, **draw_kwargs):
+        if isinstance(output, string_types):
+            output = [output]
+        if not output:
+            raise ValueError("at least one output file name is required")
+        if plottables is None and func is None:
+            raise ValueError("either plottables or func must be specified")
+        self.outputs = list(output)
+        self.plottables = plottables
+        self.func = func
+        self.style = style
+        self.width = width
+        self.height = height
+        self.draw_kwargs = draw_kwargs
+
+    def render(self):
+        """
+        Draw this plot on a new canvas and save it. Return the output file
+        names.
+        """
+        with preserve_current_style():
+            if self.style is not None:
+                set_style(self.style)
+            canvas = Canvas(width=self.width, height=self.height)
+            try:
+                # unpickled plottables are plain ROOT objects in the workers
+                plottables = self.plottables
+                if isinstance(plottables, (list, tuple)):
+                    # draw() consumes the list
+                    plottables = [asrootpy(obj) for obj in plottables]
+                elif plottables is not None:
+                    plottables = asrootpy(plottables)
+                if self.func is not None:
+                    self.func(canvas, plottables, **self.draw_kwargs)
+                else:
+                    draw(plottables, pad=canvas, **self.draw_kwargs)
+                for output in self.outputs:
+                    canvas.SaveAs(output)
+            finally:
+                canvas.Close()
+        return self.outputs
+
+    def __repr__(self):
+        return "{0}({1})".format(
+            self.__class__.__name__, ', '.join(self.outputs))
+
+
+def _init_worker():
+    ROOT.gROOT.SetBatch(True)
+
+
+def _render_one(spec):
+    # never let an exception escape the worker so that one broken plot does
+    # not abort the whole batch
+    try:
+        return spec.render(), None
+    except Exception:
+        return spec.outputs, traceback.format_exc()
+
+
+def render(specs, processes=None, chunksize=1, maxtasksperchild=None):
+    """
+    Render and save a list of plots.
+
+    Parameters
+    ----------
+
+    specs : list of PlotSpec
+        The plots to render.
+
+    processes : int, optional (default=None)
+        The number of worker processes. If None then use as many processes as
+        there are CPUs. If 1 then render all plots in the current process
+        (in batch mode).
+
+    chunksize : int, optional (default=1)
+        The number of plots sent to a worker at once.
+
+    maxtasksperchild : int, optional (default=None)
+        Restart workers after they have rendered this many chunks to limit
+        the memory held by ROOT's global object lists.
+
+    Returns
+    -------
+
+    outputs : list
+        The names of all saved files.
+
+    Raises
+    ------
+
+    RuntimeError
+        If any plot failed to render. All other plots are still rendered.
+
+    """
+    specs = list(specs)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(specs))
+    outputs = []
+    failed = []
+    if processes <= 1:
+        with preserve_batch_state():
+            ROOT.gROOT.SetBatch(True)
+            results = [_render_one(spec) for spec in specs]
+    else:
+        pool = multiprocessing.Pool(
+            processes, initializer=_init_worker,
+            maxtasksperchild=maxtasksperchild)
+        try:
+            results = list(pool.imap_unordered(
+                _render_one, specs, chunksize))
+        finally:
+            pool.close()
+            pool.join()
+    for spec_outputs, error in results:
+        if error is None:
+            outputs.extend(spec_outputs)
+        else:
+            log.error("failed to render {0}:\n{1}".format(
+                ', '.join(spec_outputs), error))
+            failed.append(spec_outputs)
+    if failed:
+        raise RuntimeError(
+            "{0:d} of {1:d} plots failed to render".format(
+                len(failed), len(specs)))
+    return outputs
@@ -7,6 +7,7 @@ __all__ = [
     'plot_corrcoef_matrix',
     'corrcoef',
     'cov',
+    'WeightedCovariance',
 ]
 
 
@@ -20,8 +21,9 @@ def plot_corrcoef_matrix(matrix, names=None,
     Parameters
     ----------
 
-    matrix : 2-dimensional numpy array/matrix
-        A correlation coefficient matrix
+    matrix : 2-dimensional numpy array/matrix or WeightedCovariance
+        A correlation coefficient matrix or an accumulator from which it is
+        computed
 
     names : list of strings, optional (default=None)
         List of the parameter names corresponding to the rows in ``matrix``.
@@ -61,6 +63,8 @@ def plot_corrcoef_matrix(matrix, names=None,
     if axes is None:
         axes = plt.gca()
 
+    if isinstance(matrix, WeightedCovariance):
+        matrix = matrix.corrcoef()
     matrix = np.asarray(matrix)
 
     if matrix.ndim != 2:
@@ -353,3 +357,238 @@ def corrcoef(x, y=None, rowvar=1, bias=0, ddof=None, weights=None,
     except ValueError:  # scalar covariance
         return 1
     return c / np.sqrt(np.multiply.outer(d, d))
+
+
+class WeightedCovariance(object):
+    """
+    A streaming and mergeable accumulator of the weighted mean and covariance
+    of a set of variables.
+
+    The data is passed in chunks of observations to ``update`` and only the
+    sum of the weights, the mean vector and the matrix of weighted
+    co-moments are kept, so the memory use does not depend on the number of
+    observations. Each chunk is reduced with a single matrix product and
+    combined with the running totals using the pairwise update of Chan et
+    al., which is also used to ``merge`` accumulators filled in parallel.
+
+    The results of ``cov`` and ``corrcoef`` agree with the functions of the
+    same name applied to all of the data at once.
+
+    Parameters
+    ----------
+
+    nvars : int, optional (default=None)
+        The number of variables. If None then it is taken from the first
+        chunk.
+
+    Examples
+    --------
+
+    >>> acc = WeightedCovariance()
+    >>> for data, weights in batches:
+    ...     acc.update(data, weights)
+    >>> plot_corrcoef_matrix(acc.corrcoef(), names)
+
+    """
+    def __init__(self, nvars=None):
+        self.nvars = nvars
+        self.entries = 0
+        self.sum_weights = 0.
+        self.sum_weights2 = 0.
+        self.mean = None
+        self.comoment = None
+        if nvars is not None:
+            self._allocate(nvars)
+
+    def _allocate(self, nvars):
+        import numpy as np
+        self.nvars = nvars
+        self.mean = np.zeros(nvars)
+        self.comoment = np.zeros((nvars, nvars))
+
+    def update(self, data, weights=None, rowvar=0):
+        """
+        Add a chunk of observations
+
+        Parameters
+        ----------
+
+        data : array_like
+            A 2-D array with one observation per row (or per column if
+            ``rowvar`` is non-zero).
+
+        weights : array_like, optional (default=None)
+            A 1-D array of weights with one weight per observation.
+
+        rowvar : int, optional (default=0)
+            If non-zero then each row of ``data`` is a variable.
+
+        """
+        import numpy as np
+        X = np.array(data, ndmin=2, dtype=float)
+        if rowvar:
+            X = X.T
+        if X.shape[0] == 0:
+            return
+        if self.nvars is None:
+            self._allocate(X.shape[1])
+        elif X.shape[1] != self.nvars:
+            raise ValueError(
+                "expected {0:d} variables but got {1:d}".format(
+                    self.nvars, X.shape[1]))
+        if weights is None:
+            weights = np.ones(X.shape[0])
+        else:
+            weights = np.asarray(weights, dtype=float).ravel()
+            if weights.shape[0] != X.shape[0]:
+                raise ValueError(
+                    "the number of weights does not match the number of "
+                    "observations")
+        sum_weights = weights.sum()
+        if sum_weights == 0:
+            return
+        mean = np.dot(weights, X) / sum_weights
+        X -= mean
+        comoment = np.dot((weights[:, np.newaxis] * X).T, X)
+        self._combine(X.shape[0], sum_weights, np.dot(weights, weights),
+                      mean, comoment)
+
+    def _combine(self, entries, sum_weights, sum_weights2, mean, comoment):
+        import numpy as np
+        total = self.sum_weights + sum_weights
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * (
+            self.sum_weights * sum_weights / total)
+        self.mean += delta * (sum_weights / total)
+        self.sum_weights = total
+        self.sum_weights2 += sum_weights2
+        self.entries += entries
+
+    def merge(self, other):
+        """
+        Add the observations accumulated by another WeightedCovariance
+        """
+        if other.entries == 0:
+            return self
+        if self.nvars is None:
+            self._allocate(other.nvars)
+        elif other.nvars != self.nvars:
+            raise ValueError("cannot merge accumulators of different sizes")
+        self._combine(other.entries, other.sum_weights, other.sum_weights2,
+                      other.mean, other.comoment)
+        return self
+
+    __iadd__ = merge
+
+    def __add__(self, other):
+        result = WeightedCovariance()
+        result.merge(self)
+        result.merge(other)
+        return result
+
+    def cov(self, bias=0, ddof=None, repeat_weights=0):
+        """
+        Return the covariance matrix. The arguments have the same meaning as
+        in :func:`cov`. Observations filled without weights are treated as
+        having unit weights, which gives the same normalization as
+        unweighted data with ``repeat_weights=1``.
+        """
+        if self.entries == 0:
+            raise ValueError("no observations have been accumulated")
+        if ddof is None:
+            ddof = 0 if bias else 1
+        unweighted = self.sum_weights2 == self.sum_weights == self.entries
+        if repeat_weights or unweighted:
+            fact = self.sum_weights - ddof
+            return (self.comoment / fact).squeeze()
+        # normalized weights as in cov()
+        fact = 1. - self.sum_weights2 / self.sum_weights ** 2
+        return (self.comoment / self.sum_weights / fact).squeeze()
+
+    def corrcoef(self, **kwargs):
+        """
+        Return the matrix of correlation coefficients
+        """
+        import numpy as np
+        c = self.cov(**kwargs)
+        if c.ndim == 0:
+            return 1
+        d = np.diag(c)
+        return c / np.sqrt(np.multiply.outer(d, d))
+
+    def fill_tree(self, tree, branches, weight=None, selection=None,
+                  chunksize=100000):
+        """
+        Accumulate branches (or expressions) of a Tree, TreeChain or
+        TreeQueue in chunks of ``chunksize`` entries. ``weight`` is an
+        optional branch name or expression for the per-entry weights and is
+        multiplied by the tree weight.
+        """
+        from ...tree.chain import BaseTreeChain
+        if isinstance(tree, BaseTreeChain):
+            tree.reset()
+            while tree._rollover():
+                self.fill_tree(tree._tree, branches, weight=weight,
+                               selection=selection, chunksize=chunksize)
+            return self
+        import numpy as np
+        from root_numpy import tree2array
+        columns = list(branches)
+        if weight is not None:
+            columns.append(weight)
+        tree_weight = tree.GetWeight()
+        entries = tree.GetEntries()
+        for start in range(0, entries, chunksize):
+            arr = tree2array(tree, branches=columns, selection=selection,
+                             start=start, stop=start + chunksize)
+            if len(arr) == 0:
+                continue
+            names = arr.dtype.names
+            data = np.column_stack(
+                [arr[name] for name in names[:len(branches)]])
+            if weight is not None:
+                weights = arr[names[-1]].astype(float) * tree_weight
+            elif tree_weight != 1:
+                weights = np.repeat(float(tree_weight), len(arr))
+            else:
+                weights = None
+            self.update(data, weights)
+        return self
+
+    @classmethod
+    def from_files(cls, treename, files, branches, weight=None,
+                   selection=None, chunksize=100000, processes=None):
+        """
+        Accumulate a tree in each file in a separate process and merge the
+        partial accumulators
+        """
+        import multiprocessing
+        args = [(treename, filename, branches, weight, selection, chunksize)
+                for filename in files]
+        if processes == 1 or len(args) <= 1:
+            partials = map(_fill_file, args)
+        else:
+            pool = multiprocessing.Pool(processes)
+            try:
+                partials = pool.map(_fill_file, args)
+            finally:
+                pool.close()
+                pool.join()
+        result = cls()
+        for partial in partials:
+            result.merge(partial)
+        return result
+
+    def __repr__(self):
+        return "{0}(nvars={1}, entries={2:d})".format(
+            self.__class__.__name__, self.nvars, self.entries)
+
+
+def _fill_file(args):
+    from ...io import root_open
+    treename, filename, branches, weight, selection, chunksize = args
+    acc = WeightedCovariance()
+    with root_open(filename) as rfile:
+        acc.fill_tree(rfile.Get(treename), branches, weight=weight,
+                      selection=selection, chunksize=chunksize)
+    return acc
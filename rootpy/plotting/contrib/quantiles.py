@@ -8,13 +8,12 @@ from __future__ import absolute_import
 import ROOT
 
 from math import sqrt
-from array import array
 
 from .. import Graph
-from ...extern.six.moves import range
 
 __all__ = [
     'qqgraph',
+    'QuantileSketch',
 ]
 
 
@@ -22,26 +21,14 @@ def qqgraph(h1, h2, quantiles=None):
     """
     Return a Graph of a quantile-quantile (QQ) plot and confidence band
     """
+    import numpy as np
     if quantiles is None:
-        quantiles = max(min(len(h1), len(h2)) / 2, 1)
+        quantiles = max(min(len(h1), len(h2)) // 2, 1)
     nq = quantiles
     # position where to compute the quantiles in [0, 1]
-    xq = array('d', [0.] * nq)
-    # array to contain the quantiles
-    yq1 = array('d', [0.] * nq)
-    # array to contain the quantiles
-    yq2 = array('d', [0.] * nq)
-
-    for i in range(nq):
-        xq[i] = float(i + 1) / nq
-
-    h1.GetQuantiles(nq, yq1, xq)
-    h2.GetQuantiles(nq, yq2, xq)
-
-    xq_plus = array('d', [0.] * nq)
-    xq_minus = array('d', [0.] * nq)
-    yq2_plus = array('d', [0.] * nq)
-    yq2_minus = array('d', [0.] * nq)
+    xq = np.arange(1, nq + 1, dtype=float) / nq
+    yq1 = h1.quantiles(xq)
+    yq2 = h2.quantiles(xq)
 
     """
     KS_cv: KS critical value
@@ -78,46 +65,179 @@ def qqgraph(h1, h2, quantiles=None):
     KS_cv = (critical_value(1, 1 - 0.68) /
              sqrt((esum1 * esum2) / (esum1 + esum2)))
 
-    for i in range(nq):
-        # upper limit
-        xq_plus[i] = float(xq[i] + KS_cv)
-        # lower limit
-        xq_minus[i] = float(xq[i] - KS_cv)
-
-    h2.GetQuantiles(nq, yq2_plus, xq_plus)
-    h2.GetQuantiles(nq, yq2_minus, xq_minus)
-
-    yq2_err_plus = array('d', [0.] * nq)
-    yq2_err_minus = array('d', [0.] * nq)
-    for i in range(nq):
-        yq2_err_plus[i] = yq2_plus[i] - yq2[i]
-        yq2_err_minus[i] = yq2[i] - yq2_minus[i]
+    # upper and lower limits
+    yq2_plus = h2.quantiles(xq + KS_cv)
+    yq2_minus = h2.quantiles(xq - KS_cv)
 
     # forget the last point, so number of points: (nq - 1)
-    gr = Graph(nq - 1)
-    for i in range(nq - 1):
-        gr[i] = (yq1[i], yq2[i])
+    npoints = nq - 1
+    gr = Graph(npoints)
+    if npoints > 0:
+        _buffer(gr.GetX(), npoints)[:] = yq1[:npoints]
+        _buffer(gr.GetY(), npoints)[:] = yq2[:npoints]
         # confidence level band
-        gr.SetPointEYlow(i, yq2_err_minus[i])
-        gr.SetPointEYhigh(i, yq2_err_plus[i])
-
+        _buffer(gr.GetEYlow(), npoints)[:] = (yq2 - yq2_minus)[:npoints]
+        _buffer(gr.GetEYhigh(), npoints)[:] = (yq2_plus - yq2)[:npoints]
     return gr
 
 
+def _buffer(buf, size):
+    import numpy as np
+    return np.ndarray((size,), dtype=np.double, buffer=buf)
+
+
 def effective_sample_size(h):
     """
     Calculate the effective sample size for a histogram
     the same way as ROOT does.
     """
-    sum = 0
-    ew = 0
-    w = 0
-    for bin in h.bins(overflow=False):
-        sum += bin.value
-        ew = bin.error
-        w += ew * ew
-    esum = sum * sum / w
-    return esum
+    import numpy as np
+    sum = h.contents_array().sum()
+    w = np.square(h.errors_array()).sum()
+    return sum * sum / w
+
+
+class QuantileSketch(object):
+    """
+    Streaming approximate quantiles with bounded memory.
+
+    Data that is too large to keep in memory or to histogram twice (once to
+    find the range and once to fill) can be passed in chunks to ``update``.
+    The sketch keeps a hierarchy of sorted compactors (a KLL sketch): when a
+    level is full it is sorted and every other item is promoted to the next
+    level with twice the weight. The rank error of the quantiles is of the
+    order of 1 / k.
+
+    Parameters
+    ----------
+
+    k : int, optional (default=200)
+        The capacity of the highest level. Memory use is about 3 * k values.
+
+    seed : int, optional (default=None)
+        Seed of the random offsets used when compacting.
+
+    Examples
+    --------
+
+    >>> sketch = QuantileSketch()
+    >>> for chunk in chunks:
+    ...     sketch.update(chunk)
+    >>> sketch.quantiles([0.05, 0.5, 0.95])
+
+    """
+    def __init__(self, k=200, seed=None):
+        import numpy as np
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels = [np.empty(0, dtype=float)]
+        self._random = np.random.RandomState(seed)
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(int(self.k * (2. / 3.) ** depth), 2)
+
+    def update(self, values):
+        """
+        Add an array of values to the sketch. Every value enters the lowest
+        level with unit weight.
+        """
+        import numpy as np
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._levels[0] = np.concatenate((self._levels[0], values))
+        self._compress()
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one
+        """
+        import numpy as np
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0, dtype=float))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate((self._levels[level], items))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _compress(self):
+        import numpy as np
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0, dtype=float))
+                items = np.sort(items)
+                if len(items) % 2:
+                    # keep one item at this level so no weight is lost
+                    self._levels[level] = items[-1:]
+                    items = items[:-1]
+                else:
+                    self._levels[level] = np.empty(0, dtype=float)
+                offset = self._random.randint(2)
+                self._levels[level + 1] = np.concatenate(
+                    (self._levels[level + 1], items[offset::2]))
+            level += 1
+
+    def _weighted(self):
+        import numpy as np
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([
+            np.full(len(items), 2. ** level)
+            for level, items in enumerate(self._levels)])
+        order = np.argsort(values, kind='mergesort')
+        return values[order], weights[order]
+
+    def quantiles(self, quantiles):
+        """
+        Return the approximate quantiles for a list of cumulative
+        probabilities or, if an integer, equally spaced probabilities between
+        0 and 1 (inclusive)
+        """
+        import numpy as np
+        if self.count == 0:
+            raise ValueError("the sketch is empty")
+        if isinstance(quantiles, int):
+            quantiles = np.linspace(0, 1, quantiles)
+        qs = np.asarray(quantiles, dtype=float)
+        values, weights = self._weighted()
+        cumulative = np.cumsum(weights)
+        cumulative /= cumulative[-1]
+        idx = np.searchsorted(cumulative, qs, side='left')
+        output = values[np.clip(idx, 0, len(values) - 1)]
+        # the exact extremes are known
+        output[qs <= 0] = self.min
+        output[qs >= 1] = self.max
+        return output
+
+    def rank(self, value):
+        """
+        Return the approximate fraction of values less than or equal to
+        ``value``
+        """
+        import numpy as np
+        values, weights = self._weighted()
+        return weights[:np.searchsorted(values, value, side='right')].sum() / \
+            weights.sum()
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return "{0}(k={1:d}, count={2:d})".format(
+            self.__class__.__name__, self.k, self.count)
 
 
 def critical_value(n, p):
@@ -1,5 +1,37 @@
 import string
 from rootpy.plotting.contrib import plot_corrcoef_matrix
+from rootpy.plotting.contrib.plot_corrcoef_matrix import (
+    cov, corrcoef, WeightedCovariance)
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_equal, assert_true
+
+
+def test_weighted_covariance():
+    try:
+        import numpy as np
+    except ImportError:
+        raise SkipTest("numpy is not installed")
+    random = np.random.RandomState(0)
+    data = np.dot(random.normal(size=(10000, 5)), random.normal(size=(5, 5)))
+    weights = random.randint(1, 10, 10000).astype(float)
+    acc = WeightedCovariance()
+    for chunk, chunk_weights in zip(np.array_split(data[:6000], 7),
+                                    np.array_split(weights[:6000], 7)):
+        acc.update(chunk, chunk_weights)
+    # a partial accumulator filled elsewhere
+    other = WeightedCovariance()
+    other.update(data[6000:], weights[6000:])
+    acc.merge(other)
+    assert_equal(acc.entries, 10000)
+    assert_true(np.allclose(acc.cov(), cov(data.T, weights=weights)))
+    assert_true(np.allclose(
+        acc.cov(repeat_weights=1),
+        cov(data.T, weights=weights, repeat_weights=1)))
+    assert_true(np.allclose(
+        acc.corrcoef(), corrcoef(data.T, weights=weights)))
+    unweighted = WeightedCovariance()
+    unweighted.update(data.T, rowvar=1)
+    assert_true(np.allclose(unweighted.cov(), np.cov(data.T)))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,44 @@
+from rootpy.plotting import Hist
+from rootpy.plotting.contrib.quantiles import qqgraph, QuantileSketch
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_equal, assert_true, assert_raises
+
+
+def test_qqgraph():
+    h1 = Hist(100, -5, 5)
+    h2 = Hist(100, -5, 5)
+    h1.FillRandom('gaus', 10000)
+    h2.FillRandom('gaus', 10000)
+    graph = qqgraph(h1, h2, quantiles=20)
+    assert_equal(len(graph), 19)
+    x = list(graph.x())
+    assert_true(x == sorted(x))
+
+
+def test_quantile_sketch():
+    try:
+        import numpy as np
+    except ImportError:
+        raise SkipTest("numpy is not installed")
+    data = np.random.RandomState(0).normal(size=200000)
+    sketch = QuantileSketch(k=200, seed=1)
+    for chunk in np.array_split(data, 20):
+        sketch.update(chunk)
+    assert_equal(len(sketch), len(data))
+    qs = [0, 0.05, 0.5, 0.95, 1]
+    approx = sketch.quantiles(qs)
+    assert_equal(approx[0], data.min())
+    assert_equal(approx[-1], data.max())
+    # check the rank error rather than the values
+    ranks = np.searchsorted(np.sort(data), approx[1:-1]) / float(len(data))
+    assert_true(np.all(np.abs(ranks - qs[1:-1]) < 0.02))
+    other = QuantileSketch(seed=2)
+    other.update(data[:1000])
+    sketch.merge(other)
+    assert_equal(len(sketch), len(data) + 1000)
+    assert_raises(ValueError, QuantileSketch().quantiles, 3)
+
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule()
@@ -28,11 +28,15 @@ __all__ = [
     'Hist1D',
     'Hist2D',
     'Hist3D',
+    'HistSparse',
     'HistStack',
     'Efficiency',
     'histogram',
 ]
 
+# NumPy dtypes of the bin content arrays of TH*C, TH*S, TH*I, TH*F and TH*D
+_NUMPY_DTYPES = dict(C='i1', S='i2', I='i4', F='f4', D='f8')
+
 
 def canonify_slice(s, n):
     """
@@ -1015,6 +1019,84 @@ class _HistBase(Plottable, NamedObject):
         w = ax.GetBinWidth(index) / 2.
         return (w, w)
 
+    def _shaped(self, values, overflow=False):
+        # the global bin index runs fastest along x
+        shape = [self.nbins(axis=i, overflow=True)
+                 for i in range(self.GetDimension())]
+        values = values.reshape(shape, order='F')
+        if not overflow:
+            values = values[(slice(1, -1),) * len(shape)]
+        return values
+
+    def contents_array(self, overflow=False):
+        """
+        Return all bin contents as a NumPy array in one call
+
+        Parameters
+        ----------
+
+        overflow : bool, optional (default=False)
+            If True then include the underflow and overflow bins.
+
+        Returns
+        -------
+
+        contents : numpy array
+            An array of doubles with one dimension per histogram axis,
+            indexed as [x, y, z].
+
+        """
+        import numpy as np
+        size = self.GetSize()
+        dtype = _NUMPY_DTYPES.get(getattr(self, 'TYPE', None))
+        if dtype is None:
+            # i.e. profiles where the stored array is not the bin content
+            contents = np.fromiter(
+                map(self.GetBinContent, range(size)),
+                dtype=np.double, count=size)
+        else:
+            contents = np.ndarray(
+                (size,), dtype=dtype,
+                buffer=self.GetArray()).astype(np.double)
+        return self._shaped(contents, overflow=overflow)
+
+    def errors_array(self, overflow=False):
+        """
+        Return all bin errors as a NumPy array in one call. See
+        ``contents_array`` for a description of the arguments and the
+        shape of the returned array.
+        """
+        import numpy as np
+        size = self.GetSize()
+        if (getattr(self, 'TYPE', None) is None or
+                self.GetBinErrorOption() != ROOT.TH1.kNormal):
+            errors = np.fromiter(
+                map(self.GetBinError, range(size)),
+                dtype=np.double, count=size)
+        elif self.GetSumw2N() > 0:
+            errors = np.sqrt(np.ndarray(
+                (size,), dtype=np.double,
+                buffer=self.GetSumw2().GetArray()))
+        else:
+            errors = np.sqrt(np.abs(np.ndarray(
+                (size,), dtype=_NUMPY_DTYPES[self.TYPE],
+                buffer=self.GetArray()).astype(np.double)))
+        return self._shaped(errors, overflow=overflow)
+
+    def edges_array(self, axis=0):
+        """
+        Return the bin edges along an axis as a NumPy array in one call
+        """
+        import numpy as np
+        ax = self.axis(axis)
+        nbins = ax.GetNbins()
+        bins = ax.GetXbins()
+        if bins.GetSize() == nbins + 1:
+            return np.ndarray(
+                (nbins + 1,), dtype=np.double,
+                buffer=bins.GetArray()).copy()
+        return np.linspace(ax.GetXmin(), ax.GetXmax(), nbins + 1)
+
     def check_compatibility(self, other, check_edges=False, precision=1E-7):
         """
         Test whether two histograms are considered compatible by the number of
@@ -1663,28 +1745,70 @@ class _HistBase(Plottable, NamedObject):
                 output = list(set(output))
                 output.sort()
             return output
+        if use_numpy and self.Integral() > 0:
+            return self._quantiles_array(qs)
         self.GetQuantiles(num_quantiles, output, qs)
         if use_numpy:
             return output
         return list(output)
 
+    def _quantiles_array(self, qs):
+        """
+        Vectorized equivalent of TH1::GetQuantiles: locate all
+        probabilities in the cumulative integral at once and interpolate
+        linearly within each bin.
+        """
+        import numpy as np
+        nbins = self.nbins(0)
+        integral = np.ndarray((nbins + 1,), dtype=float,
+                              buffer=self.GetIntegral())
+        edges = self.edges_array(0)
+        qs = np.asarray(qs, dtype=float)
+        first = np.searchsorted(integral, qs, side='left')
+        last = np.searchsorted(integral, qs, side='right') - 1
+        # like TMath::BinarySearch followed by the treatment of empty bins
+        # in TH1::GetQuantiles
+        ibin = np.where(last >= first, np.maximum(first, last - 1), first - 1)
+        ibin = np.clip(ibin, 0, nbins)
+        output = edges[ibin]
+        inner = ibin < nbins
+        lower = ibin[inner]
+        dint = integral[lower + 1] - integral[lower]
+        width = edges[lower + 1] - edges[lower]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shift = np.where(
+                dint > 0, width * (qs[inner] - integral[lower]) / dint, 0.)
+        output[inner] += shift
+        return output
+
+    def _extremum_with_error(self, sign):
+        try:
+            import numpy as np
+        except ImportError:
+            clone = self.Clone(shallow=True)
+            for i in range(self.GetSize()):
+                clone.SetBinContent(
+                    i, clone.GetBinContent(i) + sign * clone.GetBinError(i))
+            if sign > 0:
+                return clone.GetBinContent(clone.GetMaximumBin())
+            return clone.GetBinContent(clone.GetMinimumBin())
+        values = self.contents_array() + sign * self.errors_array()
+        # only consider bins in the axis ranges as GetMaximumBin does
+        values = values[tuple(slice(ax.GetFirst() - 1, ax.GetLast())
+                              for ax in self.axes)]
+        if sign > 0:
+            return float(values.max())
+        return float(values.min())
+
     def max(self, include_error=False):
         if not include_error:
             return self.GetBinContent(self.GetMaximumBin())
-        clone = self.Clone(shallow=True)
-        for i in range(self.GetSize()):
-            clone.SetBinContent(
-                i, clone.GetBinContent(i) + clone.GetBinError(i))
-        return clone.GetBinContent(clone.GetMaximumBin())
+        return self._extremum_with_error(1)
 
     def min(self, include_error=False):
         if not include_error:
             return self.GetBinContent(self.GetMinimumBin())
-        clone = self.Clone(shallow=True)
-        for i in range(self.GetSize()):
-            clone.SetBinContent(
-                i, clone.GetBinContent(i) - clone.GetBinError(i))
-        return clone.GetBinContent(clone.GetMinimumBin())
+        return self._extremum_with_error(-1)
 
 
 class _Hist(_HistBase):
@@ -2373,6 +2497,421 @@ class Hist3D(_Hist3D, QROOT.TH3):
             *args, **kwargs)
 
 
+class HistSparseView(_HistViewBase):
+
+    def __init__(self, hist, index):
+        for s in index:
+            if isinstance(s, slice) and s.step == 0:
+                raise ValueError("rebin cannot be zero")
+        self.hist = hist
+        self.index = index
+
+    def edges(self, axis=0):
+        return list(self.hist.edges(axis))[
+            bin_to_edge_slice(self.index[axis],
+                              self.hist.nbins(axis, overflow=True))]
+
+    def __iter__(self):
+        ranges = [range(*canonify_slice(s, self.hist.nbins(
+                            axis, overflow=True)).indices(
+                            self.hist.nbins(axis, overflow=True)))
+                  for axis, s in enumerate(self.index)]
+        for coords, value, error in self.hist.filled_bins():
+            if all(c in r for c, r in zip(coords, ranges)):
+                yield coords, value, error
+
+    def __repr__(self):
+        return '{0}({1}, {2})'.format(
+            self.__class__.__name__, self.hist,
+            ', '.join(self._slice_repr(s) for s in self.index))
+
+
+class _HistSparse(NamedObject):
+    """
+    Common methods of the sparse histograms. Only bins that have been filled
+    use memory, so histograms with many dimensions that are mostly empty can
+    be handled, which would be too large as dense histograms.
+    """
+    TYPES = 'CSILFD'
+
+    def __init__(self, *axes, **kwargs):
+        chunksize = kwargs.pop('chunksize', 1024 * 16)
+        nbins, low, high, edges = [], [], [], []
+        for axis in axes:
+            if isinstance(axis, tuple):
+                if len(axis) != 3:
+                    raise TypeError(
+                        "an axis must be given as (nbins, low, high) "
+                        "or as a list of bin edges")
+                n, lo, hi = axis
+                if not isinstance(n, int) or n < 1:
+                    raise ValueError(
+                        "number of bins must be a positive integer")
+                if lo >= hi:
+                    raise ValueError(
+                        "upper bound must be greater than lower bound")
+                edges.append(None)
+            else:
+                axis = list(axis)
+                if len(axis) < 2:
+                    raise ValueError("specify at least two bin edges")
+                if sorted(axis) != axis or len(set(axis)) != len(axis):
+                    raise ValueError(
+                        "bin edges must be sorted in ascending order "
+                        "and must not be repeated")
+                n, lo, hi = len(axis) - 1, axis[0], axis[-1]
+                edges.append(axis)
+            nbins.append(n)
+            low.append(lo)
+            high.append(hi)
+        if not axes:
+            raise TypeError("specify at least one axis")
+        super(_HistSparse, self).__init__(
+            len(axes), array('i', nbins), array('d', low), array('d', high),
+            chunksize, **kwargs)
+        for i, axis_edges in enumerate(edges):
+            if axis_edges is not None:
+                self.GetAxis(i).Set(nbins[i], array('d', axis_edges))
+        # always keep track of the sum of squares of the weights
+        self.Sumw2()
+
+    @property
+    def ndim(self):
+        return self.GetNdimensions()
+
+    @property
+    def entries(self):
+        return self.GetEntries()
+
+    @entries.setter
+    def entries(self, value):
+        self.SetEntries(value)
+
+    def axis(self, axis=0):
+        return self.GetAxis(axis)
+
+    def nbins(self, axis=0, overflow=False):
+        """
+        Get the number of bins along an axis
+        """
+        nbins = self.GetAxis(axis).GetNbins()
+        if overflow:
+            nbins += 2
+        return nbins
+
+    def edges(self, axis=0):
+        """
+        Generate the bin edges along an axis
+        """
+        ax = self.GetAxis(axis)
+        nbins = ax.GetNbins()
+        for index in range(1, nbins + 1):
+            yield ax.GetBinLowEdge(index)
+        yield ax.GetBinUpEdge(nbins)
+
+    def edges_array(self, axis=0):
+        """
+        Return the bin edges along an axis as a NumPy array
+        """
+        import numpy as np
+        return np.fromiter(self.edges(axis), dtype=np.double)
+
+    def filled_bins(self):
+        """
+        Generate ``(coordinates, value, error)`` for each filled bin, where
+        the coordinates are the bin indices along each axis (including 0 for
+        the underflow and nbins + 1 for the overflow).
+        """
+        coords = array('i', [0] * self.GetNdimensions())
+        for ibin in range(self.GetNbins()):
+            value = self.GetBinContent(ibin, coords)
+            yield tuple(coords), value, self.GetBinError(ibin)
+
+    def _coords(self, index):
+        if not isinstance(index, tuple):
+            index = (index,)
+        ndim = self.GetNdimensions()
+        if len(index) != ndim:
+            raise IndexError(
+                "expected {0:d} indices but got {1:d}".format(
+                    ndim, len(index)))
+        return index
+
+    def __getitem__(self, index):
+        index = self._coords(index)
+        if any(isinstance(i, slice) for i in index):
+            return HistSparseView(self, index)
+        coords = [i % self.nbins(axis, overflow=True)
+                  for axis, i in enumerate(index)]
+        return self.GetBinContent(array('i', coords))
+
+    def __setitem__(self, index, value):
+        index = self._coords(index)
+        coords = array('i', [i % self.nbins(axis, overflow=True)
+                             for axis, i in enumerate(index)])
+        if isinstance(value, tuple):
+            value, error = value
+            self.SetBinContent(coords, value)
+            self.SetBinError(coords, error)
+        else:
+            self.SetBinContent(coords, value)
+
+    def fill_array(self, array, weights=None):
+        """
+        Fill this histogram with a NumPy array of shape (N, ndim).
+
+        The entries are summed per bin with NumPy first, so ROOT is only
+        called once for each distinct bin. Note that, as with
+        ``AddBinContent``, the statistics used for the mean and RMS are not
+        updated.
+        """
+        import numpy as np
+        ndim = self.GetNdimensions()
+        array = np.asarray(array, dtype=np.double)
+        if array.ndim == 1 and ndim == 1:
+            array = array[:, np.newaxis]
+        if array.ndim != 2 or array.shape[1] != ndim:
+            raise ValueError(
+                "array must have shape (N, {0:d})".format(ndim))
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.double)
+            if weights.shape != (array.shape[0],):
+                raise ValueError("weights must have shape (N,)")
+        if array.shape[0] == 0:
+            return
+        coords = np.empty(array.shape, dtype=np.int32)
+        for axis in range(ndim):
+            # bin 0 is the underflow and nbins + 1 the overflow
+            coords[:, axis] = np.searchsorted(
+                self.edges_array(axis), array[:, axis], side='right')
+        unique, inverse = np.unique(coords, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        sumw = np.bincount(inverse, weights=weights, minlength=len(unique))
+        if weights is None:
+            sumw2 = sumw
+        else:
+            sumw2 = np.bincount(inverse, weights=weights * weights,
+                                minlength=len(unique))
+        for bin_coords, w, w2 in zip(unique, sumw, sumw2):
+            ibin = self.GetBin(_int_array(bin_coords))
+            self.AddBinContent(ibin, w)
+            self.AddBinError2(ibin, w2)
+        self.SetEntries(self.GetEntries() + array.shape[0])
+
+    def fill_view(self, view):
+        """
+        Fill this histogram from a view of another sparse histogram
+        """
+        other = view.hist
+        ndim = self.GetNdimensions()
+        other_axes = [other.GetAxis(i) for i in range(ndim)]
+        axes = [self.GetAxis(i) for i in range(ndim)]
+        for coords, value, error in view:
+            target = array('i', [
+                axis.FindFixBin(other_axis.GetBinCenter(c))
+                for axis, other_axis, c in zip(axes, other_axes, coords)])
+            ibin = self.GetBin(target)
+            self.AddBinContent(ibin, value)
+            self.AddBinError2(ibin, error * error)
+
+    def empty_clone(self, type=None, **kwargs):
+        """
+        Return a new empty sparse histogram with the same binning
+        """
+        if type is None:
+            type = self.TYPE
+        axes = [list(self.edges(i)) for i in range(self.GetNdimensions())]
+        return HistSparse(*axes, type=type, **kwargs)
+
+    @property
+    def sparse_fraction(self):
+        """
+        The fraction of all bins (including under- and overflow) that are
+        filled
+        """
+        return self.GetSparseFractionBins()
+
+    def to_dense(self, max_bins=10000000):
+        """
+        Convert this histogram into a Hist, Hist2D or Hist3D with the same
+        binning. A ValueError is raised if the dense histogram would have more
+        than ``max_bins`` bins.
+        """
+        ndim = self.GetNdimensions()
+        if ndim > 3:
+            raise TypeError(
+                "only histograms with up to three dimensions can be "
+                "converted into dense histograms; use to_array() instead")
+        self._check_size(max_bins)
+        axes = [list(self.edges(i)) for i in range(ndim)]
+        cls = (Hist, Hist2D, Hist3D)[ndim - 1]
+        hist = cls(*axes, type=self.TYPE if self.TYPE in 'CSIFD' else 'D',
+                   name=self.GetName() + '_dense', title=self.GetTitle())
+        for coords, value, error in self.filled_bins():
+            ibin = hist.GetBin(*coords)
+            hist.SetBinContent(ibin, value)
+            hist.SetBinError(ibin, error)
+        hist.SetEntries(self.GetEntries())
+        return hist
+
+    def to_array(self, overflow=False, max_bins=10000000):
+        """
+        Return the bin contents as a dense NumPy array. A ValueError is
+        raised if the array would have more than ``max_bins`` elements.
+        """
+        import numpy as np
+        self._check_size(max_bins)
+        ndim = self.GetNdimensions()
+        shape = [self.nbins(i, overflow=True) for i in range(ndim)]
+        contents = np.zeros(shape, dtype=np.double)
+        for coords, value, _ in self.filled_bins():
+            contents[coords] = value
+        if not overflow:
+            contents = contents[(slice(1, -1),) * ndim]
+        return contents
+
+    def _check_size(self, max_bins):
+        size = 1
+        for i in range(self.GetNdimensions()):
+            size *= self.nbins(i, overflow=True)
+        if max_bins is not None and size > max_bins:
+            raise ValueError(
+                "the dense histogram would have {0:d} bins but at most "
+                "{1:d} are allowed".format(size, max_bins))
+
+    def __add__(self, other):
+        copy = self.Clone()
+        copy += other
+        return copy
+
+    def __radd__(self, other):
+        # support sum()
+        if other == 0:
+            return self.Clone()
+        return NotImplemented
+
+    def __iadd__(self, other):
+        if not isinstance(other, QROOT.THnBase):
+            return NotImplemented
+        self.Add(other)
+        return self
+
+    def __sub__(self, other):
+        copy = self.Clone()
+        copy -= other
+        return copy
+
+    def __isub__(self, other):
+        if not isinstance(other, QROOT.THnBase):
+            return NotImplemented
+        self.Add(other, -1.)
+        return self
+
+    def __mul__(self, other):
+        copy = self.Clone()
+        copy *= other
+        return copy
+
+    __rmul__ = __mul__
+
+    def __imul__(self, other):
+        if isinstance(other, numbers.Real):
+            self.Scale(other)
+        elif isinstance(other, QROOT.THnBase):
+            self.Multiply(other)
+        else:
+            return NotImplemented
+        return self
+
+    def __div__(self, other):
+        copy = self.Clone()
+        copy /= other
+        return copy
+
+    __truediv__ = __div__
+
+    def __idiv__(self, other):
+        if isinstance(other, numbers.Real):
+            if other == 0:
+                raise ZeroDivisionError(
+                    "attempting to divide histogram by zero")
+            self.Scale(1. / other)
+        elif isinstance(other, QROOT.THnBase):
+            self.Divide(other)
+        else:
+            return NotImplemented
+        return self
+
+    __itruediv__ = __idiv__
+
+    def __repr__(self):
+        return "{0}('{1}', ndim={2:d}, filled={3:d})".format(
+            self.__class__.__name__, self.GetName(),
+            self.GetNdimensions(), self.GetNbins())
+
+
+_HIST_CLASSES_SPARSE = {}
+
+
+def _int_array(values):
+    # fill_array's parameter shadows the array module function
+    return array('i', [int(v) for v in values])
+
+
+def _HistSparse_class(type='D'):
+    type = type.upper()
+    if type not in _HistSparse.TYPES:
+        raise TypeError(
+            "No sparse histogram available with bin type {0}".format(type))
+    if type in _HIST_CLASSES_SPARSE:
+        return _HIST_CLASSES_SPARSE[type]
+    rootclass = getattr(QROOT, 'THnSparse{0}'.format(type))
+
+    class HistSparse(_HistSparse, rootclass):
+        _ROOT = rootclass
+        TYPE = type
+
+    cls = snake_case_methods(HistSparse)
+    _HIST_CLASSES_SPARSE[type] = cls
+    return cls
+
+
+class HistSparse(_HistSparse, QROOT.THnSparse):
+    """
+    Returns a sparse histogram with any number of dimensions which inherits
+    from the associated ROOT.THnSparse* class (where * is C, S, I, L, F or D
+    depending on the type keyword argument; the default is D).
+
+    Each axis is given either as a tuple ``(nbins, low, high)`` or as a list
+    of bin edges::
+
+        h = HistSparse((100, 0, 500), [0, 1.0, 1.5, 2.5], (64, -3.2, 3.2))
+        h.fill_array(values)  # values has shape (N, 3)
+        h[10, 2, 5]  # content of a bin
+        dense = h.to_dense()
+
+    A HistSparse can also be created from a view of another sparse
+    histogram, e.g. ``HistSparse(h[1:11, :, ::2])``.
+    """
+    _ROOT = QROOT.THnSparse
+
+    @classmethod
+    def dynamic_cls(cls, type='D'):
+        return _HistSparse_class(type)
+
+    def __new__(cls, *args, **kwargs):
+        if len(args) == 1 and isinstance(args[0], HistSparseView):
+            view = args[0]
+            kwargs.setdefault('type', view.hist.TYPE)
+            axes = [view.edges(i) for i in range(view.hist.ndim)]
+            obj = HistSparse(*axes, **kwargs)
+            obj.fill_view(view)
+            obj.entries = view.hist.entries
+            return obj
+        type = kwargs.pop('type', 'D').upper()
+        return cls.dynamic_cls(type)(*args, **kwargs)
+
+
 class HistStack(Plottable, NamedObject, QROOT.THStack):
 
     _ROOT = QROOT.THStack
@@ -2,7 +2,7 @@ from __future__ import absolute_import
 
 from array import array
 
-from .. import QROOT, log; log = log[__name__]
+from .. import ROOT, QROOT, log; log = log[__name__]
 from ..extern.six.moves import range
 from .hist import _Hist, _Hist2D, _Hist3D
 
@@ -14,8 +14,162 @@ __all__ = [
 ]
 
 
+def _stats_array():
+    # large enough for the statistics of a TProfile3D
+    return array('d', [0.] * 13)
+
+
 class _ProfileBase(object):
-    pass
+
+    def _profiled_range(self):
+        # entries with a profiled value outside of this range are ignored
+        dim = self.GetDimension()
+        if dim == 1:
+            return self.GetYmin(), self.GetYmax()
+        elif dim == 2:
+            return self.GetZmin(), self.GetZmax()
+        return self.GetTmin(), self.GetTmax()
+
+    def fill_array(self, array, weights=None):
+        """
+        Fill this profile with a NumPy array of shape (N, ndim + 1) where the
+        last column holds the profiled values (y for a Profile, z for a
+        Profile2D and t for a Profile3D).
+
+        The sums of weights, of weighted values and of weighted squared
+        values are accumulated per bin with NumPy and added to the arrays of
+        the TProfile in one step instead of calling Fill for each entry.
+        """
+        import numpy as np
+        dim = self.GetDimension()
+        array = np.asarray(array, dtype=np.double)
+        if array.ndim != 2 or array.shape[1] != dim + 1:
+            raise ValueError(
+                "array must have shape (N, {0:d})".format(dim + 1))
+        if weights is None:
+            weights = np.ones(array.shape[0])
+        else:
+            weights = np.asarray(weights, dtype=np.double)
+            if weights.shape != (array.shape[0],):
+                raise ValueError("weights must have shape (N,)")
+            # as in TProfile::Fill
+            if (self.GetBinSumw2().GetSize() == 0 and
+                    not self.TestBit(ROOT.TH1.kIsNotW) and
+                    np.any(weights != 1)):
+                self.Sumw2()
+        low, high = self._profiled_range()
+        values = array[:, dim]
+        if low != high:
+            keep = (values >= low) & (values <= high)
+            array, values, weights = array[keep], values[keep], weights[keep]
+        if array.shape[0] == 0:
+            return
+        # read the statistics before any bin is modified since GetStats
+        # recomputes them from the bins of an empty profile or if an axis
+        # range is set
+        stats = _stats_array()
+        self.GetStats(stats)
+        coords = array[:, :dim]
+        # global bin index with x running fastest, including under- and
+        # overflow bins
+        index = np.zeros(array.shape[0], dtype=np.intp)
+        inside = np.ones(array.shape[0], dtype=bool)
+        stride = 1
+        for axis in range(dim):
+            nbins = self.nbins(axis)
+            ibin = np.searchsorted(
+                self.edges_array(axis), coords[:, axis], side='right')
+            inside &= (ibin >= 1) & (ibin <= nbins)
+            index += ibin * stride
+            stride *= nbins + 2
+        size = self.GetSize()
+        wy = weights * values
+
+        def bincount(w):
+            return np.bincount(index, weights=w, minlength=size)
+
+        sumw = bincount(weights)
+        np.ndarray((size,), dtype=np.double,
+                   buffer=self.GetArray())[:] += bincount(wy)
+        np.ndarray((size,), dtype=np.double,
+                   buffer=self.GetSumw2().GetArray())[:] += bincount(
+                       wy * values)
+        bin_sumw2 = self.GetBinSumw2()
+        if bin_sumw2.GetSize() == size:
+            np.ndarray((size,), dtype=np.double,
+                       buffer=bin_sumw2.GetArray())[:] += bincount(
+                           weights * weights)
+        # the bin entries are not exposed as an array
+        for ibin in np.flatnonzero(sumw):
+            ibin = int(ibin)
+            self.SetBinEntries(ibin, self.GetBinEntries(ibin) + sumw[ibin])
+        # update the statistics with the entries inside the axis ranges
+        w = weights[inside]
+        x = coords[inside]
+        v = values[inside]
+        terms = [w, w * w]
+        for axis in range(min(dim, 2)):
+            terms += [w * x[:, axis], w * x[:, axis] ** 2]
+        if dim > 1:
+            terms.append(w * x[:, 0] * x[:, 1])
+        if dim > 2:
+            terms += [w * x[:, 2], w * x[:, 2] ** 2,
+                      w * x[:, 0] * x[:, 2], w * x[:, 1] * x[:, 2]]
+        terms += [w * v, w * v * v]
+        for i, term in enumerate(terms):
+            stats[i] += term.sum()
+        self.PutStats(stats)
+        self.SetEntries(self.GetEntries() + array.shape[0])
+
+    def bin_entries_array(self, overflow=False):
+        """
+        Return the sum of weights in each bin as a NumPy array
+        """
+        import numpy as np
+        size = self.GetSize()
+        entries = np.fromiter(
+            map(self.GetBinEntries, range(size)),
+            dtype=np.double, count=size)
+        return self._shaped(entries, overflow=overflow)
+
+    def _bin_sums(self):
+        import numpy as np
+        size = self.GetSize()
+        sumwy = np.ndarray((size,), dtype=np.double,
+                           buffer=self.GetArray())
+        sumwy2 = np.ndarray((size,), dtype=np.double,
+                            buffer=self.GetSumw2().GetArray())
+        sumw = self.bin_entries_array(overflow=True).ravel(order='F')
+        return sumw, sumwy, sumwy2
+
+    def means_array(self, overflow=False):
+        """
+        Return the mean of the profiled values in each bin (the bin contents)
+        as a NumPy array. Empty bins are zero.
+        """
+        import numpy as np
+        sumw, sumwy, _ = self._bin_sums()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.where(sumw != 0, sumwy / sumw, 0.)
+        return self._shaped(means, overflow=overflow)
+
+    contents_array = means_array
+
+    def spreads_array(self, overflow=False):
+        """
+        Return the standard deviation of the profiled values in each bin as
+        a NumPy array. Empty bins are zero. Unlike GetBinError with the
+        "s" option, bins with a single entry are not given the average spread
+        of the other bins.
+        """
+        import numpy as np
+        sumw, sumwy, sumwy2 = self._bin_sums()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.where(sumw != 0, sumwy / sumw, 0.)
+            spreads = np.where(
+                sumw != 0,
+                np.sqrt(np.abs(sumwy2 / sumw - means * means)), 0.)
+        return self._shaped(spreads, overflow=overflow)
 
 
 class Profile(_ProfileBase, _Hist, QROOT.TProfile):
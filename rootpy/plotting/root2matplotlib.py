@@ -18,12 +18,9 @@ from __future__ import absolute_import
 import ROOT
 ROOT.kTRUE
 
-from math import sqrt
-try:
-    from itertools import izip as zip
-except ImportError: # will be 3.x series
-    pass
 import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection, LineCollection
+from matplotlib.colors import colorConverter
 import numpy as np
 
 from ..extern.six.moves import range
@@ -146,6 +143,7 @@ def hist(hists,
          logy=None,
          snap=True,
          axes=None,
+         collection=False,
          **kwargs):
     """
     Make a matplotlib hist plot from a ROOT histogram, stack or
@@ -191,6 +189,14 @@ def hist(hists,
     axes : matplotlib Axes instance, optional (default=None)
         The axes to plot on. If None then use the global current axes.
 
+    collection : bool, optional (default=False)
+        If True and a stack or list of histograms is plotted, then the bin
+        contents of all histograms are stacked with NumPy and drawn as a single
+        PolyCollection for the filled regions and a single LineCollection for
+        the edges instead of separate artists for each histogram. This is much
+        faster for stacks of many histograms. Hatched fill styles are not
+        supported in this mode.
+
     kwargs : additional keyword arguments, optional
         All additional keyword arguments are passed to matplotlib's
         fill_between for the filled regions and matplotlib's step function
@@ -200,7 +206,9 @@ def hist(hists,
     -------
 
     The return value from matplotlib's hist function, or list of such return
-    values if a stack or list of histograms was plotted.
+    values if a stack or list of histograms was plotted. If ``collection`` is
+    True then a list of legend proxies (one per histogram), the PolyCollection
+    and the LineCollection are returned.
 
     """
     if axes is None:
@@ -222,6 +230,22 @@ def hist(hists,
                     yerror_in_padding=yerror_in_padding,
                     snap=snap,
                     logy=logy)
+    elif collection:
+        hists = list(_maybe_reversed(hists, reverse))
+        returns = _hist_collection(hists, stacked=stacked,
+                                   axes=axes, logy=logy, **kwargs)
+        if stacked:
+            bounds_hist = sum(hists)
+        else:
+            bounds_hist = max(hists, key=lambda h: h.max())
+        _set_bounds(bounds_hist, axes=axes,
+                    was_empty=was_empty,
+                    prev_xlim=curr_xlim,
+                    prev_ylim=curr_ylim,
+                    xpadding=xpadding, ypadding=ypadding,
+                    yerror_in_padding=yerror_in_padding,
+                    snap=snap,
+                    logy=logy)
     elif stacked:
         # draw the top histogram first so its edges don't cover the histograms
         # beneath it in the stack
@@ -304,6 +328,95 @@ def _hist(h, axes=None, bottom=None, logy=None, zorder=None, **kwargs):
     return proxy, s[0]
 
 
+def _hist_collection(hists, stacked=True, axes=None, logy=None,
+                     zorder=None, **kwargs):
+    if axes is None:
+        axes = plt.gca()
+    if zorder is None:
+        zorder = _get_highest_zorder(axes) + 1
+    edges = hists[0].edges_array()
+    contents = np.array([h.contents_array() for h in hists])
+    if contents.shape[1] != len(edges) - 1:
+        raise ValueError("histograms must have the same number of bins")
+    if stacked:
+        tops = np.cumsum(contents, axis=0)
+        bottoms = tops - contents
+    else:
+        tops = contents
+        bottoms = np.zeros_like(contents)
+    if logy:
+        np.clip(tops, 1E-300, 1E300, out=tops)
+        np.clip(bottoms, 1E-300, 1E300, out=bottoms)
+    # step outlines of all histograms at once
+    x = np.repeat(edges, 2)[1:-1]
+    top_y = np.repeat(tops, 2, axis=1)
+    bottom_y = np.repeat(bottoms, 2, axis=1)
+    nhists = len(hists)
+    polygons = np.empty((nhists, 2 * len(x), 2))
+    polygons[:, :len(x), 0] = x
+    polygons[:, :len(x), 1] = top_y
+    polygons[:, len(x):, 0] = x[::-1]
+    polygons[:, len(x):, 1] = bottom_y[:, ::-1]
+    lines = np.empty((nhists, len(x) + 1, 2))
+    lines[:, :-1, 0] = x
+    lines[:, :-1, 1] = top_y
+    lines[:, -1, 0] = edges[-1]
+    lines[:, -1, 1] = 0.
+    facecolors = []
+    edgecolors = []
+    linewidths = []
+    linestyles = []
+    proxies = []
+    visible = []
+    for h in hists:
+        kwargs_local = kwargs.copy()
+        _set_defaults(h, kwargs_local, ['common', 'line', 'fill'])
+        if 'hatch' in kwargs_local:
+            raise ValueError(
+                "hatched fill styles are not supported with collection=True")
+        alpha = kwargs_local['alpha']
+        fill = kwargs_local.pop('fill', False)
+        visible.append(kwargs_local['visible'])
+        if fill:
+            facecolors.append(colorConverter.to_rgba(
+                kwargs_local['facecolor'], alpha))
+        else:
+            facecolors.append((0., 0., 0., 0.))
+        edgecolors.append(colorConverter.to_rgba(
+            kwargs_local.get('color') or kwargs_local['edgecolor'], alpha))
+        linewidths.append(kwargs_local['linewidth'])
+        linestyles.append(kwargs_local['linestyle'])
+        # draw the legend proxy
+        if getattr(h, 'legendstyle', '').upper() == 'F':
+            kwargs_local['fill'] = fill
+            proxy = plt.Rectangle((0, 0), 0, 0, **kwargs_local)
+            axes.add_patch(proxy)
+        else:
+            proxy = plt.Line2D((0, 0), (0, 0),
+                               linestyle=kwargs_local['linestyle'],
+                               linewidth=kwargs_local['linewidth'],
+                               color=kwargs_local['edgecolor'],
+                               alpha=alpha,
+                               label=kwargs_local['label'])
+            axes.add_line(proxy)
+        proxies.append(proxy)
+    visible = np.array(visible, dtype=bool)
+    fills = PolyCollection(
+        polygons[visible],
+        facecolors=[c for c, v in zip(facecolors, visible) if v],
+        edgecolors='none', linewidths=0,
+        zorder=zorder)
+    outlines = LineCollection(
+        lines[visible],
+        colors=[c for c, v in zip(edgecolors, visible) if v],
+        linewidths=[w for w, v in zip(linewidths, visible) if v],
+        linestyles=[s for s, v in zip(linestyles, visible) if v],
+        zorder=zorder + 1)
+    axes.add_collection(fills)
+    axes.add_collection(outlines)
+    return proxies, fills, outlines
+
+
 def bar(hists,
         stacked=True,
         reverse=False,
@@ -415,14 +528,15 @@ def bar(hists,
                     logy=logy)
     elif stacked is True:
         nhists = len(hists)
-        hlist = _maybe_reversed(hists, reverse)
-        toterr = bottom = None
+        hlist = list(_maybe_reversed(hists, reverse))
+        # stack all bin contents at once
+        tops = np.cumsum([h.contents_array() for h in hlist], axis=0)
+        toterr = None
         if yerr == 'linear':
-            toterr = [sum([h.GetBinError(i) for h in hists])
-                      for i in range(1, hists[0].nbins(0) + 1)]
+            toterr = np.sum([h.errors_array() for h in hlist], axis=0)
         elif yerr == 'quadratic':
-            toterr = [sqrt(sum([h.GetBinError(i) ** 2 for h in hists]))
-                      for i in range(1, hists[0].nbins(0) + 1)]
+            toterr = np.sqrt(np.sum(
+                [h.errors_array() ** 2 for h in hlist], axis=0))
         for i, h in enumerate(hlist):
             err = None
             if yerr is True:
@@ -432,13 +546,9 @@ def bar(hists,
             returns.append(_bar(
                 h,
                 xerr=xerr, yerr=err,
-                bottom=list(bottom.y()) if bottom else None,
+                bottom=tops[i - 1] if i > 0 else None,
                 axes=axes, **kwargs))
-            if bottom is None:
-                bottom = h.Clone()
-            else:
-                bottom += h
-        _set_bounds(bottom, axes=axes,
+        _set_bounds(sum(hlist), axes=axes,
                     was_empty=was_empty,
                     prev_xlim=curr_xlim,
                     prev_ylim=curr_ylim,
@@ -466,15 +576,16 @@ def bar(hists,
 def _bar(h, roffset=0., rwidth=1., xerr=None, yerr=None, axes=None, **kwargs):
     if axes is None:
         axes = plt.gca()
+    edges = h.edges_array()
+    binwidth = np.diff(edges)
     if xerr:
-        xerr = np.array([list(h.xerrl()), list(h.xerrh())])
-    if yerr:
-        yerr = np.array([list(h.yerrl()), list(h.yerrh())])
+        xerr = np.tile(binwidth / 2., (2, 1))
+    if yerr is True:
+        yerr = np.tile(h.errors_array(), (2, 1))
     _set_defaults(h, kwargs, ['common', 'line', 'fill', 'errors'])
-    width = [x * rwidth for x in h.xwidth()]
-    left = [h.xedgesl(i) + h.xwidth(i) * roffset
-            for i in range(1, h.nbins(0) + 1)]
-    height = list(h.y())
+    width = binwidth * rwidth
+    left = edges[:-1] + binwidth * roffset
+    height = h.contents_array()
     return axes.bar(left, height, width=width, xerr=xerr, yerr=yerr, **kwargs)
 
 
@@ -583,12 +694,21 @@ def _errorbar(h, xerr, yerr, axes=None, emptybins=True, zorder=None, **kwargs):
     if zorder is None:
         zorder = _get_highest_zorder(axes) + 1
     _set_defaults(h, kwargs, ['common', 'errors', 'errorbar', 'marker'])
-    if xerr:
-        xerr = np.array([list(h.xerrl()), list(h.xerrh())])
-    if yerr:
-        yerr = np.array([list(h.yerrl()), list(h.yerrh())])
-    x = np.array(list(h.x()))
-    y = np.array(list(h.y()))
+    if isinstance(h, _Hist):
+        edges = h.edges_array()
+        x = (edges[:-1] + edges[1:]) / 2.
+        y = h.contents_array()
+        if xerr:
+            xerr = np.tile(np.diff(edges) / 2., (2, 1))
+        if yerr:
+            yerr = np.tile(h.errors_array(), (2, 1))
+    else:
+        if xerr:
+            xerr = np.array([list(h.xerrl()), list(h.xerrh())])
+        if yerr:
+            yerr = np.array([list(h.yerrl()), list(h.yerrh())])
+        x = np.array(list(h.x()))
+        y = np.array(list(h.y()))
     if not emptybins:
         nonempty = y != 0
         x = x[nonempty]
@@ -635,10 +755,10 @@ def step(h, logy=None, axes=None, **kwargs):
     _set_defaults(h, kwargs, ['common', 'line'])
     if kwargs.get('color') is None:
         kwargs['color'] = h.GetLineColor('mpl')
-    y = np.array(list(h.y()) + [0.])
+    y = np.append(h.contents_array(), 0.)
     if logy:
         np.clip(y, 1E-300, 1E300, out=y)
-    return axes.step(list(h.xedges()), y, where='post', **kwargs)
+    return axes.step(h.edges_array(), y, where='post', **kwargs)
 
 
 def fill_between(a, b, logy=None, axes=None, **kwargs):
@@ -680,18 +800,11 @@ def fill_between(a, b, logy=None, axes=None, **kwargs):
         raise TypeError(
             "fill_between only operates on 1D histograms")
     a.check_compatibility(b, check_edges=True)
-    x = []
-    top = []
-    bottom = []
-    for abin, bbin in zip(a.bins(overflow=False), b.bins(overflow=False)):
-        up = max(abin.value, bbin.value)
-        dn = min(abin.value, bbin.value)
-        x.extend([abin.x.low, abin.x.high])
-        top.extend([up, up])
-        bottom.extend([dn, dn])
-    x = np.array(x)
-    top = np.array(top)
-    bottom = np.array(bottom)
+    a_values = a.contents_array()
+    b_values = b.contents_array()
+    x = np.repeat(a.edges_array(), 2)[1:-1]
+    top = np.repeat(np.maximum(a_values, b_values), 2)
+    bottom = np.repeat(np.minimum(a_values, b_values), 2)
     if logy:
         np.clip(top, 1E-300, 1E300, out=top)
         np.clip(bottom, 1E-300, 1E300, out=bottom)
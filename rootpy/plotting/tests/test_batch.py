@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+
+from rootpy.plotting import Hist, HistStack
+from rootpy.plotting.batch import PlotSpec, render
+from nose.tools import assert_equal, assert_raises, assert_true
+
+
+def _draw_hist(canvas, hist, **kwargs):
+    hist.Draw(**kwargs)
+
+
+def test_render():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        specs = []
+        for i in range(4):
+            h = Hist(10, -3, 3, name='hist_{0:d}'.format(i))
+            h.FillRandom('gaus')
+            output = os.path.join(tmpdir, '{0}.png'.format(h.name))
+            if i % 2:
+                specs.append(PlotSpec(output, h, style='ATLAS'))
+            else:
+                specs.append(PlotSpec(output, h, func=_draw_hist))
+        for processes in (1, 2):
+            outputs = render(specs, processes=processes)
+            assert_equal(sorted(outputs),
+                         sorted(spec.outputs[0] for spec in specs))
+            for output in outputs:
+                assert_true(os.path.isfile(output))
+                os.remove(output)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_render_processes():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        a = Hist(10, -3, 3, name='a')
+        a.FillRandom('gaus')
+        b = a.Clone(name='b')
+        stack = HistStack([a, b], name='stack')
+        specs = [PlotSpec(os.path.join(tmpdir, 'hist.png'), a),
+                 PlotSpec(os.path.join(tmpdir, 'stack.png'), [stack, b])]
+        outputs = render(specs, processes=2)
+        assert_equal(len(outputs), 2)
+        for output in outputs:
+            assert_true(os.path.isfile(output))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_render_errors():
+    assert_raises(ValueError, PlotSpec, [], Hist(1, 0, 1))
+    assert_raises(ValueError, PlotSpec, 'plot.png')
+    spec = PlotSpec('plot.png', None, func=_draw_hist)
+    assert_raises(RuntimeError, render, [spec], processes=1)
+
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule()
@@ -1,9 +1,11 @@
 from random import gauss, uniform
 from rootpy import ROOTVersion, ROOT_VERSION
-from rootpy.plotting import Hist, Hist2D, Hist3D, HistStack, Efficiency, Graph
+from rootpy.plotting import (Hist, Hist2D, Hist3D, HistSparse, HistStack,
+                             Efficiency, Graph)
 from rootpy.plotting import F2, F3
 from rootpy.utils.extras import LengthMismatch
 from rootpy.extern.six.moves import range
+from nose.plugins.skip import SkipTest
 from nose.tools import (raises, assert_equal, assert_almost_equal,
                         assert_raises, assert_true, assert_false)
 
@@ -278,6 +280,43 @@ def test_quantiles():
     h2d.quantiles(4, axis=1)
 
 
+def test_quantiles_vectorized():
+    try:
+        import numpy as np
+    except ImportError:
+        raise SkipTest("numpy is not installed")
+    from array import array
+    h = Hist([0, 1, 2, 4, 5, 7, 10])
+    for value, count in ((0.5, 3), (1.5, 1), (5.5, 4), (9, 2)):
+        for _ in range(count):
+            h.Fill(value)
+    qs = np.array([0, 0.1, 0.3, 0.4, 0.5, 0.75, 0.8, 1])
+    expected = array('d', [0.] * len(qs))
+    h.GetQuantiles(len(qs), expected, array('d', qs))
+    assert_true(np.allclose(h.quantiles(qs), list(expected)))
+
+
+def test_arrays():
+    try:
+        import numpy as np
+    except ImportError:
+        raise SkipTest("numpy is not importable")
+    h = Hist([1, 4, 10, 100], type='D')
+    h.FillRandom('gaus')
+    assert_equal(list(h.edges_array()), [1, 4, 10, 100])
+    assert_equal(list(h.contents_array()), list(h.y()))
+    assert_equal(list(h.errors_array()), list(h.yerravg()))
+    assert_equal(list(Hist(2, 0, 1).edges_array()), [0, .5, 1])
+
+    h2d = Hist2D(3, 0, 1, 4, -1, 1, type='I')
+    h2d.FillRandom(F2('x+y'))
+    contents = h2d.contents_array(overflow=True)
+    assert_equal(contents.shape, (5, 6))
+    for ix, iy, _ in h2d.bins_xyz(slice(None), slice(None), proxy=False):
+        assert_equal(contents[ix, iy], h2d.GetBinContent(ix, iy))
+    assert_equal(h2d.contents_array().shape, (3, 4))
+
+
 def test_compatibility():
     a = Hist(10, 0, 1)
     b = Hist(10, 0, 1)
@@ -399,6 +438,49 @@ def test_uniform_binned():
     assert_equal(h.integral(), h_uniform.integral())
 
 
+def test_sparse():
+    try:
+        import numpy as np
+    except ImportError:
+        raise SkipTest("numpy is not installed")
+    h = HistSparse((10, 0, 10), [0, 1, 5, 10], (4, -2, 2))
+    assert_equal(h.ndim, 3)
+    assert_equal(h.nbins(1), 3)
+    assert_equal(list(h.edges(1)), [0, 1, 5, 10])
+    values = np.array([[0.5, 0.5, -1.5],
+                       [0.5, 0.7, -1.5],
+                       [9.5, 7, 1.5],
+                       [-1, 3, 0]])
+    h.fill_array(values, weights=[1, 2, 3, 4])
+    assert_equal(h[1, 1, 1], 3)
+    assert_equal(h[10, 3, 4], 3)
+    # underflow along the first axis
+    assert_equal(h[0, 2, 3], 4)
+    assert_almost_equal(h.GetBinError(h.GetBin(np.array(
+        [1, 1, 1], dtype=np.int32))), np.sqrt(5))
+    assert_equal(h.GetNbins(), 3)
+    # arithmetic
+    assert_equal((h + h)[1, 1, 1], 6)
+    assert_equal((h * 2 - h)[1, 1, 1], 3)
+    assert_equal((h / 3)[10, 3, 4], 1)
+    assert_equal(sum([h, h, h])[1, 1, 1], 9)
+    # views
+    view = h[1:, :, :]
+    assert_equal(len(list(view)), 2)
+    h_view = HistSparse(view)
+    assert_equal(list(h_view.edges(0)), list(h.edges(0)))
+    # conversion to dense
+    assert_equal(h.to_array().shape, (10, 3, 4))
+    assert_equal(h.to_array().sum(), 6)
+    assert_raises(ValueError, h.to_array, max_bins=10)
+    h2 = HistSparse((10, 0, 10), (10, 0, 10))
+    h2.fill_array([[1.5, 2.5], [1.5, 2.5]])
+    dense = h2.to_dense()
+    assert_true(isinstance(dense, Hist2D))
+    assert_equal(dense[2, 3].value, 2)
+    assert_equal(dense.integral(), 2)
+
+
 if __name__ == "__main__":
     import nose
     nose.runmodule()
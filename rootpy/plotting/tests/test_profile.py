@@ -1,5 +1,6 @@
 from rootpy.plotting import Profile, Profile2D, Profile3D
-from nose.tools import raises
+from nose.plugins.skip import SkipTest
+from nose.tools import raises, assert_equal, assert_almost_equal, assert_true
 
 
 def test_init():
@@ -57,6 +58,58 @@ def test_init_profiled_edge_repeated():
     Profile([1, 10, 30], 1, 1)
 
 
+def test_fill_array():
+    try:
+        import numpy as np
+    except ImportError:
+        raise SkipTest("numpy is not installed")
+    random = np.random.RandomState(0)
+    data = np.column_stack((random.uniform(-1, 11, 1000),
+                            random.normal(size=1000)))
+    weights = random.uniform(0.5, 2, 1000)
+    expected = Profile(10, 0, 10)
+    for (x, y), w in zip(data, weights):
+        expected.Fill(x, y, w)
+    p = Profile(10, 0, 10)
+    p.fill_array(data[:500], weights[:500])
+    p.fill_array(data[500:], weights[500:])
+    assert_equal(p.GetEntries(), expected.GetEntries())
+    assert_almost_equal(p.GetMean(2), expected.GetMean(2))
+    assert_almost_equal(p.GetMean(), expected.GetMean())
+    for i in range(p.GetSize()):
+        assert_almost_equal(p.GetBinContent(i), expected.GetBinContent(i))
+        assert_almost_equal(p.GetBinError(i), expected.GetBinError(i))
+        assert_almost_equal(p.GetBinEntries(i), expected.GetBinEntries(i))
+    means = p.means_array()
+    assert_equal(means.shape, (10,))
+    assert_true(np.allclose(
+        means, [p.GetBinContent(i) for i in range(1, 11)]))
+    spread = Profile(10, 0, 10, option='s')
+    spread.fill_array(data)
+    assert_true(np.allclose(
+        spread.spreads_array(),
+        [spread.GetBinError(i) for i in range(1, 11)]))
+
+    # a single fill of an empty profile, and a fill with an axis range set
+    for xrange in (None, (3, 8)):
+        p = Profile(10, 0, 10)
+        expected = Profile(10, 0, 10)
+        if xrange is not None:
+            p.GetXaxis().SetRange(*xrange)
+            expected.GetXaxis().SetRange(*xrange)
+        for (x, y), w in zip(data, weights):
+            expected.Fill(x, y, w)
+        p.fill_array(data, weights)
+        for axis in (1, 2):
+            assert_almost_equal(p.GetMean(axis), expected.GetMean(axis))
+            assert_almost_equal(p.GetRMS(axis), expected.GetRMS(axis))
+
+    p2d = Profile2D(5, 0, 1, 5, 0, 1)
+    p2d.fill_array(random.uniform(size=(100, 3)))
+    assert_equal(p2d.means_array().shape, (5, 5))
+    assert_equal(p2d.bin_entries_array().sum(), 100)
+
+
 if __name__ == "__main__":
     import nose
     nose.runmodule()
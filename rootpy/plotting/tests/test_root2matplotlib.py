@@ -51,6 +51,8 @@ def test_hist():
     stack = HistStack([h, h1])
     rplt.hist(stack)
     rplt.hist([h, h1])
+    rplt.hist(stack, collection=True)
+    rplt.hist([h, h1], stacked=False, reverse=True, collection=True)
 
 
 @with_setup(setup_func)
@@ -1,5 +1,6 @@
-from rootpy.plotting.utils import _limits_helper
-from nose.tools import assert_equal, assert_raises
+from rootpy.plotting import Hist, HistStack
+from rootpy.plotting.utils import _limits_helper, get_limits
+from nose.tools import assert_equal, assert_raises, assert_true
 
 
 def test_limits():
@@ -9,6 +10,47 @@ def test_limits():
     assert_equal(_limits_helper(-1, 1, .1, .1, snap=True), (-1.25, 1.25))
 
 
+def test_get_limits():
+    h = Hist(10, 0, 1)
+    h.Fill(0.5, 10)
+    limits = get_limits(h, ypadding=0, yerror_in_padding=False)
+    assert_equal(limits, (0, 1, 0, 10))
+    # the limits follow modifications of the histogram
+    assert_equal(get_limits(h, ypadding=0, yerror_in_padding=False), limits)
+    h.Fill(0.5, 10)
+    assert_equal(get_limits(h, ypadding=0, yerror_in_padding=False),
+                 (0, 1, 0, 20))
+    h[2] = 30
+    assert_equal(get_limits(h, ypadding=0, yerror_in_padding=False),
+                 (0, 1, 0, 30))
+    xmin, xmax, ymin, ymax = get_limits(h, ypadding=0)
+    assert_true(ymax > 30)
+    # stacked and unstacked stacks
+    stack = HistStack([h, h.Clone()])
+    assert_equal(get_limits(stack, ypadding=0, yerror_in_padding=False),
+                 (0, 1, 0, 60))
+    stack = HistStack([h, h.Clone()], stacked=False)
+    assert_equal(get_limits(stack, ypadding=0, yerror_in_padding=False),
+                 (0, 1, 0, 30))
+    assert_true(stack.max(include_error=True) > 30)
+    # bin edits that keep the entries and the sum of weights
+    h = Hist(10, 0, 1)
+    h.SetBinContent(1, 10)
+    assert_equal(get_limits(h, ypadding=0, yerror_in_padding=False),
+                 (0, 1, 0, 10))
+    h.SetBinContent(1, 5)
+    h.SetBinContent(2, 5)
+    assert_equal(get_limits(h, ypadding=0, yerror_in_padding=False),
+                 (0, 1, 0, 5))
+    # stacked totals follow changes of the stacked histograms
+    stack = HistStack([h, h.Clone()])
+    assert_equal(get_limits(stack, ypadding=0, yerror_in_padding=False),
+                 (0, 1, 0, 10))
+    h.Scale(2)
+    assert_equal(get_limits(stack, ypadding=0, yerror_in_padding=False),
+                 (0, 1, 0, 15))
+
+
 if __name__ == "__main__":
     import nose
     nose.runmodule()
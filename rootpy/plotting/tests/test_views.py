@@ -0,0 +1,136 @@
+from rootpy import ROOT
+from rootpy.plotting import Hist
+from rootpy.plotting.views import (ScaleView, StyleView, TitleView, SumView,
+                                   StackView, CachedView, _file_groups)
+from rootpy.io import DoesNotExist
+from rootpy.io import TemporaryFile
+from nose.tools import (assert_equal, assert_true, assert_almost_equal,
+                        assert_raises)
+
+
+class Holder(object):
+    """
+    A directory-like object always returning the same histogram
+    """
+    def __init__(self, hist):
+        self.hist = hist
+
+    def Get(self, path):
+        return self.hist
+
+
+def test_fused_views():
+    a = Hist(10, 0, 1)
+    a.FillRandom('gaus', 100)
+    b = a.Clone()
+    cls = a.__class__
+    had_clone = 'Clone' in cls.__dict__
+    orig_clone = cls.Clone
+    clones = []
+
+    def Clone(self, *args, **kwargs):
+        clones.append(self)
+        return orig_clone(self, *args, **kwargs)
+
+    cls.Clone = Clone
+    try:
+        view = TitleView(ScaleView(StyleView(
+            SumView(Holder(a), Holder(b)), color='red'), 0.5), 'sum')
+        hist = view.Get('hist')
+    finally:
+        if had_clone:
+            cls.Clone = orig_clone
+        else:
+            del cls.Clone
+    # only one copy for the whole stack of views
+    assert_equal(len(clones), 1)
+    assert_almost_equal(hist.Integral(), a.Integral())
+    assert_equal(hist.GetTitle(), 'sum')
+    assert_equal(hist.GetLineColor('root'), hist.GetFillColor('root'))
+    # the originals are not modified
+    assert_equal(a.GetTitle(), '')
+    assert_almost_equal(a.Integral(), 100)
+
+
+def test_cached_view():
+    with TemporaryFile() as f:
+        h = Hist(10, 0, 1, name='hist')
+        h.Fill(0.5)
+        h.Write()
+        view = CachedView(ScaleView(f, 2), maxsize=1)
+        assert_equal(view.Get('hist').Integral(), 2)
+        hist = view.Get('hist')
+        assert_equal((view.hits, view.misses), (1, 1))
+        # copies are returned by default
+        hist.Scale(10)
+        assert_equal(view.Get('hist').Integral(), 2)
+        # writing to the file invalidates the cache
+        h.Fill(0.5)
+        h.Write('hist', h.kOverwrite)
+        assert_equal(view.Get('hist').Integral(), 4)
+        assert_equal(view.misses, 2)
+        # least recently used objects are discarded
+        h.Write('other')
+        view.Get('other')
+        view.Get('hist')
+        assert_equal(view.misses, 4)
+        assert_true(len(view._cache) == 1)
+
+
+def test_concurrent_views():
+    with TemporaryFile() as f:
+        dirs = []
+        for i in range(8):
+            d = f.mkdir('sample{0:d}'.format(i))
+            d.cd()
+            for name in ('a', 'b'):
+                h = Hist(10, 0, 1, name=name)
+                h.Fill(0.5, i + 1)
+                h.Write()
+            dirs.append(d)
+        total = sum(range(1, 9))
+        sumview = SumView(*[ScaleView(d, 2) for d in dirs], workers=4)
+        assert_equal(sumview.Get('a').Integral(), 2 * total)
+        sumview.prefetch(['a', 'b'])
+        assert_equal(sumview.Get('b').Integral(), 2 * total)
+        assert_equal(sumview.Get('a').Integral(), 2 * total)
+        # the order of a stack is preserved
+        stack = StackView(*dirs, workers=4).Get('a')
+        assert_equal([h.Integral() for h in stack], list(range(1, 9)))
+        # nested concurrent views
+        nested = SumView(SumView(*dirs[:4], workers=2),
+                         SumView(*dirs[4:], workers=2), workers=2)
+        assert_equal(nested.Get('a').Integral(), total)
+        assert_raises(DoesNotExist, sumview.Get, 'missing')
+        # all folders share one file and are read in a single group
+        assert_equal(_file_groups(dirs), [list(range(8))])
+
+
+def test_concurrent_files():
+    with TemporaryFile() as f1:
+        with TemporaryFile() as f2:
+            dirs = []
+            for i, f in enumerate((f1, f2, f1, f2)):
+                d = f.mkdir('sample{0:d}'.format(i))
+                d.cd()
+                h = Hist(10, 0, 1, name='a')
+                h.Fill(0.5, i + 1)
+                h.Write()
+                dirs.append(d)
+            assert_equal(_file_groups(dirs), [[0, 2], [1, 3]])
+            stack = StackView(*dirs, workers=2).Get('a')
+            assert_equal([h.Integral() for h in stack], [1, 2, 3, 4])
+            sumview = SumView(*dirs, workers=2)
+            sumview.prefetch(['a'])
+            # unread prefetched objects are discarded by the next prefetch
+            sumview.prefetch(['a'])
+            assert_equal(list(sumview._prefetched), ['a'])
+            assert_equal(sumview.Get('a').Integral(), 10)
+            assert_equal(sumview._prefetched, {})
+            # the GIL is only released by Get during the threaded reads
+            assert_true(not getattr(ROOT.TDirectory.Get, '_threaded', False))
+
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule()
@@ -194,6 +194,37 @@ def _limits_helper(x1, x2, a, b, snap=False):
     return x0, x3
 
 
+def _extent(contents, errors, edges, yerror_in_padding):
+    if yerror_in_padding:
+        ymin = (contents - errors).min()
+        ymax = (contents + errors).max()
+    else:
+        ymin = contents.min()
+        ymax = contents.max()
+    return float(edges[0]), float(edges[-1]), float(ymin), float(ymax)
+
+
+def _hist_extent(h, yerror_in_padding=True):
+    """
+    Return the (xmin, xmax, ymin, ymax) extent of a 1D histogram computed
+    over arrays of the bin contents and errors.
+    """
+    return _extent(h.contents_array(), h.errors_array(),
+                   h.edges_array(), yerror_in_padding)
+
+
+def _stack_extent(stack, yerror_in_padding=True):
+    """
+    Return the extent of the total of a stacked HistStack of 1D histograms
+    summed from the arrays of the histograms.
+    """
+    import numpy as np
+    contents = sum(h.contents_array() for h in stack)
+    errors = np.sqrt(sum(h.errors_array() ** 2 for h in stack))
+    return _extent(contents, errors, stack[0].edges_array(),
+                   yerror_in_padding)
+
+
 def get_limits(plottables,
                xpadding=0,
                ypadding=0.1,
@@ -278,18 +309,32 @@ def get_limits(plottables,
     ymin = float('+inf')
     ymax = float('-inf')
 
+    expanded = []
     for h in plottables:
-
         if isinstance(h, HistStack):
-            h = h.sum
+            if not h.stacked:
+                expanded.extend(h)
+            elif use_numpy and h.dim == 1 and len(h):
+                expanded.append(h)
+            else:
+                expanded.append(h.sum)
+        else:
+            expanded.append(h)
 
-        if not isinstance(h, (_Hist, _Graph1DBase)):
+    for h in expanded:
+
+        if isinstance(h, HistStack):
+            _xmin, _xmax, _ymin, _ymax = _stack_extent(
+                h, yerror_in_padding=yerror_in_padding)
+        elif not isinstance(h, (_Hist, _Graph1DBase)):
             raise TypeError(
                 "unable to determine plot axes ranges "
                 "from object of type `{0}`".format(
                     type(h)))
-
-        if use_numpy:
+        elif use_numpy and isinstance(h, _Hist):
+            _xmin, _xmax, _ymin, _ymax = _hist_extent(
+                h, yerror_in_padding=yerror_in_padding)
+        elif use_numpy:
             y_array_min = y_array_max = np.array(list(h.y()))
             if yerror_in_padding:
                 y_array_min = y_array_min - np.array(list(h.yerrl()))
@@ -319,7 +364,7 @@ def get_limits(plottables,
                     x_array_max = multiadd(x_array_max, list(h.xerrh()))
                 _xmin = min(x_array_min)
                 _xmax = max(x_array_max)
-        else:
+        elif not use_numpy:
             _xmin = h.xedgesl(1)
             _xmax = h.xedgesh(h.nbins(0))
 
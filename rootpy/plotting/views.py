@@ -21,6 +21,17 @@ Summary of views:
   of histograms
 - SubdirectoryView: A view of a subdirectory, which maintains the same view as
   the base.
+- CachedView: remember the objects retrieved from a view
+
+SumView, StackView and MultiFunctorView accept the keyword argument
+``workers``. If it is greater than one then the objects are read from
+folders in different files concurrently with a pool of threads, and
+``prefetch(paths)`` reads many paths at once ahead of the calls to Get().
+Folders sharing a file are always read one at a time.
+
+Views that modify objects (ScaleView, NormalizeView, StyleView and TitleView)
+copy each object once, even when several of them are stacked, and a SumView
+adds directly to a copy made by a view below it.
 
 Example use case
 ================
@@ -248,10 +259,33 @@ True
 >>> equivalent(histo1, histo2)
 False
 
+CachedView
+----------
+
+Scripts that request the same objects from views many times can remember
+them with a CachedView. By default a copy of the remembered object is
+returned each time.
+
+>>> cached = CachedView(dibosons, maxsize=100)
+>>> h1 = cached.Get("mutau_mass")
+>>> h2 = cached.Get("mutau_mass")
+>>> h1 is h2
+False
+>>> equivalent(h1, h2)
+True
+>>> cached.hits, cached.misses
+(1, 1)
+
 '''
 from __future__ import absolute_import
 
+import atexit
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+
 import ROOT
 
 from .base import Plottable
@@ -269,9 +303,32 @@ __all__ = [
     'MultiFunctorView',
     'PathModifierView',
     'SubdirectoryView',
+    'CachedView',
 ]
 
 
+def _get_owned(source, path):
+    """
+    Get the object at path from a directory or view and whether the caller
+    owns it, i.e. whether it is a private copy that may be modified in place.
+    """
+    for base in (_FolderView, _MultiFolderView):
+        # views that override Get() are asked through Get()
+        if isinstance(source, base) and not _overrides(source, 'Get', base):
+            return source._get(path)
+    return source.Get(path), False
+
+
+def _overrides(view, name, base):
+    """
+    Does the class of ``view`` override the method ``name`` of ``base``?
+    """
+    for cls in type(view).__mro__:
+        if name in cls.__dict__:
+            return cls is not base
+    return False
+
+
 class _FolderView(object):
     '''
     Abstract view of an individual folder
@@ -304,18 +361,182 @@ class _FolderView(object):
     def __str__(self):
         return "{0}('{1}')".format(self.__class__.__name__, self.path())
 
+    def _get(self, path):
+        self.getting = path
+        obj, _ = _get_owned(self.dir, path)
+        return self.apply_view(obj), False
+
     def Get(self, path):
         ''' Get the (modified) object from path '''
-        self.getting = path
         try:
-            obj = self.dir.Get(path)
-            return self.apply_view(obj)
+            return self._get(path)[0]
         except DoesNotExist as dne:
             #print dir(dne)
             raise DoesNotExist(
                 str(dne) + "[{0}]".format(self.__class__.__name__))
 
 
+class _ModifyingView(_FolderView):
+    '''
+    Abstract view of a folder which modifies a copy of each object.
+    Subclasses should define::
+
+        modify_view(self, obj)
+
+    which modifies obj in place, and optionally::
+
+        check_view(self, obj)
+
+    which raises an exception if obj cannot be handled by this view. When
+    such views are stacked, only one copy of the object is made for the whole
+    stack.
+    '''
+    def check_view(self, obj):
+        pass
+
+    def apply_view(self, obj):
+        self.check_view(obj)
+        clone = obj.Clone()
+        self.modify_view(clone)
+        return clone
+
+    def _get(self, path):
+        if _overrides(self, 'apply_view', _ModifyingView):
+            return super(_ModifyingView, self)._get(path)
+        self.getting = path
+        obj, owned = _get_owned(self.dir, path)
+        self.check_view(obj)
+        if not owned:
+            obj = obj.Clone()
+        self.modify_view(obj)
+        return obj, True
+
+
+# thread pools shared by all views, keyed by the number of threads
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+_LOCAL = threading.local()
+# the number of threaded reads in progress
+_THREADED_READS = 0
+
+
+def _set_release_gil(value):
+    for cls in (ROOT.TDirectory, ROOT.TDirectoryFile):
+        method = cls.Get
+        for attr in ('_threaded', '__release_gil__'):
+            try:
+                setattr(method, attr, value)
+            except (AttributeError, TypeError):
+                pass
+
+
+@contextmanager
+def _gil_released():
+    # let PyROOT release the GIL while objects are read by the threads of a
+    # pool so that reads from different files overlap. Get is restored when
+    # no threaded reads are in progress.
+    global _THREADED_READS
+    with _POOLS_LOCK:
+        if not _THREADED_READS:
+            _set_release_gil(True)
+        _THREADED_READS += 1
+    try:
+        yield
+    finally:
+        with _POOLS_LOCK:
+            _THREADED_READS -= 1
+            if not _THREADED_READS:
+                _set_release_gil(False)
+
+
+def _thread_pool(workers):
+    with _POOLS_LOCK:
+        pool = _POOLS.get(workers)
+        if pool is None:
+            if hasattr(ROOT.ROOT, 'EnableThreadSafety'):
+                ROOT.ROOT.EnableThreadSafety()
+            pool = _POOLS[workers] = ThreadPool(workers)
+    return pool
+
+
+@atexit.register
+def _close_pools():
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+        pool.join()
+
+
+def _fetch_groups(workers, tasks, unordered=False):
+    """
+    Generate the results of reading each group of tasks in the threads of a
+    pool, in the order of the tasks or as soon as they arrive
+    """
+    pool = _thread_pool(workers)
+    with _gil_released():
+        if unordered:
+            for group_results in pool.imap_unordered(_fetch_group, tasks):
+                yield group_results
+        else:
+            for group_results in pool.map(_fetch_group, tasks):
+                yield group_results
+
+
+def _concurrent(workers):
+    # nested views read sequentially within the threads of the outer view
+    # so that they never wait for threads of the same pool
+    return (workers is not None and workers > 1 and
+            not getattr(_LOCAL, 'in_pool', False))
+
+
+def _try_get(source, path):
+    # exceptions are passed back to the thread that asked for the object
+    try:
+        return _get_owned(source, path), None
+    except Exception as e:
+        return None, e
+
+
+def _fetch_group(tasks):
+    # only called in the threads of a pool. ROOT does not support reading
+    # one file from several threads, so the folders of a group (which share
+    # files) are read one after the other.
+    _LOCAL.in_pool = True
+    return [(key, _try_get(source, path)) for key, source, path in tasks]
+
+
+def _file_groups(sources):
+    """
+    Partition the indices of sources into groups such that no two groups
+    read from the same file. Sources that are not backed by any file are
+    put in one group.
+    """
+    groups = []
+    for index, source in enumerate(sources):
+        files = {}
+        _find_files(source, files)
+        names = set(files) or set([None])
+        indices = [index]
+        disjoint = []
+        for group_names, group_indices in groups:
+            if group_names & names:
+                names |= group_names
+                indices.extend(group_indices)
+            else:
+                disjoint.append((group_names, group_indices))
+        groups = disjoint + [(names, sorted(indices))]
+    return sorted(indices for _, indices in groups)
+
+
+def _unpack(results):
+    for result, error in results:
+        if error is not None:
+            raise error
+        yield result
+
+
 class _MultiFolderView(object):
     '''
     Abstract view of a collection of folders
@@ -329,35 +550,111 @@ class _MultiFolderView(object):
 
     The subclass can get access to the queried path via the self.getting
     variable.
+
+    If the keyword argument ``workers`` is greater than one, then the objects
+    are read concurrently with this many threads from folders in different
+    files. Folders sharing a file are read one at a time. This helps when the
+    folders are in different files on network storage.
     '''
-    def __init__(self, *directories):
+    # may the objects be merged in the order they are read?
+    _unordered = False
+
+    def __init__(self, *directories, **kwargs):
         self.dirs = directories
+        self.workers = kwargs.pop('workers', None)
+        self._prefetched = {}
+        self._groups = None
 
     def __str__(self):
         return "{0}({1})".format(
             self.__class__.__name__,
             ','.join(str(x) for x in self.dirs))
 
+    def prefetch(self, paths):
+        '''
+        Read the objects at all paths from all folders concurrently (if
+        ``workers`` is greater than one) and keep them for the next Get() of
+        each path. Objects prefetched earlier that were not read yet are
+        discarded.
+        '''
+        self._prefetched.clear()
+        groups = self._concurrent_groups()
+        if groups is None:
+            results = dict(
+                ((path, i), _try_get(x, path))
+                for path in paths for i, x in enumerate(self.dirs))
+        else:
+            tasks = [[((path, i), self.dirs[i], path)
+                      for path in paths for i in group]
+                     for group in groups]
+            results = dict(
+                item for group_results in _fetch_groups(self.workers, tasks)
+                for item in group_results)
+        for path in paths:
+            self._prefetched[path] = [
+                results[(path, i)] for i in range(len(self.dirs))]
+
+    def _concurrent_groups(self):
+        '''
+        Return the groups of folders read concurrently or None if the
+        folders are read sequentially
+        '''
+        if not _concurrent(self.workers):
+            return None
+        if self._groups is None:
+            self._groups = _file_groups(self.dirs)
+        if len(self._groups) < 2:
+            return None
+        return self._groups
+
+    def _get_all(self, path):
+        '''
+        Generate the objects at path in all folders and whether they are
+        owned by this view
+        '''
+        if path in self._prefetched:
+            return _unpack(self._prefetched.pop(path))
+        groups = self._concurrent_groups()
+        if groups is None:
+            return (_get_owned(x, path) for x in self.dirs)
+        tasks = [[(i, self.dirs[i], path) for i in group]
+                 for group in groups]
+        if self._unordered:
+            # merge as soon as the objects of each group arrive
+            return _unpack(
+                result for group_results in
+                _fetch_groups(self.workers, tasks, unordered=True)
+                for _, result in group_results)
+        results = dict(
+            item for group_results in _fetch_groups(self.workers, tasks)
+            for item in group_results)
+        return _unpack(results[i] for i in range(len(self.dirs)))
+
+    def _get(self, path):
+        self.getting = path
+        return self.merge_views(
+            obj for obj, _ in self._get_all(path)), False
+
     def Get(self, path):
         ''' Merge the objects at path in all subdirectories '''
-        return self.merge_views(x.Get(path) for x in self.dirs)
+        return self._get(path)[0]
 
 
-class ScaleView(_FolderView):
+class ScaleView(_ModifyingView):
     ''' View of a folder which applies a scaling factor to histograms. '''
     def __init__(self, directory, scale_factor):
         super(ScaleView, self).__init__(directory)
         self.factor = scale_factor
 
-    def apply_view(self, obj):
+    def modify_view(self, obj):
+        obj.Scale(self.factor)
+
+    def check_view(self, obj):
         if not hasattr(obj, 'Scale'):
             raise ValueError(
                 "`ScaleView` can't determine how to handle"
                 "an object of type `{0}`; "
                 "it has no `Scale` method".format(type(obj)))
-        clone = obj.Clone()
-        clone.Scale(self.factor)
-        return clone
 
 
 class NormalizeView(ScaleView):
@@ -368,17 +665,17 @@ class NormalizeView(ScaleView):
         super(NormalizeView, self).__init__(directory, None)
         self.norm = normalization
 
-    def apply_view(self, obj):
+    def modify_view(self, obj):
         current_norm = obj.Integral()
         # Update the scale factor (in the base)
         if current_norm > 0:
             self.factor = self.norm / current_norm
         else:
             self.factor = 0
-        return super(NormalizeView, self).apply_view(obj)
+        super(NormalizeView, self).modify_view(obj)
 
 
-class StyleView(_FolderView):
+class StyleView(_ModifyingView):
     '''
     View of a folder which applies a style to Plottable objects.
 
@@ -388,33 +685,33 @@ class StyleView(_FolderView):
         super(StyleView, self).__init__(directory)
         self.kwargs = kwargs
 
-    def apply_view(self, obj):
+    def modify_view(self, obj):
+        obj.decorate(**self.kwargs)
+
+    def check_view(self, obj):
         if not isinstance(obj, Plottable):
             raise TypeError(
                 "`ScaleView` can't determine how to handle "
                 "an object of type `{0}`; it is not a subclass of "
                 "`Plottable`".format(type(obj)))
-        clone = obj.Clone()
-        clone.decorate(**self.kwargs)
-        return clone
 
 
-class TitleView(_FolderView):
+class TitleView(_ModifyingView):
     ''' Override the title of gotten histograms '''
     def __init__(self, directory, title):
         self.title = title
         super(TitleView, self).__init__(directory)
 
-    def apply_view(self, obj):
-        clone = obj.Clone()
-        clone.SetTitle(self.title)
-        return clone
+    def modify_view(self, obj):
+        obj.SetTitle(self.title)
 
 
 class SumView(_MultiFolderView):
     ''' Add a collection of histograms together '''
-    def __init__(self, *directories):
-        super(SumView, self).__init__(*directories)
+    _unordered = True
+
+    def __init__(self, *directories, **kwargs):
+        super(SumView, self).__init__(*directories, **kwargs)
 
     def merge_views(self, objects):
         output = None
@@ -425,6 +722,19 @@ class SumView(_MultiFolderView):
                 output += obj
         return output
 
+    def _get(self, path):
+        if _overrides(self, 'merge_views', SumView):
+            return super(SumView, self)._get(path)
+        self.getting = path
+        output = None
+        for obj, owned in self._get_all(path):
+            if output is None:
+                # a private copy from a nested view can be added to directly
+                output = obj if owned else obj.Clone()
+            else:
+                output += obj
+        return output, output is not None
+
 
 class StackView(_MultiFolderView):
     '''
@@ -445,8 +755,8 @@ class StackView(_MultiFolderView):
     integral by passing the kwarg sorted=True.
     '''
     def __init__(self, *directories, **kwargs):
-        super(StackView, self).__init__(*directories)
-        self.sort = kwargs.get(sorted, False)
+        self.sort = kwargs.pop('sorted', False)
+        super(StackView, self).__init__(*directories, **kwargs)
 
     def merge_views(self, objects):
         output = None
@@ -481,9 +791,9 @@ class MultiFunctorView(_MultiFolderView):
 
     The function must take one argument, a generator of objects.
     '''
-    def __init__(self, f, *directories):
+    def __init__(self, f, *directories, **kwargs):
         self.f = f
-        super(MultiFunctorView, self).__init__(*directories)
+        super(MultiFunctorView, self).__init__(*directories, **kwargs)
 
     def merge_views(self, objects):
         return self.f(objects)
@@ -500,9 +810,13 @@ class PathModifierView(_FolderView):
         self.path_modifier = path_modifier
         super(PathModifierView, self).__init__(dir)
 
-    def Get(self, path):
+    def _get(self, path):
         newpath = self.path_modifier(path)
-        return super(PathModifierView, self).Get(newpath)
+        if _overrides(self, 'apply_view', PathModifierView):
+            return super(PathModifierView, self)._get(newpath)
+        self.getting = newpath
+        # the object is passed through unmodified
+        return _get_owned(self.dir, newpath)
 
     def apply_view(self, obj):
         ''' Do nothing '''
@@ -520,6 +834,95 @@ class SubdirectoryView(PathModifierView):
         super(SubdirectoryView, self).__init__(dir, functor)
 
 
+class CachedView(_FolderView):
+    '''
+    Remember the objects retrieved from a directory or view.
+
+    Up to ``maxsize`` objects are kept and the least recently used objects are
+    discarded first. If ``copy`` is True then a copy of the remembered object
+    is returned by each call to Get() so that it can be modified freely.
+    Otherwise the same object is returned each time. Views wrapping this view
+    always work on their own copy.
+
+    If ``check_modified`` is True then all remembered objects are discarded
+    when any of the files underlying the view changed since they were
+    retrieved. Objects in directories that are only in memory are not
+    checked; call invalidate() after modifying them.
+    '''
+    def __init__(self, directory, maxsize=128, copy=True, check_modified=True):
+        super(CachedView, self).__init__(directory)
+        self.maxsize = maxsize
+        self.copy = copy
+        self.check_modified = check_modified
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._files = None
+        self._stamp = None
+
+    def invalidate(self):
+        ''' Discard all remembered objects '''
+        self._cache.clear()
+        self._files = None
+        self._stamp = None
+
+    def _file_stamp(self):
+        if self._files is None:
+            files = {}
+            _find_files(self.dir, files)
+            self._files = sorted(files.items())
+        stamp = []
+        for name, rfile in self._files:
+            # the end of a file open for writing moves as objects are written
+            end = rfile.GetEND() if rfile else None
+            try:
+                stat = os.stat(name)
+            except OSError:
+                stamp.append((name, end))
+            else:
+                stamp.append((name, end, stat.st_mtime, stat.st_size))
+        return stamp
+
+    def _get(self, path):
+        self.getting = path
+        if self.check_modified:
+            stamp = self._file_stamp()
+            if stamp != self._stamp:
+                self._cache.clear()
+                self._stamp = stamp
+        if path in self._cache:
+            self.hits += 1
+            # mark as most recently used
+            obj = self._cache.pop(path)
+            self._cache[path] = obj
+        else:
+            self.misses += 1
+            obj, _ = _get_owned(self.dir, path)
+            self._cache[path] = obj
+            if self.maxsize is not None:
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        if self.copy and hasattr(obj, 'Clone'):
+            return obj.Clone(), True
+        return obj, False
+
+
+def _find_files(source, files):
+    """
+    Collect the files underlying a directory or view into a dict mapping the
+    file names to the files.
+    """
+    if isinstance(source, _FolderView):
+        _find_files(source.dir, files)
+    elif isinstance(source, _MultiFolderView):
+        for directory in source.dirs:
+            _find_files(directory, files)
+    elif isinstance(source, ROOT.TDirectory):
+        rfile = source.GetFile()
+        if rfile:
+            files[rfile.GetName()] = rfile
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -24,7 +24,8 @@ if ROOT_VERSION >= MIN_ROOT_VERSION:
                         measurements_from_xml,
                         write_measurement,
                         patch_xml,
-                        split_norm_shape)
+                        split_norm_shape,
+                        process_systematics)
 
     __all__ = [
         'Constraint',
@@ -45,6 +46,7 @@ if ROOT_VERSION >= MIN_ROOT_VERSION:
         'write_measurement',
         'patch_xml',
         'split_norm_shape',
+        'process_systematics',
     ]
 
     from ... import stl
@@ -12,7 +12,8 @@ from rootpy.stats.histfactory import *
 from rootpy.stats import histfactory
 
 from nose.plugins.attrib import attr
-from nose.tools import assert_raises, assert_equal, assert_true
+from nose.tools import (assert_raises, assert_equal, assert_true,
+                        assert_almost_equal)
 
 
 def get_random_hist():
@@ -90,6 +91,78 @@ def test_histfactory():
     assert_equal(shape.low[1].value, nominal[1].value)
 
 
+@requires_ROOT(histfactory.MIN_ROOT_VERSION, exception=SkipTest)
+def test_process_systematics():
+    try:
+        import numpy
+    except ImportError:
+        raise SkipTest("numpy is not importable")
+
+    nominal = get_random_hist()
+    sample = Sample('QCD', hist=nominal)
+    sample.AddHistoSys(
+        HistoSys('norm', high=nominal * 1.5, low=nominal * 0.9))
+    sample.AddHistoSys(
+        HistoSys('tiny', high=nominal * 1.001, low=nominal * 0.999))
+    channel = Channel('VBF')
+    channel.AddSample(sample)
+    meas = Measurement('MyAnalysis')
+    meas.AddChannel(channel)
+
+    pruned = process_systematics(meas, prune_norm=0.01, prune_shape=1E-4)
+    sample = meas.GetChannel('VBF').GetSample('QCD')
+    # pure normalization variations leave no shape component
+    assert_equal(sample.histo_sys, [])
+    assert_true(sample.GetOverallSys('tiny') is None)
+    osys = sample.GetOverallSys('norm')
+    assert_almost_equal(osys.low, 0.9)
+    assert_almost_equal(osys.high, 1.5)
+    assert_equal(len(pruned), 3)
+
+
+@requires_ROOT(histfactory.MIN_ROOT_VERSION, exception=SkipTest)
+def test_write_measurement_deduplicate():
+    import os
+    import shutil
+    import tempfile
+
+    nominal = get_random_hist()
+    nominal.name = 'nominal'
+    sample = Sample('QCD', hist=nominal)
+    same = nominal.Clone(name='same')
+    other = nominal * 1.1
+    other.name = 'other'
+    sample.AddHistoSys(HistoSys('x', low=same, high=other))
+    stat_error = sample.GetStatError()
+    stat_error.Activate(True)
+    stat_error.SetUseHisto(True)
+    stat_error.SetErrorHist(nominal.Clone(name='errors'))
+    channel = Channel('VBF')
+    channel.data = Data('data', hist=get_random_hist())
+    channel.AddAdditionalData(Data('extra', hist=get_random_hist()))
+    channel.AddSample(sample)
+    meas = Measurement('MyAnalysis')
+    meas.AddChannel(channel)
+
+    output_path = tempfile.mkdtemp()
+    try:
+        write_measurement(meas, output_path=output_path,
+                          deduplicate=True, n_jobs=2, silence=True)
+        sample = meas.GetChannel('VBF').GetSample('QCD')
+        histosys = sample.GetHistoSys('x')
+        assert_equal(histosys.low_name, 'nominal')
+        assert_equal(histosys.low_path, sample.hist_path)
+        assert_equal(histosys.high_name, 'other')
+        assert_equal(sample.GetStatError().GetHistoName(), 'nominal')
+        extra = meas.GetChannel('VBF').additional_data[0]
+        assert_true(extra.hist_file)
+        assert_true(extra.hist_path.endswith('VBF/data/'))
+        assert_true(os.path.isdir(
+            os.path.join(output_path, 'xml_MyAnalysis')))
+    finally:
+        shutil.rmtree(output_path)
+
+
 if __name__ == "__main__":
     import nose
     nose.runmodule()
@@ -3,7 +3,9 @@ from __future__ import absolute_import
 import os
 import re
 import shutil
+import hashlib
 from glob import glob
+from multiprocessing.pool import ThreadPool
 
 import ROOT
 
@@ -26,6 +28,7 @@ __all__ = [
     'write_measurement',
     'patch_xml',
     'split_norm_shape',
+    'process_systematics',
 ]
 
 
@@ -173,6 +176,8 @@ def write_measurement(measurement,
                       output_suffix=None,
                       write_workspaces=False,
                       apply_xml_patches=True,
+                      deduplicate=False,
+                      n_jobs=1,
                       silence=False):
     """
     Write a measurement and RooWorkspaces for all contained channels
@@ -218,6 +223,16 @@ def write_measurement(measurement,
         XML and that hist2workspace, or any tool that later reads the XML will
         run from that same directory containing the ROOT file.
 
+    deduplicate : bool, optional (default=False)
+        If True then histograms with identical binning, contents and errors
+        are only written once and the XML references the shared copy.
+        Systematic variations that are identical to the nominal histogram
+        then no longer consume space in the output file.
+
+    n_jobs : int, optional (default=1)
+        The number of threads used to patch the XML files. Writing into the
+        ROOT file itself is always performed serially.
+
     silence : bool, optional (default=False)
         If True then capture and silence all stdout/stderr output from
         HistFactory.
@@ -254,7 +269,10 @@ def write_measurement(measurement,
         log.info("writing histograms and measurement in {0} ...".format(
             root_file.GetName()))
         with context():
-            measurement.writeToFile(root_file)
+            if deduplicate:
+                _write_deduplicated(measurement, root_file)
+            else:
+                measurement.writeToFile(root_file)
         # get modified measurement
         out_m = root_file.Get(measurement.name)
         log.info("writing XML in {0} ...".format(xml_path))
@@ -276,18 +294,105 @@ def write_measurement(measurement,
     if apply_xml_patches:
         # patch the output XML to avoid HistFactory bugs
         patch_xml(glob(os.path.join(xml_path, '*.xml')),
-                  root_file=os.path.basename(root_file.GetName()))
+                  root_file=os.path.basename(root_file.GetName()),
+                  n_jobs=n_jobs)
 
     if own_file:
         root_file.Close()
 
 
-def patch_xml(files, root_file=None, float_precision=3):
+def _hist_digest(hist):
     """
-    Apply patches to HistFactory XML output from PrintXML
+    Return a digest of the binning, contents and errors of a histogram
     """
-    if float_precision < 0:
-        raise ValueError("precision must be greater than 0")
+    sha = hashlib.sha1()
+    sha.update(hist.__class__.__name__.encode('utf-8'))
+    for axis in range(hist.GetDimension()):
+        sha.update(repr(list(hist._edges(axis=axis))).encode('utf-8'))
+    size = hist.GetSize()
+    sha.update(repr(list(map(
+        hist.GetBinContent, range(size)))).encode('utf-8'))
+    sha.update(repr(list(map(
+        hist.GetBinError, range(size)))).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def _write_deduplicated(measurement, root_file):
+    """
+    Write all histograms of a measurement into a ROOT file, storing each
+    unique histogram only once, and then write the measurement itself with
+    all histogram names and paths pointing at the stored copies. This
+    mirrors ``Measurement::writeToFile``.
+    """
+    file_name = root_file.GetName()
+    stored = {}
+    nduplicates = [0]
+
+    def dir_path(directory):
+        # same convention as Measurement::GetDirPath
+        path = directory.GetPath()
+        if ':' in path:
+            path = path.split(':', 1)[1]
+        return path + '/'
+
+    def store(hist, directory):
+        digest = _hist_digest(hist)
+        if digest in stored:
+            nduplicates[0] += 1
+            return stored[digest]
+        directory.cd()
+        hist.Write()
+        location = (dir_path(directory), hist.GetName())
+        stored[digest] = location
+        return location
+
+    for channel in measurement:
+        channel_dir = root_file.mkdir(channel.name)
+        data_dir = channel_dir.mkdir('data')
+        for data in [channel.data] + channel.additional_data:
+            if data.hist is None:
+                continue
+            data.hist_path, data.hist_name = store(data.hist, data_dir)
+            data.hist_file = file_name
+        for sample in channel:
+            sample_dir = channel_dir.mkdir(sample.name)
+            if sample.hist is not None:
+                sample.hist_path, sample.hist_name = store(
+                    sample.hist, sample_dir)
+                sample.hist_file = file_name
+            for hsys in sample.histo_sys + sample.histo_factors:
+                hsys.low_path, hsys.low_name = store(hsys.low, sample_dir)
+                hsys.high_path, hsys.high_name = store(hsys.high, sample_dir)
+                hsys.low_file = file_name
+                hsys.high_file = file_name
+            for ssys in sample.shape_sys:
+                hist = ssys.GetErrorHist()
+                if hist is None:
+                    continue
+                ssys.hist_path, ssys.hist_name = store(hist, sample_dir)
+                ssys.hist_file = file_name
+            for sfact in sample.shape_factors:
+                if not sfact.HasInitialShape():
+                    continue
+                path, name = store(
+                    asrootpy(sfact.GetInitialShape()), sample_dir)
+                sfact.SetHistoPath(path)
+                sfact.SetHistoName(name)
+                sfact.SetInputFile(file_name)
+            stat_error = sample.GetStatError()
+            if stat_error.GetUseHisto() and stat_error.GetErrHist():
+                path, name = store(
+                    asrootpy(stat_error.GetErrHist()), sample_dir)
+                stat_error.SetHistoPath(path)
+                stat_error.SetHistoName(name)
+                stat_error.SetInputFile(file_name)
+    root_file.cd()
+    measurement.Write()
+    log.info("wrote {0:d} unique histograms ({1:d} duplicates skipped)".format(
+        len(stored), nduplicates[0]))
+
+
+def _patch_xml_file(xmlfilename, root_file=None, float_precision=3):
 
     def fix_path(match):
         path = match.group(1)
@@ -298,60 +403,87 @@ def patch_xml(files, root_file=None, float_precision=3):
             new_path = ''
         return '<Input>{0}</Input>'.format(new_path)
 
-    for xmlfilename in files:
-        xmlfilename = os.path.abspath(os.path.normpath(xmlfilename))
-        patched_xmlfilename = '{0}.tmp'.format(xmlfilename)
-        log.info("patching {0} ...".format(xmlfilename))
-        fin = open(xmlfilename, 'r')
-        fout = open(patched_xmlfilename, 'w')
-        for line in fin:
-            if root_file is not None:
-                line = re.sub(
-                    'InputFile="[^"]*"',
-                    'InputFile="{0}"'.format(root_file), line)
-            line = line.replace(
-                '<StatError Activate="True"  InputFile=""  '
-                'HistoName=""  HistoPath=""  />',
-                '<StatError Activate="True" />')
-            line = re.sub(
-                '<Combination OutputFilePrefix="(\S*)" >',
-                '<Combination OutputFilePrefix="hist2workspace" >', line)
-            line = re.sub('\w+=""', '', line)
-            line = re.sub('\s+/>', ' />', line)
-            line = re.sub('(\S)\s+</', r'\1</', line)
-            # HistFactory bug:
-            line = re.sub('InputFileHigh="\S+"', '', line)
-            line = re.sub('InputFileLow="\S+"', '', line)
-            # HistFactory bug:
-            line = line.replace(
-                '<ParamSetting Const="True"></ParamSetting>', '')
-            # chop off floats to desired precision
+    patched_xmlfilename = '{0}.tmp'.format(xmlfilename)
+    log.info("patching {0} ...".format(xmlfilename))
+    fin = open(xmlfilename, 'r')
+    fout = open(patched_xmlfilename, 'w')
+    for line in fin:
+        if root_file is not None:
             line = re.sub(
-                r'"(\d*\.\d{{{0:d},}})"'.format(float_precision + 1),
-                lambda x: '"{0}"'.format(
-                    str(round(float(x.group(1)), float_precision))),
-                line)
-            line = re.sub('"\s\s+(\S)', r'" \1', line)
-            line = re.sub('<Input>(.*)</Input>', fix_path, line)
-            fout.write(line)
-        fin.close()
-        fout.close()
-        shutil.move(patched_xmlfilename, xmlfilename)
-        if not os.path.isfile(os.path.join(
-                              os.path.dirname(xmlfilename),
-                              'HistFactorySchema.dtd')):
-            rootsys = os.getenv('ROOTSYS', None)
-            if rootsys is not None:
-                dtdfile = os.path.join(rootsys, 'etc/HistFactorySchema.dtd')
-                target = os.path.dirname(xmlfilename)
-                if os.path.isfile(dtdfile):
-                    log.info("copying {0} to {1} ...".format(dtdfile, target))
-                    shutil.copy(dtdfile, target)
-                else:
-                    log.warning("{0} does not exist".format(dtdfile))
+                'InputFile="[^"]*"',
+                'InputFile="{0}"'.format(root_file), line)
+        line = line.replace(
+            '<StatError Activate="True"  InputFile=""  '
+            'HistoName=""  HistoPath=""  />',
+            '<StatError Activate="True" />')
+        line = re.sub(
+            '<Combination OutputFilePrefix="(\S*)" >',
+            '<Combination OutputFilePrefix="hist2workspace" >', line)
+        line = re.sub('\w+=""', '', line)
+        line = re.sub('\s+/>', ' />', line)
+        line = re.sub('(\S)\s+</', r'\1</', line)
+        # HistFactory bug:
+        line = re.sub('InputFileHigh="\S+"', '', line)
+        line = re.sub('InputFileLow="\S+"', '', line)
+        # HistFactory bug:
+        line = line.replace(
+            '<ParamSetting Const="True"></ParamSetting>', '')
+        # chop off floats to desired precision
+        line = re.sub(
+            r'"(\d*\.\d{{{0:d},}})"'.format(float_precision + 1),
+            lambda x: '"{0}"'.format(
+                str(round(float(x.group(1)), float_precision))),
+            line)
+        line = re.sub('"\s\s+(\S)', r'" \1', line)
+        line = re.sub('<Input>(.*)</Input>', fix_path, line)
+        fout.write(line)
+    fin.close()
+    fout.close()
+    shutil.move(patched_xmlfilename, xmlfilename)
+
+
+def patch_xml(files, root_file=None, float_precision=3, n_jobs=1):
+    """
+    Apply patches to HistFactory XML output from PrintXML
+
+    If `n_jobs` is greater than one then the files are patched concurrently
+    by that many threads.
+    """
+    if float_precision < 0:
+        raise ValueError("precision must be greater than 0")
+
+    files = [os.path.abspath(os.path.normpath(xmlfilename))
+             for xmlfilename in files]
+
+    def patch(xmlfilename):
+        _patch_xml_file(xmlfilename, root_file=root_file,
+                        float_precision=float_precision)
+
+    if n_jobs > 1 and len(files) > 1:
+        pool = ThreadPool(min(n_jobs, len(files)))
+        try:
+            pool.map(patch, files)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for xmlfilename in files:
+            patch(xmlfilename)
+
+    for target in sorted(set(os.path.dirname(f) for f in files)):
+        if os.path.isfile(os.path.join(target, 'HistFactorySchema.dtd')):
+            continue
+        rootsys = os.getenv('ROOTSYS', None)
+        if rootsys is not None:
+            dtdfile = os.path.join(rootsys, 'etc/HistFactorySchema.dtd')
+            if os.path.isfile(dtdfile):
+                log.info("copying {0} to {1} ...".format(dtdfile, target))
+                shutil.copy(dtdfile, target)
             else:
-                log.warning(
-                    "$ROOTSYS is not set so cannot find HistFactorySchema.dtd")
+                log.warning("{0} does not exist".format(dtdfile))
+        else:
+            log.warning(
+                "$ROOTSYS is not set so cannot find HistFactorySchema.dtd")
 
 
 def split_norm_shape(histosys, nominal_hist):
@@ -380,3 +512,183 @@ def split_norm_shape(histosys, nominal_hist):
                       low=n_dn / n_nominal if n_nominal != 0 else 1.,
                       high=n_up / n_nominal if n_nominal != 0 else 1.)
     return norm, shape
+
+
+def _hist_contents(hist):
+    """
+    Return the bin contents of a histogram, including the underflow and
+    overflow bins, as a NumPy array
+    """
+    import numpy as np
+    size = hist.GetSize()
+    return np.fromiter(
+        map(hist.GetBinContent, range(size)), dtype=np.double, count=size)
+
+
+def process_systematics(measurement,
+                        split=True,
+                        symmetrize=False,
+                        smooth_iterations=0,
+                        prune_norm=None,
+                        prune_shape=None):
+    """
+    Process all HistoSys of all samples in a Measurement at once.
+
+    For each sample the low and high variations of all HistoSys are gathered
+    into arrays and processed together with NumPy instead of one HistoSys at a
+    time with histogram clones. The histograms and systematics are modified in
+    place.
+
+    Parameters
+    ----------
+
+    measurement : Measurement
+        An asrootpy'd ``HistFactory::Measurement`` object
+
+    split : bool, optional (default=True)
+        Split each HistoSys into normalization (OverallSys) and shape
+        (HistoSys) components as in ``split_norm_shape``. If a sample already
+        contains an OverallSys of the same name then it is multiplied by the
+        normalization component.
+
+    symmetrize : bool, optional (default=False)
+        Replace the low and high variations of each HistoSys and OverallSys by
+        the average of their deviations from the nominal.
+
+    smooth_iterations : int, optional (default=0)
+        Smooth the deviations of each HistoSys from the nominal histogram
+        with this many iterations of the ``TH1::Smooth`` algorithm.
+        Only 1D histograms can be smoothed.
+
+    prune_norm : float, optional (default=None)
+        Remove OverallSys where both the low and high values deviate from
+        unity by less than this amount.
+
+    prune_shape : float, optional (default=None)
+        Remove HistoSys where the low and high variations deviate from the
+        nominal histogram by less than this relative amount in every bin.
+
+    Returns
+    -------
+
+    pruned : list
+        A list of (channel name, sample name, systematic name, kind) tuples
+        for each pruned systematic where kind is either 'norm' or 'shape'.
+
+    """
+    import numpy as np
+
+    pruned = []
+    for channel in measurement:
+        for sample in channel:
+            nominal = sample.hist
+            histosys = sample.histo_sys
+            if nominal is not None and histosys:
+                pruned.extend(
+                    (channel.name, sample.name, name, 'shape')
+                    for name in _process_histosys(
+                        sample, nominal, histosys,
+                        split=split,
+                        symmetrize=symmetrize,
+                        smooth_iterations=smooth_iterations,
+                        prune_shape=prune_shape))
+            overall_sys = sample.overall_sys
+            if not overall_sys:
+                continue
+            low = np.array([osys.low for osys in overall_sys])
+            high = np.array([osys.high for osys in overall_sys])
+            if symmetrize:
+                delta = (high - low) / 2.
+                for osys, d in zip(overall_sys, delta):
+                    osys.low = 1. - d
+                    osys.high = 1. + d
+                low, high = 1. - delta, 1. + delta
+            if prune_norm is not None:
+                prune = np.maximum(
+                    np.abs(low - 1.), np.abs(high - 1.)) < prune_norm
+                for osys in np.array(overall_sys, dtype=object)[prune]:
+                    sample.RemoveOverallSys(osys.name)
+                    pruned.append(
+                        (channel.name, sample.name, osys.name, 'norm'))
+    if pruned:
+        log.info("pruned {0:d} systematics".format(len(pruned)))
+    return pruned
+
+
+def _process_histosys(sample, nominal, histosys,
+                      split=True,
+                      symmetrize=False,
+                      smooth_iterations=0,
+                      prune_shape=None):
+    """
+    Process all HistoSys of one sample. Return the names of pruned HistoSys.
+    """
+    import numpy as np
+
+    nom = _hist_contents(nominal)
+    lows = [hsys.low for hsys in histosys]
+    highs = [hsys.high for hsys in histosys]
+    low = np.vstack([_hist_contents(hist) for hist in lows])
+    high = np.vstack([_hist_contents(hist) for hist in highs])
+    n_nom = nom.sum()
+    n_low = low.sum(axis=1)
+    n_high = high.sum(axis=1)
+
+    if split:
+        scale_low = np.ones_like(n_low)
+        np.divide(n_nom, n_low, out=scale_low, where=n_low != 0)
+        scale_high = np.ones_like(n_high)
+        np.divide(n_nom, n_high, out=scale_high, where=n_high != 0)
+        low *= scale_low[:, np.newaxis]
+        high *= scale_high[:, np.newaxis]
+        if n_nom != 0:
+            norm_low = n_low / n_nom
+            norm_high = n_high / n_nom
+        else:
+            norm_low = np.ones_like(n_low)
+            norm_high = np.ones_like(n_high)
+        for i, hsys in enumerate(histosys):
+            # scale the errors along with the contents
+            lows[i].Scale(scale_low[i])
+            highs[i].Scale(scale_high[i])
+            osys = sample.GetOverallSys(hsys.name)
+            if osys is not None:
+                osys.low *= norm_low[i]
+                osys.high *= norm_high[i]
+            else:
+                sample.AddOverallSys(OverallSys(
+                    hsys.name, low=norm_low[i], high=norm_high[i]))
+
+    if symmetrize:
+        delta = (high - low) / 2.
+        low = nom - delta
+        high = nom + delta
+
+    if smooth_iterations > 0:
+        if nominal.GetDimension() != 1:
+            raise ValueError("only 1D histograms can be smoothed")
+        nbins = nominal.GetNbinsX()
+        if nbins >= 3:
+            for var in (low, high):
+                delta = np.ascontiguousarray(var[:, 1:-1] - nom[1:-1])
+                for row in delta:
+                    ROOT.TH1.SmoothArray(nbins, row, smooth_iterations)
+                var[:, 1:-1] = nom[1:-1] + delta
+
+    for hists, contents in ((lows, low), (highs, high)):
+        for hist, row in zip(hists, contents):
+            entries = hist.GetEntries()
+            hist.SetContent(np.ascontiguousarray(row))
+            hist.SetEntries(entries)
+
+    pruned = []
+    if prune_shape is not None:
+        norm = np.where(nom != 0, np.abs(nom), 1.)
+        deviation = np.maximum(
+            (np.abs(low - nom) / norm).max(axis=1),
+            (np.abs(high - nom) / norm).max(axis=1))
+        for hsys, prune in zip(histosys, deviation < prune_shape):
+            if prune:
+                sample.RemoveHistoSys(hsys.name)
+                pruned.append(hsys.name)
+    return pruned
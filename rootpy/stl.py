@@ -59,6 +59,18 @@ Dictionary generation type inference is flexible and can be nested::
     >>> stl.map(str, 'TH1*')
     <class 'ROOT.map<string,TH1*,less<string>,allocator<pair<const string,TH1*> > >'>
 
+Many types can be compiled together into a single library, which is much
+faster than compiling each type separately::
+
+    >>> stl.generate_many(['map<int,vector<float> >',
+    ...                    'vector<TLorentzVector>'])
+
+The dictionaries loaded in a process can be exported into a bundle that batch
+jobs load instead of compiling anything::
+
+    >>> stl.export_bundle('dicts')  # at submission time
+    >>> stl.load_bundle('dicts')  # in the batch job
+
 """
 from __future__ import absolute_import
 
@@ -67,6 +79,9 @@ import inspect
 import hashlib
 import os
 import re
+import json
+import shutil
+import tempfile
 from os.path import join as pjoin, exists
 
 import ROOT
@@ -142,11 +157,34 @@ LINKDEF = '''\
 #endif
 '''
 
+LINKDEF_MANY = '''\
+%(includes)s
+#ifdef __CINT__
+#pragma link off all globals;
+#pragma link off all classes;
+#pragma link off all functions;
+#pragma link C++ nestedclasses;
+#pragma link C++ nestedtypedefs;
+%(classes)s#endif
+'''
+
+LINKDEF_CLASS = '''\
+#pragma link C++ class %(declaration)s;
+#pragma link C++ class %(declaration)s::*;
+'''
+
 NEW_DICTS = False
 LOOKUP_TABLE_NAME = 'lookup'
+BUNDLE_INDEX = 'index.json'
+# maps the dictionaries compiled in DICTS_PATH to their libraries
+CATALOG = 'catalog.json'
 
 # Initialized in initialize()
 LOADED_DICTS = {}
+# Libraries of the dictionaries in bundles loaded with load_bundle()
+BUNDLED_DICTS = {}
+# The catalog of DICTS_PATH as last read
+CATALOGED_DICTS = {}
 
 DICTS_PATH = os.path.join(userdata.BINARY_PATH, 'dicts')
 if not os.path.exists(DICTS_PATH):
@@ -315,6 +353,145 @@ def make_string(obj):
     return obj
 
 
+def _unique_name(declaration, headers=None):
+    """
+    Return the name identifying the dictionary of ``declaration`` compiled
+    with ``headers`` and the sorted list of headers.
+    """
+    if headers:
+        if isinstance(headers, string_types):
+            headers = headers.split(';')
+        headers = sorted(headers)
+        unique_name = ';'.join([declaration] + headers)
+    else:
+        headers = []
+        unique_name = declaration
+    return unique_name.replace(' ', ''), headers
+
+
+def _hash_name(name):
+    if sys.version_info[0] < 3:
+        return hashlib.sha512(name).hexdigest()[:16]
+    return hashlib.sha512(name.encode('utf-8')).hexdigest()[:16]
+
+
+def _includes(headers):
+    includes = ''
+    for header in headers:
+        if re.match('^<.+>$', header):
+            includes += '#include {0}\n'.format(header)
+        else:
+            includes += '#include "{0}"\n'.format(header)
+    return includes
+
+
+def _forget_unloaded_class(declaration):
+    if ROOT.gROOT.GetVersionInt() < 53403:
+        # check for this class in the global TClass list and remove it
+        # fixes infinite recursion in ROOT < 5.34.03
+        # (exact ROOT versions where this is required is unknown)
+        cls = ROOT.gROOT.GetClass(declaration)
+        if cls and not cls.IsLoaded():
+            log.debug("removing {0} from gROOT.GetListOfClasses()".format(
+                declaration))
+            ROOT.gROOT.GetListOfClasses().Remove(cls)
+
+
+def _load_library(path, what):
+    if ROOT.gInterpreter.Load(path) not in (0, 1):
+        raise RuntimeError(
+            "failed to load the library for '{0}' @ {1}".format(what, path))
+
+
+def _read_catalog():
+    try:
+        with open(pjoin(DICTS_PATH, CATALOG)) as catalog_file:
+            return json.load(catalog_file)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _add_to_catalog(unique_names, libname):
+    """
+    Record that the dictionaries of ``unique_names`` are in the library
+    ``libname`` in :const:`DICTS_PATH`
+    """
+    with lock(pjoin(DICTS_PATH, CATALOG + '.lock'),
+              poll_interval=1, max_age=60):
+        catalog = _read_catalog()
+        for unique_name in unique_names:
+            catalog[unique_name] = libname + '.so'
+        # replace the catalog atomically so that readers never see a
+        # partially written file
+        fd, tmp = tempfile.mkstemp(dir=DICTS_PATH, suffix='.json')
+        with os.fdopen(fd, 'w') as catalog_file:
+            json.dump(catalog, catalog_file, indent=2, sort_keys=True)
+        os.rename(tmp, pjoin(DICTS_PATH, CATALOG))
+    CATALOGED_DICTS.clear()
+    CATALOGED_DICTS.update(catalog)
+
+
+def _cataloged_library(unique_name):
+    """
+    Return the path of the library in :const:`DICTS_PATH` containing the
+    dictionary of ``unique_name`` or None if it was never compiled
+    """
+    if unique_name not in CATALOGED_DICTS:
+        # another process may have compiled it since the catalog was read
+        CATALOGED_DICTS.update(_read_catalog())
+    libfile = CATALOGED_DICTS.get(unique_name)
+    if libfile is None:
+        # compiled on its own before the catalog was introduced
+        libfile = _hash_name(unique_name) + '.so'
+    libpath = pjoin(DICTS_PATH, libfile)
+    if exists(libpath):
+        return libpath
+    return None
+
+
+def _load_cataloged(libpath, what):
+    """
+    Load a library of :const:`DICTS_PATH` and mark all dictionaries it
+    contains as loaded
+    """
+    _load_library(libpath, what)
+    libfile = os.path.basename(libpath)
+    for unique_name, cataloged in CATALOGED_DICTS.items():
+        if cataloged == libfile:
+            LOADED_DICTS[unique_name] = libpath
+
+
+def _compile(libname, source, what):
+    """
+    Write ``source`` and compile it into the library ``libname`` in
+    :const:`DICTS_PATH` unless another process already did so while we were
+    waiting for the lock on this library.
+    """
+    global NEW_DICTS
+    libpath = pjoin(DICTS_PATH, libname + '.so')
+    # Only processes building the same library wait for each other
+    with lock(pjoin(DICTS_PATH, libname + '.lock'),
+              poll_interval=5, max_age=60):
+        if exists(libpath):
+            log.debug("dictionary for {0} was generated by another "
+                      "process".format(what))
+            _load_library(libpath, what)
+            return
+        log.info("generating dictionary for {0} ...".format(what))
+        sourcepath = pjoin(DICTS_PATH, '{0}.C'.format(libname))
+        log.debug("source path: {0}".format(sourcepath))
+        with open(sourcepath, 'w') as sourcefile:
+            sourcefile.write(source)
+        log.debug("include path: {0}".format(
+            ROOT.gSystem.GetIncludePath()))
+        if (ROOT.gSystem.CompileMacro(
+                sourcepath, 'k-', libname, DICTS_PATH) != 1):
+            raise RuntimeError(
+                "failed to compile the library for '{0}'".format(
+                    sourcepath))
+    NEW_DICTS = True
+
+
 def generate(declaration, headers=None, has_iterators=False):
     """Compile and load the reflection dictionary for a type.
 
@@ -330,80 +507,244 @@ def generate(declaration, headers=None, has_iterators=False):
     has_iterators : bool
         If True, then include iterators in the dictionary generation.
     """
-    global NEW_DICTS
     # FIXME: _rootpy_dictionary_already_exists returns false positives
     # if a third-party module provides "incomplete" dictionaries.
     #if compiled._rootpy_dictionary_already_exists(declaration):
     #    log.debug("generate({0}) => already available".format(declaration))
     #    return
     log.debug("requesting dictionary for {0}".format(declaration))
+    unique_name, headers = _unique_name(declaration, headers)
     if headers:
-        if isinstance(headers, string_types):
-            headers = sorted(headers.split(';'))
         log.debug("using the headers {0}".format(', '.join(headers)))
-        unique_name = ';'.join([declaration] + headers)
-    else:
-        unique_name = declaration
-    unique_name = unique_name.replace(' ', '')
 
     # If the library is already loaded, do nothing
     if unique_name in LOADED_DICTS:
         log.debug("dictionary for {0} is already loaded".format(declaration))
         return
 
-    if sys.version_info[0] < 3:
-        libname = hashlib.sha512(unique_name).hexdigest()[:16]
-    else:
-        libname = hashlib.sha512(unique_name.encode('utf-8')).hexdigest()[:16]
-    libnameso = libname + ".so"
+    _forget_unloaded_class(declaration)
 
-    if ROOT.gROOT.GetVersionInt() < 53403:
-        # check for this class in the global TClass list and remove it
-        # fixes infinite recursion in ROOT < 5.34.03
-        # (exact ROOT versions where this is required is unknown)
-        cls = ROOT.gROOT.GetClass(declaration)
-        if cls and not cls.IsLoaded():
-            log.debug("removing {0} from gROOT.GetListOfClasses()".format(
-                declaration))
-            ROOT.gROOT.GetListOfClasses().Remove(cls)
+    # If a bundle containing this class was loaded, use it
+    if unique_name in BUNDLED_DICTS:
+        log.debug("loading bundled dictionary for {0}".format(declaration))
+        _load_library(BUNDLED_DICTS[unique_name], declaration)
+        LOADED_DICTS[unique_name] = BUNDLED_DICTS[unique_name]
+        return
 
-    # If a .so already exists for this class, use it.
-    if exists(pjoin(DICTS_PATH, libnameso)):
+    # If a .so already contains this class (alone or together with other
+    # types compiled by generate_many), use it.
+    libpath = _cataloged_library(unique_name)
+    if libpath is not None:
         log.debug("loading previously generated dictionary for {0}"
                     .format(declaration))
-        if (ROOT.gInterpreter.Load(pjoin(DICTS_PATH, libnameso))
-                not in (0, 1)):
-            raise RuntimeError(
-                "failed to load the library for '{0}' @ {1}".format(
-                    declaration, libname))
-        LOADED_DICTS[unique_name] = None
-        return
-
-    with lock(pjoin(DICTS_PATH, "lock"), poll_interval=5, max_age=60):
+        _load_cataloged(libpath, declaration)
+    else:
         # This dict was not previously generated so we must create it now
-        log.info("generating dictionary for {0} ...".format(declaration))
-        includes = ''
-        if headers is not None:
-            for header in headers:
-                if re.match('^<.+>$', header):
-                    includes += '#include {0}\n'.format(header)
-                else:
-                    includes += '#include "{0}"\n'.format(header)
+        libname = _hash_name(unique_name)
+        libpath = pjoin(DICTS_PATH, libname + '.so')
+        includes = _includes(headers)
         source = LINKDEF % locals()
-        sourcepath = os.path.join(DICTS_PATH, '{0}.C'.format(libname))
-        log.debug("source path: {0}".format(sourcepath))
-        with open(sourcepath, 'w') as sourcefile:
-            sourcefile.write(source)
-        log.debug("include path: {0}".format(
-            ROOT.gSystem.GetIncludePath()))
-        if (ROOT.gSystem.CompileMacro(
-                sourcepath, 'k-', libname, DICTS_PATH) != 1):
-            raise RuntimeError(
-                "failed to compile the library for '{0}'".format(
-                    sourcepath))
+        _compile(libname, source, declaration)
+        _add_to_catalog([unique_name], libname)
+    LOADED_DICTS[unique_name] = libpath
 
-    LOADED_DICTS[unique_name] = None
-    NEW_DICTS = True
+
+def _collect_types(cpptype, headers, found):
+    # children first so that nested types are linked before their parents
+    if not cpptype.params:
+        return
+    for child in cpptype.params:
+        _collect_types(child, headers, found)
+    declaration = str(cpptype)
+    type_headers = headers if headers is not None else cpptype.guess_headers
+    unique_name, type_headers = _unique_name(declaration, type_headers)
+    if unique_name not in found:
+        found[unique_name] = (declaration, type_headers)
+
+
+def generate_many(declarations, headers=None):
+    """Compile and load the reflection dictionaries for many types at once.
+
+    All types (including the template types nested within them) that do not
+    already have a dictionary are compiled together into a single library
+    with a single call to ACLiC. The types in each library are recorded in a
+    catalog in the dictionary cache, so any type compiled before (alone or
+    together with other types, in this or any other process) is loaded from
+    its library instead and only the remaining types are compiled.
+
+    Parameters
+    ----------
+    declarations : list
+        A list of type declarations (for example "vector<int>") or
+        ``(declaration, headers)`` pairs.
+    headers : str or list of str, optional (default=None)
+        A header file or list of header files used for all declarations that
+        are not given with their own headers. If None then the headers are
+        guessed for each type as in :meth:`CPPType.ensure_built`.
+
+    Returns
+    -------
+    libpath : str or None
+        The path to the library that was loaded or None if all dictionaries
+        were already available.
+    """
+    found = {}
+    for declaration in declarations:
+        decl_headers = headers
+        if not isinstance(declaration, string_types):
+            declaration, decl_headers = declaration
+        _collect_types(CPPType.from_string(declaration), decl_headers, found)
+
+    missing = []
+    for unique_name, (declaration, type_headers) in found.items():
+        if unique_name in LOADED_DICTS:
+            continue
+        if unique_name in BUNDLED_DICTS:
+            _load_library(BUNDLED_DICTS[unique_name], declaration)
+            LOADED_DICTS[unique_name] = BUNDLED_DICTS[unique_name]
+            continue
+        libpath = _cataloged_library(unique_name)
+        if libpath is not None:
+            # compiled by generate() or generate_many() before
+            _load_cataloged(libpath, declaration)
+            LOADED_DICTS[unique_name] = libpath
+            continue
+        missing.append(unique_name)
+    if not missing:
+        log.debug("all requested dictionaries are already available")
+        return None
+
+    missing.sort()
+    libname = _hash_name('\n'.join(missing))
+    libpath = pjoin(DICTS_PATH, libname + '.so')
+    what = ', '.join(found[name][0] for name in missing)
+    for name in missing:
+        _forget_unloaded_class(found[name][0])
+    if exists(libpath):
+        log.debug("loading previously generated dictionary for {0}"
+                  .format(what))
+        _load_library(libpath, what)
+    else:
+        all_headers = set()
+        linkdefs = []
+        for name in missing:
+            declaration, type_headers = found[name]
+            all_headers.update(type_headers)
+            linkdefs.append(LINKDEF_CLASS % locals())
+        source = LINKDEF_MANY % dict(
+            includes=_includes(sorted(all_headers)),
+            classes=''.join(linkdefs))
+        _compile(libname, source, what)
+    _add_to_catalog(missing, libname)
+    for name in missing:
+        LOADED_DICTS[name] = libpath
+    return libpath
+
+
+def export_bundle(path, declarations=None):
+    """Copy the dictionaries loaded in this process into a bundle.
+
+    A bundle is a directory containing the compiled libraries and an index
+    file mapping each type to its library. Batch jobs can load a bundle with
+    :func:`load_bundle` and then use all of its types without compiling
+    anything. The library names are hashes of the types they contain and
+    the index records a checksum of each library, so bundles built for the
+    same types can be safely merged into the same directory.
+
+    Parameters
+    ----------
+    path : str
+        The bundle directory. It is created if it does not exist.
+    declarations : list, optional (default=None)
+        If not None, first build the dictionaries for these declarations
+        with :func:`generate_many`.
+
+    Returns
+    -------
+    index : dict
+        The bundle index that was written.
+    """
+    if declarations is not None:
+        generate_many(declarations)
+    mkdir_p(path)
+    index_path = pjoin(path, BUNDLE_INDEX)
+    if exists(index_path):
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        if index['root_version'] != ROOT.gROOT.GetVersion():
+            raise ValueError(
+                "the bundle {0} was built with ROOT {1}".format(
+                    path, index['root_version']))
+    else:
+        index = {'root_version': ROOT.gROOT.GetVersion(),
+                 'dicts': {},
+                 'libraries': {}}
+    for unique_name, libpath in LOADED_DICTS.items():
+        if libpath is None:
+            continue
+        libname = os.path.splitext(os.path.basename(libpath))[0]
+        # copy the library together with any files ACLiC created alongside
+        # (e.g. the ROOT 6 rdict.pcm)
+        for filename in os.listdir(DICTS_PATH):
+            if (filename.startswith(libname) and
+                    not filename.endswith(('.lock', '.C', '.d'))):
+                shutil.copy2(pjoin(DICTS_PATH, filename),
+                             pjoin(path, filename))
+        index['dicts'][unique_name] = libname + '.so'
+        index['libraries'][libname + '.so'] = _file_digest(libpath)
+    with open(index_path, 'w') as index_file:
+        json.dump(index, index_file, indent=2, sort_keys=True)
+    log.info("exported {0:d} dictionaries in {1:d} libraries to {2}".format(
+        len(index['dicts']), len(index['libraries']), path))
+    return index
+
+
+def load_bundle(path, verify=True):
+    """Load a dictionary bundle created by :func:`export_bundle`.
+
+    The libraries are only loaded when one of their types is first requested
+    with :func:`generate` or :func:`generate_many` (or through the
+    templates in this module).
+
+    Parameters
+    ----------
+    path : str
+        The bundle directory.
+    verify : bool, optional (default=True)
+        If True then check the libraries against the checksums in the index.
+
+    Raises
+    ------
+    ValueError
+        If the bundle was built with a different version of ROOT or a
+        library does not match its checksum.
+    """
+    with open(pjoin(path, BUNDLE_INDEX)) as index_file:
+        index = json.load(index_file)
+    if index['root_version'] != ROOT.gROOT.GetVersion():
+        raise ValueError(
+            "the bundle {0} was built with ROOT {1} but ROOT {2} "
+            "is in use".format(
+                path, index['root_version'], ROOT.gROOT.GetVersion()))
+    if verify:
+        for libfile, digest in index['libraries'].items():
+            if _file_digest(pjoin(path, libfile)) != digest:
+                raise ValueError(
+                    "library {0} in bundle {1} is corrupted".format(
+                        libfile, path))
+    path = os.path.abspath(path)
+    for unique_name, libfile in index['dicts'].items():
+        BUNDLED_DICTS[unique_name] = pjoin(path, libfile)
+    log.debug("using {0:d} dictionaries from the bundle {1}".format(
+        len(index['dicts']), path))
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as libfile:
+        for block in iter(lambda: libfile.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 Template = QROOT.Template
@@ -447,3 +788,6 @@ class STLWrapper(object):
     string = QROOT.string
     CPPType = CPPType
     generate = staticmethod(generate)
+    generate_many = staticmethod(generate_many)
+    export_bundle = staticmethod(export_bundle)
+    load_bundle = staticmethod(load_bundle)
@@ -1,7 +1,7 @@
 import ROOT
 from rootpy.base import Object
 from rootpy.tests.utils import iter_rootpy_classes
-from rootpy import asrootpy
+from rootpy import asrootpy, asrootpy_many, profile_asrootpy
 from rootpy.io import MemFile
 from nose.tools import assert_equal, assert_true
 
@@ -25,6 +25,26 @@ def test_object():
                 clone = obj.Clone()
 
 
+def test_asrootpy_many():
+    from rootpy.plotting import Hist
+    from rootpy.matrix import Matrix
+    things = [ROOT.TH1F('h{0:d}'.format(i), '', 10, 0, 1) for i in range(5)]
+    things += [ROOT.TGraph(), ROOT.TH1F('h', '', 10, 0, 1), ROOT.TH1D()]
+    with profile_asrootpy() as stats:
+        converted = asrootpy_many(things)
+        converted.append(asrootpy(ROOT.TH1F()))
+    assert_equal(len(converted), len(things) + 1)
+    for thing, obj in zip(things, converted):
+        assert_true(obj is thing)
+        assert_true(isinstance(obj, Object))
+    assert_true(isinstance(converted[0], Hist.dynamic_cls('F')))
+    assert_equal(stats['TH1F'][0], 7)
+    # already converted objects are passed through
+    assert_true(asrootpy_many(converted[:1])[0] is converted[0])
+    # dynamic classes are only created once
+    assert_true(Matrix.dynamic_cls('float') is Matrix.dynamic_cls('float'))
+
+
 if __name__ == "__main__":
     import nose
     nose.runmodule()
@@ -15,3 +15,12 @@ def test_compiled():
     assert C.AnswerToLtUaE() == 42
     assert C.RootpyTestCompiled().blah() == 84
     assert C._rootpy_test() == "Hello, world"
+
+
+def test_build_all():
+    # everything registered above is compiled and cached
+    C.build_all(workers=2, modules=[])
+    for symbol in ("AnswerToLtUaE", "_rootpy_test"):
+        assert C.registered_code[symbol].compiled
+    # nothing left to do
+    assert C.build_all(modules=[]) == []
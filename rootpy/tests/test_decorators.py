@@ -59,6 +59,35 @@ def test_snake_case_methods_descriptor():
         assert_equal(type(getattr(B, member)), type(getattr(snakeB, member)))
 
 
+def test_snake_case_methods_lazy():
+
+    class A(object):
+        def SomeMethod(self): return 1
+        def OtherMethod(self): return 2
+
+    class B(A):
+        _ROOT = A
+        def __getattr__(self, attr):
+            if attr == 'dynamic':
+                return 3
+            raise AttributeError(attr)
+
+    snake_case_methods(B, lazy=True)
+    assert_true('some_method' not in B.__dict__)
+    b = B()
+    assert_equal(b.other_method(), 2)
+    assert_true('some_method' in B.__dict__)
+    # the original __getattr__ is still used
+    assert_equal(b.dynamic, 3)
+    assert_true(not hasattr(b, 'missing'))
+
+    class C(A):
+        _ROOT = A
+
+    snake_case_methods(C, lazy=False)
+    assert_true('some_method' in C.__dict__)
+
+
 class Foo(Object, ROOT.R.TH1D):
 
     @method_file_check
@@ -1,6 +1,8 @@
+import os
+
 import ROOT
 from rootpy import stl
-from rootpy.stl import CPPType, generate
+from rootpy.stl import CPPType, generate, generate_many
 from rootpy.testdata import get_file
 from rootpy.extern.pyparsing import ParseException
 
@@ -76,6 +78,48 @@ def test_stl():
 
     assert histptrmap["test"] is a
 
+
+@attr('slow')
+def test_generate_many():
+    import shutil
+    import tempfile
+    libpath = generate_many([
+        'map<int,vector<short> >',
+        ('vector<vector<unsigned short> >', '<vector>')])
+    # all nested types are in the library
+    for name in ('vector<short>', 'map<int,vector<short>>',
+                 'vector<unsignedshort>'):
+        assert any(key.startswith(name + ';')
+                   for key in stl.LOADED_DICTS), name
+    # nothing left to compile
+    assert_equal(generate_many(['map<int,vector<short> >']), None)
+    # the types of the library are found through the catalog by later
+    # calls, which only compile the types that are not cataloged yet
+    libfile = os.path.basename(libpath)
+    batch = [name for name, cataloged in stl._read_catalog().items()
+             if cataloged == libfile]
+    assert_equal(len(batch), 3)
+    for name in batch:
+        del stl.LOADED_DICTS[name]
+    CPPType.from_string('vector<short>').ensure_built()
+    for name in batch:
+        assert_equal(stl.LOADED_DICTS[name], libpath)
+    other = generate_many(['map<int,vector<short> >', 'vector<long>'])
+    assert other != libpath
+    catalog = stl._read_catalog()
+    assert_equal([name for name in catalog if catalog[name] == libfile],
+                 batch)
+    ROOT.std.map('int,vector<short>')()
+
+    bundle = tempfile.mkdtemp()
+    try:
+        index = stl.export_bundle(bundle)
+        assert libpath.endswith(tuple(index['libraries']))
+        stl.load_bundle(bundle)
+        assert set(index['dicts']) <= set(stl.BUNDLED_DICTS)
+    finally:
+        shutil.rmtree(bundle)
+
 """
 This test frequently fails on Travis due to os.fork() not being able to
 allocate memory. Disabling it for now until a solution is found.
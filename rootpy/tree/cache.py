@@ -0,0 +1,291 @@
+"""
+A local cache of decompressed branches stored as memory-mapped NumPy files.
+
+The first time a branch of a tree is read through the cache its values are
+written in the columnar format of :mod:`rootpy.tree.export`. Later reads of
+the same branch memory-map these files instead of decompressing the baskets
+again::
+
+    from rootpy.tree.cache import ColumnCache
+
+    cache = ColumnCache(max_size=20 * 1024 ** 3)
+    tree.use_column_cache(cache)
+    array = tree.to_array(['pt', 'eta'], selection='pt > 20')
+
+The cached columns of a tree are identified by the path and UUID of its file
+and by the path of the tree inside the file, so rewriting a file invalidates
+its columns. Only trees in files opened read-only are cached. When the cache
+grows beyond ``max_size`` the least recently used branches are removed.
+"""
+from __future__ import absolute_import
+
+import os
+from os.path import join as pjoin
+import json
+import shutil
+import hashlib
+import tempfile
+
+from .. import log; log = log[__name__]
+from ..extern.six import string_types
+from ..utils.path import mkdir_p
+from .export import INDEX, export_columns, load_columns
+
+__all__ = [
+    'ColumnCache',
+]
+
+
+def _branch_files(path, name):
+    return [filename for filename in (pjoin(path, name + '.npy'),
+                                      pjoin(path, name + '.offsets.npy'))
+            if os.path.exists(filename)]
+
+
+def _read_index(path):
+    try:
+        with open(pjoin(path, INDEX)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _write_index(path, index):
+    # replace the index atomically so that concurrent readers never see a
+    # partially written file
+    fd, tmp = tempfile.mkstemp(dir=path, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.rename(tmp, pjoin(path, INDEX))
+
+
+def _select_jagged(column, entries):
+    """
+    Return an object array of the arrays of a cached variable-length column
+    ``(values, offsets)`` in the selected entries. The values of all selected
+    entries are gathered with a single copy and split into views.
+    """
+    import numpy as np
+    values, offsets = column
+    entries = np.asarray(entries, dtype=np.intp)
+    if not len(entries):
+        return np.empty(0, dtype=object)
+    starts = offsets[entries]
+    lengths = offsets[entries + 1] - starts
+    ends = np.cumsum(lengths)
+    # the position of each selected value in values
+    index = (np.arange(ends[-1]) +
+             np.repeat(starts - (ends - lengths), lengths))
+    parts = np.split(values[index], ends[:-1])
+    # the trailing None keeps NumPy from stacking arrays of equal lengths
+    return np.array(parts + [None], dtype=object)[:-1]
+
+
+class ColumnCache(object):
+    """
+    A directory of memory-mapped branches.
+
+    Parameters
+    ----------
+
+    path : str, optional (default=None)
+        The cache directory. If None then ``column_cache`` in the rootpy user
+        data directory is used.
+
+    max_size : int, optional (default=None)
+        The maximum size of the cache in bytes. If None then the cache is not
+        limited.
+
+    """
+    def __init__(self, path=None, max_size=None):
+        if path is None:
+            from ..userdata import DATA_ROOT
+            path = pjoin(DATA_ROOT, 'column_cache')
+        mkdir_p(path)
+        self.path = path
+        self.max_size = max_size
+
+    def key(self, tree):
+        """
+        Return the name of the cache directory of a tree or None if the tree
+        cannot be cached
+        """
+        rfile = tree.GetCurrentFile()
+        if not rfile or not rfile.IsOpen() or rfile.IsWritable():
+            return None
+        uuid = rfile.GetUUID().AsString()
+        directory = tree.GetDirectory().GetPath().split(':', 1)[-1]
+        ident = '\n'.join([
+            os.path.abspath(rfile.GetName()), uuid,
+            directory, tree.GetName()])
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, tree, key):
+        path = pjoin(self.path, key)
+        index = _read_index(path)
+        if index is not None and index['entries'] != tree.GetEntries():
+            log.warning(
+                "the number of entries in tree `{0}` changed, clearing "
+                "its cached columns".format(tree.GetName()))
+            shutil.rmtree(path, ignore_errors=True)
+        mkdir_p(path)
+        return path
+
+    def columns(self, tree, branches):
+        """
+        Return the columns of branches of a tree as :func:`load_columns`
+        does, first writing the branches that are not cached yet
+
+        Returns None if the tree cannot be cached or is empty.
+        """
+        key = self.key(tree)
+        if key is None or tree.GetEntries() == 0:
+            return None
+        path = self._entry_path(tree, key)
+        index = _read_index(path) or dict(
+            tree=tree.GetName(), entries=tree.GetEntries(), branches=[])
+        cached = set(info['name'] for info in index['branches'])
+        missing = [name for name in branches if name not in cached]
+        if missing:
+            log.debug("caching branches {0} of tree `{1}`".format(
+                ', '.join(missing), tree.GetName()))
+            # write into a temporary directory first and move the files into
+            # place once they are complete
+            tmp = tempfile.mkdtemp(dir=path)
+            try:
+                export_columns(tree, tmp, branches=missing)
+                new = _read_index(tmp)['branches']
+                for info in new:
+                    for filename in _branch_files(tmp, info['name']):
+                        os.rename(filename, pjoin(
+                            path, os.path.basename(filename)))
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+            # another process may have updated the index meanwhile
+            index = _read_index(path) or index
+            cached = set(info['name'] for info in index['branches'])
+            index['branches'].extend(
+                info for info in new if info['name'] not in cached)
+            _write_index(path, index)
+        # the modification time of the files is the LRU stamp
+        for name in branches:
+            for filename in _branch_files(path, name):
+                os.utime(filename, None)
+        if missing and self.max_size is not None:
+            self.evict(keep=[(key, name) for name in branches])
+        return load_columns(path, branches=branches)
+
+    def to_array(self, tree, branches=None, selection=None,
+                 object_selection=None, start=None, stop=None, step=None,
+                 include_weight=False, weight_name='weight', cache_size=-1):
+        """
+        Convert a tree into a NumPy structured array like
+        ``root_numpy.tree2array``, reading the branches from the cache
+
+        Only the selection is evaluated by ROOT. Expressions that are not
+        branch names and the ``object_selection`` and ``include_weight``
+        arguments are not supported by the cache and fall back to
+        ``tree2array``.
+        """
+        import numpy as np
+        from root_numpy import tree2array
+        if branches is None:
+            names = list(tree.iterbranchnames())
+        else:
+            names = list(branches)
+        columns = None
+        if (object_selection is None and not include_weight and
+                not isinstance(branches, string_types) and
+                all(tree.has_branch(name) for name in names)):
+            columns = self.columns(tree, names)
+        if columns is None:
+            return tree2array(
+                tree, branches=branches, selection=selection,
+                object_selection=object_selection, start=start, stop=stop,
+                step=step, include_weight=include_weight,
+                weight_name=weight_name, cache_size=cache_size)
+        if selection:
+            entries = tree2array(
+                tree, branches=['Entry$'], selection=selection,
+                start=start, stop=stop, step=step, cache_size=cache_size)
+            entries = entries[entries.dtype.names[0]].astype(np.intp)
+        else:
+            entries = np.arange(tree.GetEntries())[start:stop:step]
+        dtype = []
+        for name in names:
+            column = columns[name]
+            if isinstance(column, tuple):
+                dtype.append((name, object))
+            else:
+                dtype.append((name, column.dtype, column.shape[1:]))
+        array = np.empty(len(entries), dtype=dtype)
+        for name in names:
+            column = columns[name]
+            if isinstance(column, tuple):
+                array[name] = _select_jagged(column, entries)
+            else:
+                array[name] = column[entries]
+        return array
+
+    def _iter_branches(self):
+        for key in os.listdir(self.path):
+            path = pjoin(self.path, key)
+            index = _read_index(path)
+            if index is None:
+                continue
+            for info in index['branches']:
+                files = _branch_files(path, info['name'])
+                if not files:
+                    continue
+                size = sum(os.path.getsize(filename) for filename in files)
+                stamp = os.path.getmtime(files[0])
+                yield key, info['name'], size, stamp
+
+    def size(self):
+        """
+        Return the size of all cached columns in bytes
+        """
+        return sum(size for _, _, size, _ in self._iter_branches())
+
+    def evict(self, max_size=None, keep=None):
+        """
+        Remove the least recently used branches until the cache is no larger
+        than ``max_size`` bytes (by default the ``max_size`` of the cache).
+        Branches listed in ``keep`` as ``(key, name)`` are never removed.
+        """
+        if max_size is None:
+            max_size = self.max_size
+        if max_size is None:
+            return
+        keep = set(keep or [])
+        branches = sorted(self._iter_branches(), key=lambda item: item[3])
+        total = sum(size for _, _, size, _ in branches)
+        removed = {}
+        for key, name, size, _ in branches:
+            if total <= max_size:
+                break
+            if (key, name) in keep:
+                continue
+            for filename in _branch_files(pjoin(self.path, key), name):
+                os.remove(filename)
+            removed.setdefault(key, set()).add(name)
+            total -= size
+        for key, names in removed.items():
+            path = pjoin(self.path, key)
+            index = _read_index(path)
+            index['branches'] = [info for info in index['branches']
+                                 if info['name'] not in names]
+            if index['branches']:
+                _write_index(path, index)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+        if removed:
+            log.debug("evicted {0:d} branches from the column cache".format(
+                sum(map(len, removed.values()))))
+
+    def clear(self):
+        """
+        Remove all cached columns
+        """
+        for key in os.listdir(self.path):
+            shutil.rmtree(pjoin(self.path, key), ignore_errors=True)
@@ -1,6 +1,10 @@
 from __future__ import absolute_import
 
+import os
+import glob
 import multiprocessing
+import threading
+import traceback
 import time
 
 from .. import log; log = log[__name__]
@@ -10,11 +14,16 @@ from ..utils.extras import humanize_bytes
 from ..context import preserve_current_directory
 from ..plotting.graph import _GraphBase
 from ..extern.six import string_types
+from ..extern.six.moves import queue
 from .filtering import EventFilterList
+from .instrument import LoopProfile
+from .entrylist import SelectionIndex
 
 __all__ = [
     'TreeChain',
     'TreeQueue',
+    'FileWatcher',
+    'process_queue',
 ]
 
 
@@ -26,14 +35,18 @@ class BaseTreeChain(object):
                  ignore_branches=None,
                  events=-1,
                  onfilechange=None,
+                 onfiledone=None,
                  read_branches_on_demand=False,
                  cache=False,
                  # 30 MB cache by default
                  cache_size=30000000,
                  learn_entries=10,
+                 on_demand_learn_entries=100,
                  always_read=None,
                  ignore_unsupported=False,
-                 filters=None):
+                 filters=None,
+                 profile=False,
+                 selection_index=None):
         self._name = name
         self._buffer = treebuffer
         self._branches = branches
@@ -51,8 +64,24 @@ class BaseTreeChain(object):
         if onfilechange is None:
             onfilechange = []
         self._filechange_hooks = onfilechange
+        if onfiledone is None:
+            onfiledone = []
+        self._filedone_hooks = onfiledone
+        # the statistics of each file that was read completely
+        self.file_stats = []
+        if profile is True:
+            profile = LoopProfile()
+        elif profile is False:
+            profile = None
+        self.profile = profile
+        if selection_index is True:
+            selection_index = SelectionIndex()
+        elif selection_index is False:
+            selection_index = None
+        self._selection_index = selection_index
 
         self._read_branches_on_demand = read_branches_on_demand
+        self._on_demand_learn_entries = on_demand_learn_entries
         self._use_cache = cache
         self._cache_size = cache_size
         self._learn_entries = learn_entries
@@ -129,6 +158,14 @@ class BaseTreeChain(object):
 
     draw = Draw
 
+    def reduce(self, reductions, **kwargs):
+        """
+        Compute several reductions over the trees of all files in a single
+        pass. See :func:`rootpy.tree.reduce.reduce` for the arguments.
+        """
+        from .reduce import reduce
+        return reduce(self, reductions, **kwargs)
+
     def __getattr__(self, attr):
         try:
             return getattr(self._tree, attr)
@@ -143,17 +180,45 @@ class BaseTreeChain(object):
         return self._tree.__contains__(branch)
 
     def __iter__(self):
+        return self._iterate()
+
+    def iterselected(self, selection):
+        """
+        Iterate over the entries of all files passing a selection. The
+        selection is evaluated once for each file before its iteration (or
+        looked up in the selection index, see ``selection_index``) so only
+        the passing entries are read. The filters are applied as usual.
+        """
+        return self._iterate(selection)
+
+    def _iterate(self, selection=None):
         passed_events = 0
         self.reset()
+        profile = self.profile
+        if profile is None:
+            filters = self._filters
+        else:
+            def filters(entry):
+                return profile.filter(self._filters, entry)
         while self._rollover():
             entries = 0
             total_entries = float(self._tree.GetEntries())
             t1 = time.time()
             t2 = t1
-            for entry in self._tree:
+            if selection is None:
+                source = self._tree
+            else:
+                source = self._tree.iterselected(selection)
+            if profile is None:
+                tree_entries = source
+            else:
+                profile.start_file(self._tree)
+                self._tree._buffer._profile = profile
+                tree_entries = profile.iterate(source)
+            for entry in tree_entries:
                 entries += 1
                 self.userdata = {}
-                if self._filters(entry):
+                if filters(entry):
                     yield entry
                     passed_events += 1
                     if self._events == passed_events:
@@ -167,16 +232,33 @@ class BaseTreeChain(object):
                             'ies' if entry_rate != 1 else 'y',
                             100 * entries / total_entries))
                     t2 = time.time()
+            if profile is not None:
+                tree_entries.close()
+                self._tree._buffer._profile = None
+                profile.end_file(self._tree, self._file, entries)
             if self._events == passed_events:
                 break
-            log.info("{0:d} entries per second".format(
-                int(entries / (time.time() - t1))))
+            stats = self._file_done(entries, time.time() - t1)
+            log.info("{0:d} entries per second".format(int(stats['rate'])))
             log.info("read {0:d} bytes in {1:d} transactions".format(
-                self._file.GetBytesRead(),
-                self._file.GetReadCalls()))
+                stats['bytes_read'], stats['read_calls']))
             self._total_events += entries
         self._filters.finalize()
 
+    def _file_done(self, entries, seconds):
+        stats = dict(
+            file=self._file.GetName(),
+            entries=entries,
+            bytes_read=self._file.GetBytesRead(),
+            read_calls=self._file.GetReadCalls(),
+            seconds=seconds,
+            rate=entries / seconds if seconds > 0 else 0.)
+        self.file_stats.append(stats)
+        for target, args in self._filedone_hooks:
+            target(*args, name=self._name, file=self._file, tree=self._tree,
+                   stats=stats)
+        return stats
+
     def _rollover(self):
         filename = self._next_file()
         if filename is None:
@@ -224,7 +306,9 @@ class BaseTreeChain(object):
             self._tree.SetCacheSize(self._cache_size)
             self._tree.SetCacheLearnEntries(self._learn_entries)
         self._tree.read_branches_on_demand = self._read_branches_on_demand
+        self._tree.on_demand_learn_entries = self._on_demand_learn_entries
         self._tree.always_read(self._always_read)
+        self._tree.use_selection_index(self._selection_index)
         self.weight = self._tree.GetWeight()
         for target, args in self._filechange_hooks:
             # run any user-defined functions
@@ -286,6 +370,11 @@ class TreeQueue(BaseTreeChain):
     """
     A chain of files in a multiprocessing Queue.
 
+    Files are read until ``TreeQueue.SENTINEL`` is taken from the queue or,
+    if ``timeout`` is not None, until no file arrives within ``timeout``
+    seconds. Several TreeQueues in different processes may share the same
+    queue (see :func:`process_queue`).
+
     Note that asking for the number of files in the queue with len(treequeue)
     can be unreliable. Also, methods not overridden by TreeQueue will always be
     called on the current tree, so GetEntries will give you the number of
@@ -293,12 +382,13 @@ class TreeQueue(BaseTreeChain):
     """
     SENTINEL = None
 
-    def __init__(self, name, files, **kwargs):
+    def __init__(self, name, files, timeout=None, **kwargs):
         # multiprocessing.queues d.n.e. until one has been created
         multiprocessing.Queue()
         if not isinstance(files, multiprocessing.queues.Queue):
             raise TypeError("files must be a multiprocessing.Queue")
         self._files = files
+        self._timeout = timeout
 
         super(TreeQueue, self).__init__(name, **kwargs)
 
@@ -313,7 +403,228 @@ class TreeQueue(BaseTreeChain):
     __bool__ = __nonzero__
 
     def _next_file(self):
-        filename = self._files.get()
+        try:
+            filename = self._files.get(timeout=self._timeout)
+        except queue.Empty:
+            log.info("no new file in {0} seconds".format(self._timeout))
+            return None
         if filename == self.SENTINEL:
             return None
         return filename
+
+
+class FileWatcher(object):
+    """
+    Put the files matching glob patterns into a queue as they appear.
+
+    A file is only queued once its size did not change between two polls so
+    that files that are still being written are not read.
+
+    Parameters
+    ----------
+
+    patterns : str or list of str
+        Glob patterns of the files to watch, e.g. ``/data/run*/*.root``.
+
+    files : multiprocessing.Queue
+        The queue of file names, e.g. read by a :class:`TreeQueue`.
+
+    interval : float, optional (default=10.)
+        The number of seconds between two polls.
+
+    idle_timeout : float, optional (default=None)
+        Stop watching when no new file appeared within this many seconds. If
+        None then the watcher runs until ``stop`` is called.
+
+    existing : bool, optional (default=True)
+        If False then the files that exist when the watcher is created are
+        ignored.
+
+    """
+    def __init__(self, patterns, files, interval=10., idle_timeout=None,
+                 existing=True):
+        if isinstance(patterns, string_types):
+            patterns = [patterns]
+        self.patterns = patterns
+        self.files = files
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.queued = set()
+        # sizes of the files seen in the previous poll
+        self._sizes = {}
+        self._stop = threading.Event()
+        self._thread = None
+        if not existing:
+            self.queued.update(self._glob())
+
+    def _glob(self):
+        filenames = set()
+        for pattern in self.patterns:
+            filenames.update(glob.glob(os.path.expanduser(pattern)))
+        return filenames
+
+    def poll(self):
+        """
+        Queue the new files whose size did not change since the previous
+        poll and return their names
+        """
+        sizes = {}
+        for filename in self._glob() - self.queued:
+            try:
+                sizes[filename] = os.path.getsize(filename)
+            except OSError:
+                # removed meanwhile
+                continue
+        ready = sorted(filename for filename, size in sizes.items()
+                       if size > 0 and self._sizes.get(filename) == size)
+        for filename in ready:
+            log.info("queuing new file {0}".format(filename))
+            self.files.put(filename)
+            self.queued.add(filename)
+            del sizes[filename]
+        self._sizes = sizes
+        return ready
+
+    def run(self):
+        """
+        Poll until ``stop`` is called or no file appeared within
+        ``idle_timeout`` seconds
+        """
+        last = time.time()
+        while not self._stop.is_set():
+            if self.poll():
+                last = time.time()
+            elif (self.idle_timeout is not None and
+                    time.time() - last > self.idle_timeout):
+                log.info("no new file in {0} seconds, stop watching".format(
+                    self.idle_timeout))
+                break
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """
+        Run the watcher in a background thread
+        """
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def _queue_worker(name, files, results, target, timeout, kwargs):
+    try:
+        try:
+            chain = TreeQueue(name, files, timeout=timeout, **kwargs)
+        except RuntimeError:
+            # no file left for this worker
+            results.put((None, [], None))
+            return
+        result = target(chain)
+        results.put((result, chain.file_stats, None))
+    except Exception:
+        results.put((None, [], traceback.format_exc()))
+
+
+def process_queue(name, files, target, workers=None, watcher=None,
+                  timeout=None, **kwargs):
+    """
+    Process the trees of the files in a queue with several worker processes.
+
+    Each worker creates a :class:`TreeQueue` on the shared queue and calls
+    ``target(treequeue)``, so files are processed by whichever worker is
+    free as soon as they are queued.
+
+    Parameters
+    ----------
+
+    name : str
+        The name of the tree in each file.
+
+    files : multiprocessing.Queue
+        The queue of file names. One ``TreeQueue.SENTINEL`` per worker is
+        added once all files are queued.
+
+    target : callable
+        Called with the TreeQueue in each worker. It must be picklable (i.e.
+        defined at the module level) and its return value must be picklable.
+
+    workers : int, optional (default=None)
+        The number of worker processes. If None then use as many processes as
+        there are CPUs.
+
+    watcher : FileWatcher, optional (default=None)
+        Run this watcher in the current process while the workers are
+        running. The workers are stopped when the watcher stops.
+
+    timeout : float, optional (default=None)
+        Passed to each TreeQueue.
+
+    kwargs : additional keyword arguments, optional
+        Passed to each TreeQueue.
+
+    Returns
+    -------
+
+    results : list
+        The return values of ``target`` in each worker that read at least
+        one file.
+
+    stats : list
+        The statistics of each file (see ``BaseTreeChain.file_stats``).
+
+    Raises
+    ------
+
+    RuntimeError
+        If ``target`` raised an exception in any worker.
+
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=_queue_worker,
+            args=(name, files, results, target, timeout, kwargs))
+        for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        if watcher is not None:
+            watcher.run()
+    finally:
+        for _ in processes:
+            files.put(TreeQueue.SENTINEL)
+    outputs = []
+    stats = []
+    errors = []
+    # empty the result queue before joining the workers
+    remaining = len(processes)
+    while remaining:
+        try:
+            result, file_stats, error = results.get(timeout=1.)
+        except queue.Empty:
+            if any(process.is_alive() for process in processes):
+                continue
+            errors.extend(["worker exited unexpectedly"] * remaining)
+            break
+        remaining -= 1
+        if error is not None:
+            errors.append(error)
+        elif file_stats:
+            outputs.append(result)
+        stats.extend(file_stats)
+    for process in processes:
+        process.join()
+    for error in errors:
+        log.error("worker failed:\n{0}".format(error))
+    if errors:
+        raise RuntimeError("{0:d} of {1:d} workers failed".format(
+            len(errors), len(processes)))
+    return outputs, stats
@@ -0,0 +1,194 @@
+"""
+Persistent indices of the entries of trees passing selections.
+
+A :class:`SelectionIndex` evaluates a selection once over a tree and stores
+the numbers of the passing entries on disk, keyed by the path and UUID of the
+file, the path of the tree and the selection. Trees using the index only
+visit the indexed entries in ``Draw``, ``CopyTree``, ``GetEntries(cut)`` and
+``iterselected``::
+
+    from rootpy.tree.entrylist import SelectionIndex
+
+    tree.use_selection_index(SelectionIndex())
+    # the selection is evaluated over all entries only the first time
+    n = tree.GetEntries('njets >= 6 && met > 200')
+    hist = tree.Draw('ht', 'njets >= 6 && met > 200')
+
+Sparse selections are stored as sorted entry numbers and dense selections as
+a bitmap, whichever is smaller.
+"""
+from __future__ import absolute_import
+
+import os
+from os.path import join as pjoin
+import hashlib
+import tempfile
+
+from .. import ROOT, log; log = log[__name__]
+from .. import compiled as C
+from ..utils.path import mkdir_p
+
+__all__ = [
+    'SelectionIndex',
+    'evaluate_selection',
+    'make_entrylist',
+]
+
+
+C.register_code("""
+    #include <TEntryList.h>
+
+    // Enter n entry numbers into an entry list
+    void rootpy_fill_entrylist(TEntryList* entrylist, const Long64_t* entries,
+                               Long64_t n) {
+        for (Long64_t i = 0; i < n; ++i) {
+            entrylist->Enter(entries[i]);
+        }
+    }
+""", ["rootpy_fill_entrylist"])
+
+
+def _encode(entries, nentries):
+    import numpy as np
+    # 64 bits per entry number or one bit per entry
+    if len(entries) * 64 <= nentries:
+        return dict(entries=entries, nentries=nentries)
+    mask = np.zeros(nentries, dtype=bool)
+    mask[entries] = True
+    return dict(bitmap=np.packbits(mask), nentries=nentries)
+
+
+def _decode(data):
+    import numpy as np
+    if 'entries' in data:
+        return np.asarray(data['entries'], dtype=np.int64)
+    nentries = int(data['nentries'])
+    mask = np.unpackbits(data['bitmap'])[:nentries]
+    return np.flatnonzero(mask).astype(np.int64)
+
+
+def evaluate_selection(tree, selection):
+    """
+    Return the sorted numbers of the entries of a tree passing a selection
+    as a NumPy array
+    """
+    import numpy as np
+    from root_numpy import tree2array
+    array = tree2array(tree, branches=['Entry$'], selection=str(selection))
+    return array[array.dtype.names[0]].astype(np.int64)
+
+
+def make_entrylist(tree, entries):
+    """
+    Return a TEntryList of a tree holding sorted entry numbers given as a
+    NumPy array. The entries are entered in compiled code.
+    """
+    import numpy as np
+    entries = np.ascontiguousarray(entries, dtype=np.int64)
+    entrylist = ROOT.TEntryList(tree)
+    if len(entries):
+        C.rootpy_fill_entrylist(entrylist, entries, len(entries))
+    return entrylist
+
+
+class SelectionIndex(object):
+    """
+    An index of the entries passing selections.
+
+    Parameters
+    ----------
+
+    path : str, optional (default=None)
+        The directory where the indices are stored. If None then
+        ``selection_index`` in the rootpy user data directory is used.
+
+    """
+    def __init__(self, path=None):
+        if path is None:
+            from ..userdata import DATA_ROOT
+            path = pjoin(DATA_ROOT, 'selection_index')
+        mkdir_p(path)
+        self.path = path
+        self._entries = {}
+        self._entrylists = {}
+
+    def key(self, tree, selection):
+        """
+        Return the key of a selection of a tree or None if the selection
+        cannot be indexed since the tree is not in a file opened read-only
+        """
+        rfile = tree.GetCurrentFile()
+        if not rfile or not rfile.IsOpen() or rfile.IsWritable():
+            return None
+        ident = '\n'.join([
+            os.path.abspath(rfile.GetName()),
+            rfile.GetUUID().AsString(),
+            tree.GetDirectory().GetPath().split(':', 1)[-1],
+            tree.GetName(),
+            str(int(tree.GetEntries())),
+            str(selection)])
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+    def entries(self, tree, selection):
+        """
+        Return the sorted numbers of the entries of a tree passing a
+        selection as a NumPy array. The selection is evaluated if it is not
+        indexed yet.
+        """
+        import numpy as np
+        key = self.key(tree, selection)
+        if key is not None:
+            try:
+                return self._entries[key]
+            except KeyError:
+                pass
+            filename = pjoin(self.path, key + '.npz')
+            if os.path.exists(filename):
+                with np.load(filename) as data:
+                    entries = _decode(data)
+                self._entries[key] = entries
+                return entries
+        entries = self.evaluate(tree, selection)
+        if key is not None:
+            self._entries[key] = entries
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.npz')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **_encode(entries, int(tree.GetEntries())))
+            os.rename(tmp, filename)
+        return entries
+
+    def evaluate(self, tree, selection):
+        """
+        Evaluate a selection over all entries of a tree without the index
+        """
+        log.debug("indexing selection `{0}` of tree `{1}`".format(
+            selection, tree.GetName()))
+        return evaluate_selection(tree, selection)
+
+    def count(self, tree, selection):
+        """
+        Return the number of entries of a tree passing a selection
+        """
+        return len(self.entries(tree, selection))
+
+    def entrylist(self, tree, selection):
+        """
+        Return a TEntryList of the entries of a tree passing a selection
+        """
+        key = self.key(tree, selection)
+        if key in self._entrylists:
+            return self._entrylists[key]
+        entrylist = make_entrylist(tree, self.entries(tree, selection))
+        if key is not None:
+            self._entrylists[key] = entrylist
+        return entrylist
+
+    def clear(self):
+        """
+        Remove all stored indices
+        """
+        self._entries.clear()
+        self._entrylists.clear()
+        for filename in os.listdir(self.path):
+            if filename.endswith('.npz'):
+                os.remove(pjoin(self.path, filename))
@@ -0,0 +1,338 @@
+"""
+Export trees in chunks to CSV or to a directory of NumPy ``.npy`` files.
+
+Both exporters read the tree in batches of entries with root_numpy instead of
+iterating over the entries in Python, so they are limited by the decompression
+speed of ROOT rather than by the interpreter.
+
+The columnar format is a directory with one ``<branch>.npy`` file per branch
+that can be memory-mapped with ``numpy.load(..., mmap_mode='r')``. A
+variable-length array branch is stored as the concatenation of all values in
+``<branch>.npy`` and the ``int64`` array ``<branch>.offsets.npy`` with one
+more element than the number of entries, so that the values of entry ``i``
+are ``values[offsets[i]:offsets[i + 1]]``. The file ``index.json`` lists the
+branches, their types and the number of entries.
+"""
+from __future__ import absolute_import
+
+import os
+from os.path import join as pjoin
+import sys
+import json
+import struct
+
+from .. import log; log = log[__name__]
+from ..extern.six.moves import range
+from ..extern.six import string_types
+
+__all__ = [
+    'iter_batches',
+    'export_csv',
+    'export_columns',
+    'load_columns',
+]
+
+INDEX = 'index.json'
+# the size reserved for the header of the .npy files so that it can be
+# rewritten with the final shape once all chunks are written
+NPY_HEADER_SIZE = 128
+
+
+def iter_batches(tree, branches=None, selection=None, chunksize=100000,
+                 start=None, stop=None):
+    """
+    Generate structured arrays of at most ``chunksize`` entries of a tree
+    """
+    from root_numpy import tree2array
+    entries = tree.GetEntries()
+    if start is None:
+        start = 0
+    if stop is None or stop > entries:
+        stop = entries
+    for first in range(start, stop, chunksize):
+        array = tree2array(tree, branches=branches, selection=selection,
+                           start=first, stop=min(first + chunksize, stop))
+        if len(array):
+            yield array
+
+
+def _is_jagged(dtype):
+    return dtype.kind == 'O'
+
+
+def _csv_columns(array, names):
+    """
+    Return the columns of a chunk and their labels, with fixed-size array
+    fields split into one column per element
+    """
+    import numpy as np
+    columns = []
+    labels = []
+    for name in names:
+        column = array[name]
+        if _is_jagged(column.dtype):
+            raise TypeError(
+                "variable-length branch `{0}` cannot be written "
+                "as CSV".format(name))
+        if column.dtype == np.bool_:
+            column = column.astype(np.int8)
+        if column.ndim == 1:
+            columns.append(column)
+            labels.append(name)
+        else:
+            column = column.reshape(len(column), -1)
+            for idx in range(column.shape[1]):
+                columns.append(column[:, idx])
+                labels.append('{0}[{1:d}]'.format(name, idx))
+    return columns, labels
+
+
+def _csv_format(dtype):
+    if dtype.kind == 'f':
+        return '%.9g' if dtype.itemsize <= 4 else '%.17g'
+    if dtype.kind in 'iu':
+        return '%d'
+    return '%s'
+
+
+def export_csv(tree, stream=None, branches=None, selection=None, sep=',',
+               include_labels=True, limit=None, chunksize=100000):
+    """
+    Write branches of basic types of a tree as CSV
+
+    An entire chunk of entries is formatted with NumPy and written at once.
+    Integers are written as with ``Tree.csv``. Floating point values are
+    written with ``%.17g`` (doubles) or ``%.9g`` (floats), which preserves
+    their exact values but can differ from the output of ``Tree.csv``.
+
+    Parameters
+    ----------
+
+    tree : Tree
+        The tree to export.
+
+    stream : file or str, optional (default=None)
+        The file or name of the file to write. By default the CSV is written
+        to ``sys.stdout``.
+
+    branches : list, optional (default=None)
+        Only include these branches. If None then all branches are included.
+
+    selection : str, optional (default=None)
+        Only include entries passing this selection.
+
+    sep : str, optional (default=',')
+        The delimiter used to separate columns.
+
+    include_labels : bool, optional (default=True)
+        Include a first row of branch names labelling each column.
+
+    limit : int, optional (default=None)
+        Only include up to a maximum of ``limit`` rows.
+
+    chunksize : int, optional (default=100000)
+        The number of entries read at once.
+
+    Returns
+    -------
+
+    rows : int
+        The number of rows written, not including the labels.
+
+    """
+    import numpy as np
+    if stream is None:
+        stream = sys.stdout
+    elif isinstance(stream, string_types):
+        with open(stream, 'w') as f:
+            return export_csv(tree, f, branches=branches,
+                              selection=selection, sep=sep,
+                              include_labels=include_labels, limit=limit,
+                              chunksize=chunksize)
+    rows = 0
+    for array in iter_batches(tree, branches=branches, selection=selection,
+                              chunksize=chunksize):
+        if limit is not None:
+            array = array[:limit - rows]
+        columns, labels = _csv_columns(array, array.dtype.names)
+        if include_labels and rows == 0:
+            stream.write(sep.join(labels) + '\n')
+        lines = None
+        for column in columns:
+            text = np.char.mod(_csv_format(column.dtype), column)
+            if lines is None:
+                lines = text
+            else:
+                lines = np.char.add(np.char.add(lines, sep), text)
+        stream.write('\n'.join(lines.tolist()))
+        stream.write('\n')
+        rows += len(array)
+        if limit is not None and rows >= limit:
+            break
+    return rows
+
+
+class _NpyWriter(object):
+    """
+    Append chunks to a .npy file whose header is rewritten with the final
+    shape on close
+    """
+    def __init__(self, path, dtype, shape=()):
+        self.path = path
+        self.dtype = dtype
+        self.shape = shape
+        self.length = 0
+        self.file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        from numpy.lib.format import dtype_to_descr
+        header = repr({
+            'descr': dtype_to_descr(self.dtype),
+            'fortran_order': False,
+            'shape': (self.length,) + self.shape,
+        })
+        # magic string, version 1.0 and the header length
+        prefix_size = 10
+        header = header.ljust(NPY_HEADER_SIZE - prefix_size - 1) + '\n'
+        if len(header) + prefix_size != NPY_HEADER_SIZE:
+            raise ValueError("the shape is too large for the .npy header")
+        self.file.seek(0)
+        self.file.write(b'\x93NUMPY\x01\x00')
+        self.file.write(struct.pack('<H', len(header)))
+        self.file.write(header.encode('latin1'))
+        self.file.seek(0, os.SEEK_END)
+
+    def write(self, array):
+        import numpy as np
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        self.file.write(array.tobytes() if hasattr(array, 'tobytes')
+                        else array.tostring())
+        self.length += len(array)
+
+    def close(self):
+        self._write_header()
+        self.file.close()
+
+
+def export_columns(tree, path, branches=None, selection=None,
+                   chunksize=100000):
+    """
+    Write branches of a tree as a directory of ``.npy`` files (see the
+    module documentation for the layout)
+
+    Parameters
+    ----------
+
+    tree : Tree
+        The tree to export.
+
+    path : str
+        The output directory. It is created if it does not exist.
+
+    branches : list, optional (default=None)
+        Only include these branches. If None then all branches are included.
+
+    selection : str, optional (default=None)
+        Only include entries passing this selection.
+
+    chunksize : int, optional (default=100000)
+        The number of entries read at once.
+
+    Returns
+    -------
+
+    entries : int
+        The number of entries written.
+
+    """
+    import numpy as np
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    writers = None
+    index = None
+    entries = 0
+    try:
+        for array in iter_batches(tree, branches=branches,
+                                  selection=selection, chunksize=chunksize):
+            if writers is None:
+                writers = {}
+                index = []
+                for name in array.dtype.names:
+                    column = array[name]
+                    filename = pjoin(path, name + '.npy')
+                    if _is_jagged(column.dtype):
+                        if len(column):
+                            dtype = np.asarray(column[0]).dtype
+                        else:
+                            dtype = np.dtype(float)
+                        writers[name] = (
+                            _NpyWriter(filename, dtype),
+                            _NpyWriter(pjoin(path, name + '.offsets.npy'),
+                                       np.dtype(np.int64)))
+                        writers[name][1].write(np.zeros(1, dtype=np.int64))
+                        shape = ()
+                    else:
+                        shape = column.shape[1:]
+                        writers[name] = (
+                            _NpyWriter(filename, column.dtype, shape), None)
+                    index.append(dict(
+                        name=name,
+                        dtype=writers[name][0].dtype.str,
+                        shape=list(shape),
+                        jagged=_is_jagged(column.dtype)))
+                offsets_end = dict((name, 0) for name in writers)
+            for name, (values, offsets) in writers.items():
+                column = array[name]
+                if offsets is None:
+                    values.write(column)
+                    continue
+                lengths = np.fromiter(map(len, column), dtype=np.int64,
+                                      count=len(column))
+                if lengths.sum():
+                    values.write(np.concatenate(column))
+                offsets.write(offsets_end[name] + np.cumsum(lengths))
+                offsets_end[name] += lengths.sum()
+            entries += len(array)
+    finally:
+        if writers is not None:
+            for values, offsets in writers.values():
+                values.close()
+                if offsets is not None:
+                    offsets.close()
+    with open(pjoin(path, INDEX), 'w') as f:
+        json.dump(dict(tree=tree.GetName(), entries=entries,
+                       branches=index or []), f, indent=2)
+    return entries
+
+
+def load_columns(path, branches=None, mmap_mode='r'):
+    """
+    Load columns written by :func:`export_columns`
+
+    Returns
+    -------
+
+    columns : dict
+        Maps each branch name to an array or, for variable-length arrays, to
+        a tuple ``(values, offsets)``. The arrays are memory-mapped unless
+        ``mmap_mode`` is None.
+
+    """
+    import numpy as np
+    with open(pjoin(path, INDEX)) as f:
+        index = json.load(f)
+    columns = {}
+    for info in index['branches']:
+        name = info['name']
+        if branches is not None and name not in branches:
+            continue
+        values = np.load(pjoin(path, name + '.npy'), mmap_mode=mmap_mode)
+        if info['jagged']:
+            offsets = np.load(pjoin(path, name + '.offsets.npy'),
+                              mmap_mode=mmap_mode)
+            columns[name] = (values, offsets)
+        else:
+            columns[name] = values
+    return columns
+
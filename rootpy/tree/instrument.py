@@ -0,0 +1,372 @@
+"""
+Instrumentation of the event loop of a :class:`rootpy.tree.TreeChain`.
+
+With ``profile=True`` a chain measures where the time of its event loop is
+spent::
+
+    chain = TreeChain('tree', files, filters=filters, profile=True)
+    for event in chain:
+        ...
+    chain.profile.save('loop.json')
+
+The profile separates the time spent reading entries in ROOT, reading
+branches on demand, evaluating each filter of the ``EventFilterList`` and
+running the body of the loop. For each file it records the bytes read, the
+time ROOT spent reading from disk and decompressing (from ``TTreePerfStats``)
+and the hits and misses of the ``TTreeCache``. Branches read on demand are
+profiled individually. After the first ``on_demand_learn_entries`` entries
+of each file the accessed branches are read in bulk by ``TTree::GetEntry``,
+so their reads are only profiled individually during these first entries.
+The saved profile can be viewed with ``rootpy loop-profile loop.json``.
+"""
+from __future__ import absolute_import, print_function
+
+import sys
+import json
+import time
+
+try:
+    from collections import OrderedDict
+except ImportError:  # py 2.6
+    from ..extern.ordereddict import OrderedDict
+
+from .. import ROOT, log; log = log[__name__]
+from ..extern.six import string_types
+
+__all__ = [
+    'LoopProfile',
+    'print_profile',
+]
+
+# the TTreePerfStats getters recorded for each file
+PERFSTATS = [
+    ('disk_seconds', 'GetDiskTime'),
+    ('unzip_seconds', 'GetUnzipTime'),
+    ('real_seconds', 'GetRealTime'),
+    ('cpu_seconds', 'GetCpuTime'),
+]
+
+
+class LoopProfile(object):
+    """
+    Times and counters of an event loop.
+
+    Parameters
+    ----------
+
+    perfstats : bool, optional (default=True)
+        Attach a ``TTreePerfStats`` to each tree to measure the time spent
+        reading from disk and decompressing baskets.
+
+    """
+    def __init__(self, perfstats=True):
+        self.perfstats = perfstats
+        self.entries = 0
+        self.passed = 0
+        # time spent in TTree::GetEntry (or LoadTree) while iterating
+        self.read_seconds = 0.
+        # time spent outside of the tree iteration
+        self.loop_seconds = 0.
+        self.filter_seconds = 0.
+        self.branch_read_seconds = 0.
+        self.filters = OrderedDict()
+        self.branches = {}
+        self.files = []
+        # branches are only read on demand (and profiled individually) in
+        # this many first entries of each file, or in all entries if None
+        self.learn_entries = None
+        self._perf = None
+        self._file_start = None
+
+    def iterate(self, tree):
+        """
+        Iterate over a tree, timing the reading of each entry and the time
+        spent outside of the iteration
+        """
+        entries = iter(tree)
+        read = 0.
+        loop = 0.
+        try:
+            while True:
+                start = time.time()
+                try:
+                    entry = next(entries)
+                except StopIteration:
+                    read += time.time() - start
+                    break
+                now = time.time()
+                read += now - start
+                yield entry
+                loop += time.time() - now
+        finally:
+            self.read_seconds += read
+            self.loop_seconds += loop
+
+    def filter(self, filters, event):
+        """
+        Evaluate an ``EventFilterList`` for an event, timing each filter.
+        The time spent reading branches on demand in a filter is not
+        included in its time.
+        """
+        self.entries += 1
+        stats = self.filters
+        passes = True
+        for filter in filters:
+            reads = self.branch_read_seconds
+            start = time.time()
+            passes = filter(event)
+            elapsed = (time.time() - start -
+                       (self.branch_read_seconds - reads))
+            try:
+                counts = stats[filter.name]
+            except KeyError:
+                counts = stats[filter.name] = dict(
+                    calls=0, passed=0, seconds=0.)
+            counts['calls'] += 1
+            counts['seconds'] += elapsed
+            self.filter_seconds += elapsed
+            if not passes:
+                return False
+            counts['passed'] += 1
+        self.passed += 1
+        return True
+
+    def read_branch(self, branch, entry):
+        """
+        Read one entry of a branch, timing the read. Return the number of
+        bytes read.
+        """
+        start = time.time()
+        nbytes = branch.GetEntry(entry)
+        elapsed = time.time() - start
+        name = branch.GetName()
+        try:
+            counts = self.branches[name]
+        except KeyError:
+            counts = self.branches[name] = dict(
+                reads=0, bytes=0, seconds=0.)
+        counts['reads'] += 1
+        counts['bytes'] += nbytes
+        counts['seconds'] += elapsed
+        self.branch_read_seconds += elapsed
+        return nbytes
+
+    def start_file(self, tree):
+        """
+        Start profiling the reading of a tree
+        """
+        self._file_start = time.time()
+        self._perf = None
+        learn_entries = getattr(tree, 'on_demand_learn_entries', None)
+        if learn_entries:
+            self.learn_entries = max(self.learn_entries or 0, learn_entries)
+        if self.perfstats:
+            self._perf = ROOT.TTreePerfStats('rootpy_loop_profile', tree)
+
+    def end_file(self, tree, rfile, entries):
+        """
+        Record the statistics of a tree that was read
+        """
+        stats = OrderedDict([
+            ('file', rfile.GetName()),
+            ('entries', entries),
+            ('seconds', time.time() - self._file_start),
+            ('bytes_read', rfile.GetBytesRead()),
+            ('read_calls', rfile.GetReadCalls()),
+        ])
+        if self._perf is not None:
+            perf = self._perf
+            self._perf = None
+            if hasattr(perf, 'Finish'):
+                perf.Finish()
+            for key, getter in PERFSTATS:
+                if hasattr(perf, getter):
+                    stats[key] = getattr(perf, getter)()
+            tree.SetPerfStats(None)
+        cache = rfile.GetCacheRead(tree)
+        if cache:
+            hit_bytes = cache.GetBytesRead()
+            miss_bytes = cache.GetNoCacheBytesRead()
+            stats['cache'] = OrderedDict([
+                ('hit_bytes', hit_bytes),
+                ('miss_bytes', miss_bytes),
+                ('hit_calls', cache.GetReadCalls()),
+                ('miss_calls', cache.GetNoCacheReadCalls()),
+                ('efficiency', cache.GetEfficiency()),
+            ])
+        # the compressed size of each active branch per entry
+        sizes = {}
+        nentries = max(tree.GetEntries(), 1)
+        for branch in tree.GetListOfBranches():
+            if not tree.GetBranchStatus(branch.GetName()):
+                continue
+            zip_bytes = branch.GetZipBytes('*')
+            sizes[branch.GetName()] = OrderedDict([
+                ('zip_bytes_per_entry', zip_bytes / float(nentries)),
+                ('compression',
+                 branch.GetTotBytes('*') / float(zip_bytes)
+                 if zip_bytes else 0.),
+            ])
+        stats['branches'] = sizes
+        self.files.append(stats)
+        return stats
+
+    @property
+    def user_seconds(self):
+        """
+        The time spent in the body of the loop (excluding filters and
+        branches read on demand)
+        """
+        return max(self.loop_seconds - self.filter_seconds
+                   - self.branch_read_seconds, 0.)
+
+    def to_dict(self):
+        """
+        Return this profile as a dict of basic types
+        """
+        return OrderedDict([
+            ('entries', self.entries),
+            ('passed', self.passed),
+            ('read_seconds', self.read_seconds),
+            ('branch_read_seconds', self.branch_read_seconds),
+            ('filter_seconds', self.filter_seconds),
+            ('user_seconds', self.user_seconds),
+            ('filters', self.filters),
+            ('branches', self.branches),
+            ('branch_learn_entries', self.learn_entries),
+            ('files', self.files),
+        ])
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls()
+        profile.entries = data['entries']
+        profile.passed = data['passed']
+        profile.read_seconds = data['read_seconds']
+        profile.branch_read_seconds = data['branch_read_seconds']
+        profile.filter_seconds = data['filter_seconds']
+        profile.loop_seconds = (data['user_seconds'] + data['filter_seconds']
+                                + data['branch_read_seconds'])
+        profile.filters = OrderedDict(
+            (name, dict(counts)) for name, counts in data['filters'].items())
+        profile.branches = dict(
+            (name, dict(counts)) for name, counts in data['branches'].items())
+        profile.files = list(data['files'])
+        profile.learn_entries = data.get('branch_learn_entries')
+        return profile
+
+    def merge(self, other):
+        """
+        Add the counters of another profile, e.g. from another process
+        """
+        if isinstance(other, dict):
+            other = LoopProfile.from_dict(other)
+        self.entries += other.entries
+        self.passed += other.passed
+        self.read_seconds += other.read_seconds
+        self.loop_seconds += other.loop_seconds
+        self.filter_seconds += other.filter_seconds
+        self.branch_read_seconds += other.branch_read_seconds
+        for stats, other_stats in ((self.filters, other.filters),
+                                   (self.branches, other.branches)):
+            for name, counts in other_stats.items():
+                if name in stats:
+                    for key, value in counts.items():
+                        stats[name][key] += value
+                else:
+                    stats[name] = dict(counts)
+        self.files.extend(other.files)
+        if other.learn_entries:
+            self.learn_entries = max(self.learn_entries or 0,
+                                     other.learn_entries)
+        return self
+
+    def save(self, path):
+        """
+        Write this profile as JSON to a file or a file name
+        """
+        if isinstance(path, string_types):
+            with open(path, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+        else:
+            json.dump(self.to_dict(), path, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def report(self, out=None):
+        print_profile(self.to_dict(), out=out)
+
+
+def _seconds_per_entry(seconds, entries):
+    return 1e6 * seconds / entries if entries else 0.
+
+
+def print_profile(profile, out=None):
+    """
+    Print a profile (as returned by ``LoopProfile.to_dict``) as tables
+    """
+    out = out or sys.stdout
+    entries = profile['entries']
+    total = (profile['read_seconds'] + profile['branch_read_seconds'] +
+             profile['filter_seconds'] + profile['user_seconds'])
+    print("entries: {0:d} (passed filters: {1:d})".format(
+        entries, profile['passed']), file=out)
+    print("", file=out)
+    print("{0:<24} {1:>10} {2:>7} {3:>12}".format(
+        "", "time [s]", "[%]", "[us/entry]"), file=out)
+    for label, key in (("reading entries", 'read_seconds'),
+                       ("reading branches", 'branch_read_seconds'),
+                       ("filters", 'filter_seconds'),
+                       ("user code", 'user_seconds')):
+        seconds = profile[key]
+        print("{0:<24} {1:10.3f} {2:7.1f} {3:12.2f}".format(
+            label, seconds, 100. * seconds / total if total else 0.,
+            _seconds_per_entry(seconds, entries)), file=out)
+    files = profile['files']
+    disk = sum(f.get('disk_seconds', 0.) for f in files)
+    unzip = sum(f.get('unzip_seconds', 0.) for f in files)
+    if disk or unzip:
+        print("", file=out)
+        print("ROOT disk time: {0:.3f} s, decompression time: {1:.3f} s"
+              .format(disk, unzip), file=out)
+    if profile['filters']:
+        print("", file=out)
+        print("{0:<30} {1:>10} {2:>10} {3:>8} {4:>12}".format(
+            "filter", "calls", "passed", "[%]", "[us/call]"), file=out)
+        for name, counts in profile['filters'].items():
+            calls = counts['calls']
+            print("{0:<30} {1:10d} {2:10d} {3:8.2f} {4:12.2f}".format(
+                name, calls, counts['passed'],
+                100. * counts['passed'] / calls if calls else 0.,
+                _seconds_per_entry(counts['seconds'], calls)), file=out)
+    if profile['branches']:
+        print("", file=out)
+        learn_entries = profile.get('branch_learn_entries')
+        if learn_entries:
+            print("branches read on demand in the first {0:d} entries of "
+                  "each file (then read in bulk):".format(learn_entries),
+                  file=out)
+        print("{0:<30} {1:>10} {2:>14} {3:>10}".format(
+            "branch read on demand", "reads", "bytes", "time [s]"), file=out)
+        rows = sorted(profile['branches'].items(),
+                      key=lambda item: item[1]['seconds'], reverse=True)
+        for name, counts in rows:
+            print("{0:<30} {1:10d} {2:14d} {3:10.3f}".format(
+                name, counts['reads'], counts['bytes'], counts['seconds']),
+                file=out)
+    if files:
+        print("", file=out)
+        print("{0:>10} {1:>14} {2:>10} {3:>10} {4:>9}  {5}".format(
+            "entries", "bytes read", "time [s]", "entries/s", "cache [%]",
+            "file"), file=out)
+        for f in files:
+            cache = f.get('cache')
+            print("{0:10d} {1:14d} {2:10.3f} {3:10.0f} {4:>9}  {5}".format(
+                f['entries'], f['bytes_read'], f['seconds'],
+                f['entries'] / f['seconds'] if f['seconds'] else 0.,
+                '{0:.1f}'.format(100. * cache['efficiency'])
+                if cache else '-',
+                f['file']), file=out)
@@ -0,0 +1,411 @@
+"""
+Compute many aggregate quantities of a tree in a single pass.
+
+Each of ``GetEntries(cut)``, ``GetMaximum`` and ``GetMinimum`` scans the
+tree. ``reduce`` instead reads all expressions, cuts and weights needed by a
+set of reductions in chunks of entries with root_numpy and updates every
+reduction with NumPy::
+
+    from rootpy.tree.reduce import Count, Sum, Max
+
+    yields = tree.reduce({
+        'n': Count('pt > 20'),
+        'sumw': Sum('weight', 'pt > 20'),
+        'max_pt': Max('pt'),
+    })
+
+A yield table over many selections then reads the tree only once.
+Expressions of variable-length arrays are flattened, i.e. ``max('jet_pt')``
+is the maximum over all jets of all entries. As with ``TTree::Draw``, a cut
+on arrays selects the elements of an expression of arrays element by element,
+i.e. ``max('jet_pt', 'jet_eta < 2')`` is the maximum over the central jets.
+Otherwise an entry passes such a cut if any of its elements passes (as with
+``TTree::GetEntries``), e.g. ``count('jet_pt > 20')``.
+
+The lowercase aliases ``sum``, ``min`` and ``max`` of the reductions are not
+exported by ``from rootpy.tree.reduce import *`` since they would hide the
+builtins. Import them explicitly if preferred.
+"""
+from __future__ import absolute_import
+
+from .. import log; log = log[__name__]
+from .export import iter_batches
+
+__all__ = [
+    'Reduction',
+    'Count',
+    'Sum',
+    'Mean',
+    'Min',
+    'Max',
+    'count',
+    'mean',
+    'reduce',
+]
+
+
+def _expression(value):
+    if value is None:
+        return None
+    value = str(value)
+    return value or None
+
+
+def _is_array(column):
+    """
+    Return True if a column holds arrays of fixed or variable length
+    """
+    return column.dtype.kind == 'O' or column.ndim > 1
+
+
+def _passed(column):
+    """
+    Return the mask of the values of a column of a cut that are not zero.
+    The mask of a column of variable-length arrays holds one mask for each
+    entry.
+    """
+    import numpy as np
+    if column.dtype.kind != 'O':
+        return column != 0
+    mask = np.empty(len(column), dtype=object)
+    for i, value in enumerate(column):
+        mask[i] = np.asarray(value) != 0
+    return mask
+
+
+def _entry_mask(mask):
+    """
+    Reduce a mask of the elements of arrays to the mask of the entries where
+    any element passes
+    """
+    import numpy as np
+    if mask is None or not _is_array(mask):
+        return mask
+    if mask.dtype.kind != 'O':
+        return mask.reshape(len(mask), -1).any(axis=1)
+    return np.fromiter((np.any(passed) for passed in mask),
+                       dtype=bool, count=len(mask))
+
+
+def _flatten_elements(column, mask, weights):
+    """
+    Return the values of a column of arrays where the mask of the elements
+    is True and their weights. As in ``TTree::Draw`` the elements of arrays
+    of different lengths are paired up to the shorter length.
+    """
+    import numpy as np
+    if (column.dtype.kind != 'O' and mask.dtype.kind != 'O' and
+            column.shape == mask.shape):
+        if weights is not None:
+            weights = np.repeat(
+                weights, mask.reshape(len(mask), -1).sum(axis=1))
+        return column[mask], weights
+    values = []
+    for value, passed in zip(column, mask):
+        value = np.asarray(value).reshape(-1)
+        passed = np.asarray(passed).reshape(-1)
+        size = len(value) if len(value) < len(passed) else len(passed)
+        values.append(value[:size][passed[:size]])
+    if weights is not None:
+        lengths = np.fromiter(map(len, values), dtype=np.intp,
+                              count=len(values))
+        weights = np.repeat(weights, lengths)
+    if not values:
+        return np.empty(0), weights
+    return np.concatenate(values), weights
+
+
+def _flatten(column, mask, weights):
+    """
+    Return the values of a column of an expression for the entries (or
+    elements) in mask and their weights, flattening variable-length arrays
+    """
+    import numpy as np
+    if mask is not None and _is_array(mask):
+        if _is_array(column):
+            return _flatten_elements(column, mask, weights)
+        mask = _entry_mask(mask)
+    if mask is not None:
+        column = column[mask]
+        if weights is not None:
+            weights = weights[mask]
+    if column.dtype.kind != 'O':
+        if column.ndim > 1:
+            size = int(np.prod(column.shape[1:]))
+            if weights is not None:
+                weights = np.repeat(weights, size)
+            column = column.reshape(-1)
+        return column, weights
+    lengths = np.fromiter(map(len, column), dtype=np.intp, count=len(column))
+    if weights is not None:
+        weights = np.repeat(weights, lengths)
+    if lengths.sum() == 0:
+        return np.empty(0), weights
+    return np.concatenate(list(column)), weights
+
+
+class Reduction(object):
+    """
+    The base class of the reductions computed by :func:`reduce`.
+
+    Parameters
+    ----------
+
+    expression : str, optional (default=None)
+        The expression reduced over the entries.
+
+    cut : str or Cut, optional (default=None)
+        Only include the entries passing this selection. A weighted
+        selection (e.g. ``'w * (x > 1)'``) only selects the entries where it
+        is not zero. Use ``weight`` for weights. A selection on arrays
+        selects the elements of an expression of arrays and otherwise the
+        entries where any element passes.
+
+    weight : str, optional (default=None)
+        The expression of the weight of each entry.
+
+    """
+    def __init__(self, expression=None, cut=None, weight=None):
+        self.expression = _expression(expression)
+        self.cut = _expression(cut)
+        self.weight = _expression(weight)
+
+    def expressions(self):
+        """
+        The expressions read for this reduction
+        """
+        return [expr for expr in (self.expression, self.cut, self.weight)
+                if expr is not None]
+
+    def _selected(self, columns, scale=1.):
+        """
+        Return the entry (or element) mask and the weights of this reduction
+        in a chunk
+        """
+        import numpy as np
+        mask = None
+        if self.cut is not None:
+            mask = _passed(columns[self.cut])
+        weights = None
+        if self.weight is not None:
+            weights = columns[self.weight].astype(np.double)
+        if scale != 1.:
+            if weights is None:
+                weights = np.empty(len(columns), dtype=np.double)
+                weights.fill(scale)
+            else:
+                weights = weights * scale
+        return mask, weights
+
+    def initial(self):
+        raise NotImplementedError
+
+    def update(self, state, columns, scale=1.):
+        raise NotImplementedError
+
+    def merge(self, state, other):
+        raise NotImplementedError
+
+    def result(self, state):
+        return state
+
+    def __repr__(self):
+        args = ', '.join(repr(expr) for expr in (
+            self.expression, self.cut, self.weight) if expr is not None)
+        return '{0}({1})'.format(self.__class__.__name__, args)
+
+
+class Count(Reduction):
+    """
+    The (weighted) number of entries passing a cut
+    """
+    def __init__(self, cut=None, weight=None):
+        super(Count, self).__init__(cut=cut, weight=weight)
+
+    def initial(self):
+        return 0
+
+    def update(self, state, columns, scale=1.):
+        import numpy as np
+        mask, weights = self._selected(columns, scale)
+        mask = _entry_mask(mask)
+        if weights is None:
+            if mask is None:
+                return state + len(columns)
+            return state + np.count_nonzero(mask)
+        if mask is not None:
+            weights = weights[mask]
+        return state + weights.sum()
+
+    def merge(self, state, other):
+        return state + other
+
+
+class Sum(Reduction):
+    """
+    The (weighted) sum of an expression over the entries passing a cut
+    """
+    def initial(self):
+        return 0.
+
+    def update(self, state, columns, scale=1.):
+        mask, weights = self._selected(columns, scale)
+        values, weights = _flatten(columns[self.expression], mask, weights)
+        if weights is None:
+            return state + values.sum()
+        return state + (values * weights).sum()
+
+    def merge(self, state, other):
+        return state + other
+
+
+class Mean(Reduction):
+    """
+    The (weighted) mean of an expression over the entries passing a cut
+    """
+    def initial(self):
+        return (0., 0.)
+
+    def update(self, state, columns, scale=1.):
+        mask, weights = self._selected(columns, scale)
+        values, weights = _flatten(columns[self.expression], mask, weights)
+        if weights is None:
+            return state[0] + values.sum(), state[1] + len(values)
+        return (state[0] + (values * weights).sum(),
+                state[1] + weights.sum())
+
+    def merge(self, state, other):
+        return state[0] + other[0], state[1] + other[1]
+
+    def result(self, state):
+        if state[1] == 0:
+            return None
+        return state[0] / float(state[1])
+
+
+class _Extremum(Reduction):
+
+    def __init__(self, expression, cut=None):
+        super(_Extremum, self).__init__(expression, cut=cut)
+
+    def initial(self):
+        return None
+
+    def update(self, state, columns, scale=1.):
+        mask, _ = self._selected(columns)
+        values, _ = _flatten(columns[self.expression], mask, None)
+        if len(values) == 0:
+            return state
+        return self.merge(state, self._reduce(values))
+
+    def merge(self, state, other):
+        if state is None:
+            return other
+        if other is None:
+            return state
+        return self._reduce([state, other])
+
+
+class Min(_Extremum):
+    """
+    The minimum of an expression over the entries passing a cut
+    """
+    @staticmethod
+    def _reduce(values):
+        import numpy as np
+        return np.min(values).item()
+
+
+class Max(_Extremum):
+    """
+    The maximum of an expression over the entries passing a cut
+    """
+    @staticmethod
+    def _reduce(values):
+        import numpy as np
+        return np.max(values).item()
+
+
+count = Count
+sum = Sum
+mean = Mean
+min = Min
+max = Max
+
+
+def _trees(tree):
+    """
+    Generate the trees of a tree or of the files of a chain
+    """
+    from .chain import BaseTreeChain
+    if not isinstance(tree, BaseTreeChain):
+        yield tree
+        return
+    tree.reset()
+    while tree._rollover():
+        yield tree._tree
+
+
+def reduce(tree, reductions, weighted=False, chunksize=100000,
+           start=None, stop=None):
+    """
+    Compute several reductions of a tree or chain in a single pass.
+
+    Parameters
+    ----------
+
+    tree : Tree or TreeChain
+        The tree or chain of trees.
+
+    reductions : dict
+        Maps names to :class:`Reduction` instances, e.g.
+        ``{'n': count('x > 0'), 'max_x': max('x')}``.
+
+    weighted : bool, optional (default=False)
+        Multiply the weights of counts, sums and means by the weight of
+        each tree (as ``GetEntries(weighted=True)`` does).
+
+    chunksize : int, optional (default=100000)
+        The number of entries read at once.
+
+    start, stop : int, optional (default=None)
+        Only include the entries in this range of each tree.
+
+    Returns
+    -------
+
+    results : dict
+        Maps the names of the reductions to their results. The results of
+        ``min``, ``max`` and ``mean`` are None if no entry was selected.
+
+    """
+    for name, reduction in reductions.items():
+        if not isinstance(reduction, Reduction):
+            raise TypeError(
+                "reduction `{0}` is not a Reduction: {1!r}".format(
+                    name, reduction))
+    expressions = []
+    for reduction in reductions.values():
+        for expr in reduction.expressions():
+            if expr not in expressions:
+                expressions.append(expr)
+    states = dict((name, reduction.initial())
+                  for name, reduction in reductions.items())
+    for current in _trees(tree):
+        scale = current.GetWeight() if weighted else 1.
+        if not expressions:
+            # only unweighted counts of all entries
+            entries = int(current.GetEntries())
+            first = start or 0
+            last = entries if stop is None or stop > entries else stop
+            nentries = last - first if last > first else 0
+            for name, reduction in reductions.items():
+                states[name] += nentries * scale
+            continue
+        for array in iter_batches(current, branches=expressions,
+                                  chunksize=chunksize,
+                                  start=start, stop=stop):
+            for name, reduction in reductions.items():
+                states[name] = reduction.update(states[name], array, scale)
+    return dict((name, reduction.result(states[name]))
+                for name, reduction in reductions.items())
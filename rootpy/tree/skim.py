@@ -0,0 +1,300 @@
+"""
+Skim (select entries) and slim (select branches) trees into new files.
+
+The passing entries of each input tree are found in one vectorized pass,
+either with a selection evaluated by ROOT or with a function applied to
+chunks of NumPy arrays. They are then copied with ``TTree::CopyTree``
+through a ``TEntryList``, so no Python code runs per entry::
+
+    from rootpy.tree.skim import skim
+
+    results = skim(['data/*.root'], 'tree', 'skims/{name}.root',
+                   selection=Cut('pt > 20') & Cut('abs(eta) < 2.5'),
+                   branches=['pt', 'eta', 'phi', 'jet_*'],
+                   columns={'pt_gev': 'pt / 1000.'},
+                   max_size=2 * 1024 ** 3,
+                   processes=8)
+
+Each input file is skimmed into its own output files so that the inputs can
+be processed in parallel.
+"""
+from __future__ import absolute_import
+
+import os
+import multiprocessing
+
+from .. import log; log = log[__name__]
+from ..extern.six import string_types
+from ..context import preserve_current_directory
+from ..io import root_open
+from ..utils.path import expand_and_glob, mkdir_p
+from .chain import BaseTreeChain
+from .entrylist import make_entrylist
+from .export import iter_batches
+
+__all__ = [
+    'skim',
+    'skim_file',
+]
+
+
+def _passing_entries(tree, selection, filter, filter_branches, chunksize):
+    """
+    Return the sorted entry numbers passing the selection and the filter
+    """
+    import numpy as np
+    from root_numpy import tree2array
+    if filter is None and not selection:
+        return np.arange(tree.GetEntries(), dtype=np.int64)
+    if filter is None:
+        entries = tree2array(tree, branches=['Entry$'], selection=selection)
+        return entries['Entry$'].astype(np.int64)
+    passing = []
+    branches = list(filter_branches or []) + ['Entry$']
+    for array in iter_batches(tree, branches=branches, selection=selection,
+                              chunksize=chunksize):
+        mask = np.asarray(filter(array), dtype=bool)
+        passing.append(array['Entry$'][mask].astype(np.int64))
+    if not passing:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(passing)
+
+
+def _computed_columns(tree, columns, entries, chunksize):
+    """
+    Evaluate the computed columns for the passing entries
+    """
+    import numpy as np
+    from root_numpy import tree2array
+    values = {}
+    if not columns or len(entries) == 0:
+        return values
+    low, high = int(entries[0]), int(entries[-1]) + 1
+    for name, column in columns.items():
+        if isinstance(column, string_types):
+            expression, func = column, None
+            branches = [column]
+        else:
+            func, branches = column
+            expression = None
+        parts = []
+        for first in range(low, high, chunksize):
+            last = min(first + chunksize, high)
+            chunk = entries[(entries >= first) & (entries < last)]
+            if len(chunk) == 0:
+                continue
+            array = tree2array(tree, branches=branches,
+                               start=first, stop=last)[chunk - first]
+            if func is None:
+                parts.append(array[expression])
+            else:
+                parts.append(np.asarray(func(array)))
+        values[name] = np.concatenate(parts)
+    return values
+
+
+def _entry_size(tree, values):
+    """
+    Estimate the compressed size of one entry of the output tree
+    """
+    size = 0
+    for branch in tree.GetListOfBranches():
+        if tree.GetBranchStatus(branch.GetName()):
+            size += branch.GetZipBytes('*')
+    size /= float(max(tree.GetEntries(), 1))
+    for array in values.values():
+        size += array.dtype.itemsize
+    return max(size, 1.)
+
+
+def _part_name(output, part):
+    # the same naming as TTree::ChangeFile
+    if part == 0:
+        return output
+    base, ext = os.path.splitext(output)
+    return '{0}_{1:d}{2}'.format(base, part, ext)
+
+
+def skim_file(filename, treename, output, selection=None, filter=None,
+              filter_branches=None, branches=None, exclude=None,
+              columns=None, max_size=None, chunksize=100000):
+    """
+    Skim the tree of one file into one or more output files.
+
+    See :func:`skim` for the parameters. ``output`` is the name of the
+    output file. If the output is split then the following files are named
+    like ``output_1.root``, ``output_2.root`` and so on.
+
+    Returns
+    -------
+
+    result : dict
+        ``input``, ``outputs`` (the names of the written files), ``entries``
+        (the number of input entries) and ``passed`` (the number of entries
+        written).
+
+    """
+    import numpy as np
+    if selection is not None:
+        selection = str(selection)
+    with root_open(filename) as rfile:
+        tree = rfile.Get(treename)
+        # read with NumPy before changing the branch status
+        entries = _passing_entries(
+            tree, selection, filter, filter_branches, chunksize)
+        values = _computed_columns(tree, columns, entries, chunksize)
+        if branches is not None:
+            tree.activate(branches, exclusive=True)
+        if exclude is not None:
+            tree.deactivate(exclude)
+        if max_size is None or len(entries) == 0:
+            per_file = max(len(entries), 1)
+        else:
+            per_file = max(int(max_size / _entry_size(tree, values)), 1)
+        entrylist = make_entrylist(tree, entries)
+        tree.SetEntryList(entrylist)
+        outputs = []
+        try:
+            for part, first in enumerate(range(0, max(len(entries), 1),
+                                               per_file)):
+                nentries = min(per_file, len(entries) - first)
+                outname = _part_name(output, part)
+                dirname = os.path.dirname(outname)
+                if dirname:
+                    mkdir_p(dirname)
+                with preserve_current_directory():
+                    with root_open(outname, 'recreate') as outfile:
+                        outfile.cd()
+                        # positions in the entry list, not entry numbers
+                        outtree = tree.CopyTree('', '', nentries, first)
+                        if values:
+                            from root_numpy import array2tree
+                            array = np.empty(nentries, dtype=[
+                                (name, value.dtype)
+                                for name, value in values.items()])
+                            for name, value in values.items():
+                                array[name] = value[first:first + nentries]
+                            array2tree(array, tree=outtree)
+                        outtree.Write()
+                outputs.append(outname)
+        finally:
+            tree.SetEntryList(None)
+        log.info("{0}: {1:d} of {2:d} entries written to {3:d} file{4}"
+                 .format(filename, len(entries), int(tree.GetEntries()),
+                         len(outputs), 's' if len(outputs) != 1 else ''))
+        return dict(input=filename, outputs=outputs,
+                    entries=int(tree.GetEntries()), passed=len(entries))
+
+
+def _skim_file(args):
+    filename, treename, output, kwargs = args
+    return skim_file(filename, treename, output, **kwargs)
+
+
+def skim(files, treename, output, selection=None, filter=None,
+         filter_branches=None, branches=None, exclude=None, columns=None,
+         max_size=None, chunksize=100000, processes=1):
+    """
+    Skim and slim the trees of many files, each into its own output files.
+
+    Parameters
+    ----------
+
+    files : list, str or TreeChain
+        The input files or glob patterns. If a TreeChain then its files
+        and tree name are used.
+
+    treename : str
+        The path of the tree in each input file. Ignored if ``files`` is a
+        TreeChain.
+
+    output : str
+        The name of the output file of each input as a format string with
+        the fields ``name`` (the input file name without directory and
+        extension) and ``index`` (the position of the input), e.g.
+        ``'skims/{name}.skim.root'``.
+
+    selection : str or Cut, optional (default=None)
+        Only keep entries passing this selection.
+
+    filter : callable, optional (default=None)
+        A batched filter: called with structured arrays of the branches
+        ``filter_branches`` for chunks of entries passing the selection and
+        returning a boolean mask of the entries to keep. It must be
+        picklable if ``processes`` is not 1.
+
+    filter_branches : list, optional (default=None)
+        The branches read for ``filter``.
+
+    branches : list, optional (default=None)
+        Only keep these branches (wildcards are allowed). If None then all
+        branches are kept.
+
+    exclude : list, optional (default=None)
+        Drop these branches (wildcards are allowed).
+
+    columns : dict, optional (default=None)
+        New columns added to the output tree. Each value is either an
+        expression evaluated by ROOT (e.g. ``'sqrt(px*px + py*py)'``) or a
+        tuple ``(func, branches)`` where ``func`` is called with a
+        structured array of ``branches`` of the kept entries and returns the
+        values of the column.
+
+    max_size : int, optional (default=None)
+        Start a new output file when the estimated compressed size of an
+        output exceeds this many bytes.
+
+    chunksize : int, optional (default=100000)
+        The number of entries read at once with NumPy.
+
+    processes : int, optional (default=1)
+        The number of input files skimmed in parallel. If None then use as
+        many processes as there are CPUs.
+
+    Returns
+    -------
+
+    results : list of dict
+        The results of :func:`skim_file` for each input in order.
+
+    """
+    if isinstance(files, BaseTreeChain):
+        treename = files._name
+        files = files._files
+    elif isinstance(files, string_types):
+        files = [files]
+    expanded = []
+    for filename in files:
+        if '*' in filename or '?' in filename:
+            expanded.extend(sorted(expand_and_glob(filename)))
+        else:
+            expanded.append(filename)
+    files = expanded
+    if not files:
+        raise ValueError("no input files")
+    kwargs = dict(selection=None if selection is None else str(selection),
+                  filter=filter, filter_branches=filter_branches,
+                  branches=branches, exclude=exclude, columns=columns,
+                  max_size=max_size, chunksize=chunksize)
+    tasks = []
+    outputs = set()
+    for index, filename in enumerate(files):
+        name = os.path.splitext(os.path.basename(filename))[0]
+        outname = output.format(name=name, index=index)
+        if outname in outputs:
+            raise ValueError(
+                "output file name {0} is not unique, use the `index` "
+                "field".format(outname))
+        outputs.add(outname)
+        tasks.append((filename, treename, outname, kwargs))
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(tasks))
+    if processes <= 1:
+        return [_skim_file(task) for task in tasks]
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_skim_file, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
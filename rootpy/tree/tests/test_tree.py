@@ -3,7 +3,7 @@ import ROOT
 from rootpy.vector import LorentzVector
 from rootpy.tree import Tree, Ntuple, TreeModel, TreeChain
 from rootpy.io import root_open, TemporaryFile
-from rootpy.tree.treetypes import FloatCol, IntCol
+from rootpy.tree.treetypes import FloatCol, IntCol, BoolCol, StructColumn
 from rootpy.plotting import Hist, Hist2D, Hist3D
 from rootpy.plotting.graph import _GraphBase
 from rootpy import testdata
@@ -122,6 +122,73 @@ def test_attrs():
             assert_equal(len(event.b) > 0, True)
 
 
+@with_setup(create_tree, cleanup)
+def test_on_demand_learning():
+    with root_open(FILE_PATHS[0]) as f:
+        tree = f.tree
+        expected = [(event.a_x, event.a_y, event.i) for event in tree]
+        tree.read_branches_on_demand = True
+        tree.on_demand_learn_entries = 10
+        for event in tree:
+            i = event.i
+            assert_equal(event.a_x, expected[i][0])
+            if i >= 20:
+                # first accessed after the learning phase
+                assert_equal(event.a_y, expected[i][1])
+            elif i > 10:
+                assert_equal(tree.GetBranchStatus('a_y'), 0)
+        # the deactivated branches are activated again
+        assert_true(tree.GetBranchStatus('a_z'))
+        assert_true(tree.GetBranchStatus('a_y'))
+
+
+@with_setup(create_tree, cleanup)
+def test_selection_index():
+    try:
+        import numpy as np
+        import root_numpy
+    except ImportError:
+        raise SkipTest("root_numpy is not installed")
+    from rootpy.tree.entrylist import SelectionIndex
+    import tempfile
+    import shutil
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with root_open(FILE_PATHS[0]) as f:
+            tree = f.tree
+            tree.use_selection_index(SelectionIndex(tmpdir))
+            assert_equal(tree.GetEntries('i < 10'), 10)
+            hist = Hist(10, 0, 100)
+            tree.Draw('i', 'i < 10', hist=hist)
+            assert_equal(hist.GetEntries(), 10)
+            # the entry list is removed after drawing
+            assert_equal(tree.GetEntries(), 100)
+            selected = [event.i for event in tree.iterselected('i % 25 == 0')]
+            assert_equal(selected, [0, 25, 50, 75])
+            tree.read_branches_on_demand = True
+            assert_equal([event.i for event in tree.iterselected('i > 96')],
+                         [97, 98, 99])
+            with TemporaryFile():
+                copy = tree.CopyTree('i < 10')
+                assert_equal(copy.GetEntries(), 10)
+                # ranges are entry numbers of the tree, not of the index
+                copy = tree.CopyTree('i % 10 == 0', '', 35, 20)
+                assert_equal([event.i for event in copy], [20, 30, 40, 50])
+                copy = tree.CopyTree('i % 10 == 0', '', firstentry=75)
+                assert_equal([event.i for event in copy], [80, 90])
+            # read the stored sparse and dense indices
+            tree.GetEntries('i >= 0')
+            index = SelectionIndex(tmpdir)
+            assert_equal(list(index.entries(tree, 'i < 10')), list(range(10)))
+            assert_equal(list(index.entries(tree, 'i >= 0')),
+                         list(range(100)))
+            index.clear()
+            assert_equal(os.listdir(tmpdir), [])
+    finally:
+        shutil.rmtree(tmpdir)
+
+
 @with_setup(create_tree, cleanup)
 def test_draw():
     with root_open(FILE_PATHS[0]) as f:
@@ -207,6 +274,189 @@ def test_chain_iter():
     assert_equal(entries, 300)
     assert_equal(chain.GetEntries(), 300)
     assert_equal(chain.GetEntriesFast(), 300)
+    assert_equal(len(chain.file_stats), 6)
+    assert_equal([stats['entries'] for stats in chain.file_stats], [100] * 6)
+
+
+@with_setup(create_chain, cleanup)
+def test_chain_iterselected():
+    if sys.version_info[0] >= 3:
+        raise SkipTest("Python 3 support not implemented")
+    try:
+        import root_numpy
+    except ImportError:
+        raise SkipTest("root_numpy is not installed")
+    chain = TreeChain('tree', FILE_PATHS)
+    selected = [entry.i for entry in chain.iterselected('i % 50 == 0')]
+    assert_equal(selected, [0, 50] * 3)
+    assert_equal(len(chain.file_stats), 3)
+
+
+def _count_entries(chain):
+    return sum(1 for entry in chain)
+
+
+@with_setup(create_chain, cleanup)
+def test_queue_process():
+    if sys.version_info[0] >= 3:
+        raise SkipTest("Python 3 support not implemented")
+    import multiprocessing
+    from rootpy.tree.chain import FileWatcher, process_queue
+    files = multiprocessing.Queue()
+    watcher = FileWatcher(FILE_PATHS, files, interval=0.1, idle_timeout=0.5)
+    results, stats = process_queue(
+        'tree', files, _count_entries, workers=2, watcher=watcher)
+    assert_equal(sum(results), 300)
+    assert_equal(sorted(s['file'] for s in stats), sorted(FILE_PATHS))
+    assert_equal(sum(s['entries'] for s in stats), 300)
+    # files are only queued once
+    assert_equal(watcher.poll(), [])
+
+
+@with_setup(create_chain, cleanup)
+def test_chain_profile():
+    if sys.version_info[0] >= 3:
+        raise SkipTest("Python 3 support not implemented")
+    from rootpy.tree.filtering import EventFilter, EventFilterList
+    from rootpy.tree.instrument import LoopProfile
+
+    class Even(EventFilter):
+        def passes(self, event):
+            return event.i % 2 == 0
+
+    chain = TreeChain('tree', FILE_PATHS,
+                      filters=EventFilterList([Even()]),
+                      read_branches_on_demand=True,
+                      on_demand_learn_entries=10,
+                      profile=True)
+    passed = 0
+    for event in chain:
+        passed += 1
+    profile = chain.profile
+    assert_equal(profile.entries, 300)
+    assert_equal(profile.passed, passed)
+    assert_equal(profile.filters['Even']['calls'], 300)
+    assert_equal(profile.filters['Even']['passed'], passed)
+    # branches are read on demand in the first 10 entries of each file
+    assert_equal(profile.learn_entries, 10)
+    assert_equal(profile.branches['i']['reads'], 30)
+    assert_equal(len(profile.files), 3)
+    output = StringIO()
+    profile.save(output)
+    output.seek(0)
+    import json
+    merged = LoopProfile.from_dict(json.load(output)).merge(profile)
+    assert_equal(merged.entries, 600)
+    assert_equal(merged.filters['Even']['calls'], 600)
+    assert_equal(merged.learn_entries, 10)
+    report = StringIO()
+    profile.report(out=report)
+    assert_true('first 10 entries' in report.getvalue())
+
+
+def _odd_entries(array):
+    return array['i'] % 2 == 1
+
+
+@with_setup(create_chain, cleanup)
+def test_skim():
+    try:
+        import root_numpy
+    except ImportError:
+        raise SkipTest("root_numpy is not installed")
+    from rootpy.tree.skim import skim
+    import tempfile
+    import shutil
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        results = skim(
+            FILE_PATHS, 'tree', os.path.join(tmpdir, '{index}.root'),
+            selection='i < 50', filter=_odd_entries, filter_branches=['i'],
+            branches=['a_*', 'i'], exclude=['a_vect'],
+            columns={'two_i': 'i * 2'})
+        assert_equal(len(results), 3)
+        for result in results:
+            assert_equal(result['entries'], 100)
+            assert_equal(result['passed'], 25)
+            assert_equal(len(result['outputs']), 1)
+            with root_open(result['outputs'][0]) as f:
+                tree = f.tree
+                assert_equal(tree.GetEntries(), 25)
+                assert_true(tree.has_branch('a_x'))
+                assert_true(not tree.has_branch('a_vect'))
+                assert_true(not tree.has_branch('b_n'))
+                for event in tree:
+                    assert_equal(event.i % 2, 1)
+                    assert_equal(event.two_i, 2 * event.i)
+        # split the output into files of one entry
+        result = skim(FILE_PATHS[:1], 'tree',
+                      os.path.join(tmpdir, 'split.root'),
+                      branches=['i'], max_size=1)[0]
+        assert_equal(len(result['outputs']), 100)
+        with root_open(result['outputs'][-1]) as f:
+            assert_equal(f.tree.GetEntries(), 1)
+            for event in f.tree:
+                assert_equal(event.i, 99)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+@with_setup(create_chain, cleanup)
+def test_reduce():
+    try:
+        import numpy as np
+        import root_numpy
+    except ImportError:
+        raise SkipTest("root_numpy is not installed")
+    from rootpy.tree.reduce import count, sum, mean, min, max
+
+    chain = TreeChain('tree', FILE_PATHS)
+    results = chain.reduce({
+        'n': count('i < 10'),
+        'sumw': count('i < 3', weight='i'),
+        'sum_i': sum('i', 'i < 10'),
+        'mean_i': mean('i'),
+        'min_i': min('i', 'i > 5'),
+        'max_i': max('i'),
+        'max_b_x': max('b_x'),
+        'none': max('i', 'i < 0'),
+    }, chunksize=30)
+    assert_equal(results['n'], 30)
+    assert_equal(results['sumw'], 9)
+    assert_equal(results['sum_i'], 135)
+    assert_almost_equal(results['mean_i'], 49.5)
+    assert_equal(results['min_i'], 6)
+    assert_equal(results['max_i'], 99)
+    assert_true(1 <= results['max_b_x'] <= 10)
+    assert_true(results['none'] is None)
+    assert_equal(chain.reduce({'n': count()})['n'], 300)
+    assert_raises(TypeError, chain.reduce, {'n': 'i < 10'})
+    with root_open(FILE_PATHS[0]) as f:
+        tree = f.tree
+        a_x = tree.to_array(['a_x'])['a_x']
+        assert_almost_equal(tree.GetMaximum('a_x'), a_x.max())
+        assert_almost_equal(tree.GetMinimum('a_x', 'i < 10'),
+                            a_x[:10].min())
+        assert_raises(ValueError, tree.GetMaximum, 'a_x', 'i < 0')
+        # cuts on variable-length arrays
+        arrays = tree.to_array(['b_x', 'b_y', 'a_vect.Pt()'])
+        passed = [b_y > 0 for b_y in arrays['b_y']]
+        selected = [b_x[p] for b_x, p in zip(arrays['b_x'], passed)]
+        any_passed = np.array([p.any() for p in passed])
+        results = tree.reduce({
+            'n': count('b_y > 0'),
+            'sum_b_x': sum('b_x', 'b_y > 0'),
+            'max_pt': max('a_vect.Pt()', 'b_y > 0'),
+        })
+        assert_equal(results['n'], tree.GetEntries('b_y > 0'))
+        assert_equal(results['n'], any_passed.sum())
+        assert_equal(results['sum_b_x'],
+                     np.concatenate(selected).sum())
+        assert_almost_equal(results['max_pt'],
+                            arrays['a_vect.Pt()'][any_passed].max())
+        assert_equal(tree.GetMaximum('b_x', 'b_y > 0'),
+                     np.concatenate(selected).max())
 
 
 @with_setup(create_chain, cleanup)
@@ -313,6 +563,217 @@ def test_ntuple():
         ntuple.Write()
 
 
+def test_fill_arrays():
+    try:
+        import numpy as np
+    except ImportError:
+        raise SkipTest("numpy is not installed")
+    class Event(TreeModel):
+        x = FloatCol()
+        i = IntCol()
+
+    with TemporaryFile():
+        tree = Tree(model=Event)
+        nentries = 1000
+        arrays = {
+            'x': np.random.normal(size=nentries),
+            'i': np.arange(nentries),
+        }
+        tree.fill_arrays(arrays)
+        assert_equal(tree.GetEntries(), nentries)
+        for entry, event in enumerate(tree):
+            assert_equal(event.i, entry)
+            assert_almost_equal(event.x, arrays['x'][entry], places=5)
+        # the buffer is used again by Fill
+        tree.x = 1.5
+        tree.i = -1
+        tree.Fill()
+        tree.GetEntry(nentries)
+        assert_equal(tree.i, -1)
+
+    with TemporaryFile():
+        tree = Tree()
+        counts = np.array([0, 3, 1, 2])
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        values = np.arange(offsets[-1], dtype=np.float32)
+        tree.fill_arrays({
+            'a': np.arange(4, dtype=np.int32),
+            'fixed': np.ones((4, 3)),
+            'jagged': (values, offsets),
+        })
+        assert_true(tree.has_branch('n_jagged'))
+        assert_equal(tree.GetEntries(), 4)
+        tree.create_buffer()
+        for entry, event in enumerate(tree):
+            assert_equal(event.n_jagged, counts[entry])
+            assert_equal(list(event.jagged)[:counts[entry]],
+                         list(values[offsets[entry]:offsets[entry + 1]]))
+            assert_equal(list(event.fixed), [1, 1, 1])
+        # extend with a structured array
+        try:
+            array = tree.to_array()
+        except ImportError:
+            return
+        tree.extend(array)
+        assert_equal(tree.GetEntries(), 8)
+        assert_raises(ValueError, tree.fill_arrays,
+                      {'a': np.arange(2), 'fixed': np.ones((3, 3))})
+
+    with TemporaryFile():
+        tree = Tree()
+        nentries = 50
+        counts = np.arange(nentries) % 4
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        values = np.arange(offsets[-1], dtype=np.float32)
+        tree.fill_arrays({
+            'i': np.arange(nentries, dtype=np.int32),
+            'jagged': (values, offsets),
+        })
+        tree.create_buffer()
+        tree.read_branches_on_demand = True
+        tree.on_demand_learn_entries = 10
+        # only the array is accessed but its length is read in bulk as well
+        for entry, event in enumerate(tree):
+            assert_equal(list(event.jagged)[:counts[entry]],
+                         list(values[offsets[entry]:offsets[entry + 1]]))
+            if entry >= 10:
+                assert_true(tree.GetBranchStatus('n_jagged'))
+
+
+def test_struct_model():
+
+    class Event(TreeModel):
+        x = FloatCol(default=-1)
+        i = IntCol()
+        flag = BoolCol()
+
+    struct = Event.to_struct()
+    assert_true(struct is not None)
+    # the struct is only compiled once
+    assert_true(Event.to_struct() is struct)
+
+    with TemporaryFile():
+        tree = Tree(model=Event, struct=True)
+        assert_true(isinstance(tree._buffer['x'], StructColumn))
+        assert_equal(tree.x, -1)
+        # the mapped memory is the memory of the struct
+        column = tree._buffer['i']
+        tree.i = 7
+        assert_equal(column.struct.i, 7)
+        column.struct.i = 3
+        assert_equal(tree.i, 3)
+        for i in range(10):
+            tree.x = i * 0.5
+            tree.i = i
+            tree.flag = i % 2
+            tree.Fill(reset=True)
+        assert_equal(tree.x, -1)
+        tree.Write()
+        # read back into a struct buffer
+        tree.set_buffer(Event(struct=True))
+        for i, event in enumerate(tree):
+            assert_almost_equal(event.x, i * 0.5)
+            assert_equal(event.i, i)
+            assert_equal(bool(event.flag), bool(i % 2))
+
+
+def test_export():
+    try:
+        import numpy as np
+        import root_numpy
+    except ImportError:
+        raise SkipTest("root_numpy is not installed")
+    from rootpy.tree.export import load_columns
+    import tempfile
+    import shutil
+
+    with TemporaryFile():
+        tree = Tree()
+        counts = np.array([2, 0, 3, 1, 4])
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        values = np.arange(offsets[-1], dtype=np.float32)
+        tree.fill_arrays({
+            'a': np.arange(5, dtype=np.int32),
+            'x': np.linspace(0, 1, 5),
+            'jagged': (values, offsets),
+        })
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'columns')
+            assert_equal(tree.to_columns(path, chunksize=2), 5)
+            columns = load_columns(path)
+            assert_equal(list(columns['a']), list(range(5)))
+            assert_equal(list(columns['x']), list(np.linspace(0, 1, 5)))
+            jagged_values, jagged_offsets = columns['jagged']
+            assert_equal(list(jagged_offsets), list(offsets))
+            assert_equal(list(jagged_values), list(values))
+            # a selection and a subset of branches
+            tree.to_columns(path, branches=['a'], selection='a > 2')
+            columns = load_columns(path)
+            assert_equal(list(columns), ['a'])
+            assert_equal(list(columns['a']), [3, 4])
+        finally:
+            shutil.rmtree(tmpdir)
+        output = StringIO()
+        assert_equal(tree.to_csv(output, branches=['a', 'x'], chunksize=2,
+                                 limit=3), 3)
+        lines = output.getvalue().splitlines()
+        assert_equal(lines[0], 'a,x')
+        assert_equal(lines[1:], ['0,0', '1,0.25', '2,0.5'])
+        # variable-length branches cannot be written as CSV
+        assert_raises(TypeError, tree.to_csv, StringIO())
+
+
+def test_column_cache():
+    try:
+        import numpy as np
+        import root_numpy
+    except ImportError:
+        raise SkipTest("root_numpy is not installed")
+    from rootpy.tree.cache import ColumnCache
+    import tempfile
+    import shutil
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmpdir, 'tree.root')
+        with root_open(filename, 'recreate'):
+            tree = Tree('tree')
+            counts = np.array([2, 0, 3, 1])
+            offsets = np.concatenate(([0], np.cumsum(counts)))
+            tree.fill_arrays({
+                'a': np.arange(4, dtype=np.int32),
+                'x': np.linspace(0, 1, 4),
+                'jagged': (np.arange(offsets[-1], dtype=np.float32),
+                           offsets),
+            })
+            tree.Write()
+        cache = ColumnCache(os.path.join(tmpdir, 'cache'))
+        with root_open(filename) as f:
+            tree = f.tree
+            expected = tree.to_array()
+            tree.use_column_cache(cache)
+            for i in range(2):
+                array = tree.to_array()
+                assert_equal(array.dtype.names, expected.dtype.names)
+                for name in ('a', 'x', 'n_jagged'):
+                    assert_equal(list(array[name]), list(expected[name]))
+                for cached, value in zip(array['jagged'], expected['jagged']):
+                    assert_equal(list(cached), list(value))
+            assert_true(cache.size() > 0)
+            array = tree.to_array(['a'], selection='x > 0.5')
+            assert_equal(list(array['a']), [2, 3])
+            assert_equal(list(tree.to_array(['a'], start=1, stop=3)['a']),
+                         [1, 2])
+            cache.evict(0)
+            assert_equal(cache.size(), 0)
+            assert_equal(len(tree.to_array(['x'])), 4)
+            cache.clear()
+            assert_equal(cache.size(), 0)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule()
@@ -3,6 +3,7 @@ from __future__ import absolute_import, print_function
 import sys
 import re
 import fnmatch
+from contextlib import contextmanager
 
 try:
     from collections import OrderedDict
@@ -12,6 +13,7 @@ except ImportError: # py 2.6
 from .. import log; log = log[__name__]
 from .. import asrootpy, QROOT, ROOT
 from .. import stl
+from .. import compiled as C
 from ..extern.shortuuid import uuid
 from ..extern.six.moves import range
 from ..extern.six import string_types
@@ -24,7 +26,7 @@ from ..memory.keepalive import keepalive
 from .cut import Cut
 from .treebuffer import TreeBuffer
 from .treemodel import TreeModel
-from .treetypes import Scalar, Array, BaseChar
+from .treetypes import Scalar, Array, BaseChar, StructColumn
 from .texttree import TextTree, TextBranch
 
 
@@ -38,6 +40,103 @@ class UserData(object):
     pass
 
 
+C.register_code("""
+    #include <TTree.h>
+    #include <TBranch.h>
+    #include <TObjArray.h>
+
+    // Fill nentries entries, pointing each branch at its value for the
+    // current entry before each TTree::Fill. If offsets[b] is not null it
+    // points to the first element of each entry (variable-length arrays),
+    // otherwise entries are a fixed stride apart.
+    Long64_t rootpy_fill_arrays(TTree* tree, TObjArray* branches,
+                                const Long64_t* addresses,
+                                const Long64_t* strides,
+                                const Long64_t* offsets,
+                                Long64_t nentries) {
+        Int_t nbranches = branches->GetEntriesFast();
+        Long64_t nbytes = 0;
+        for (Long64_t i = 0; i < nentries; ++i) {
+            for (Int_t b = 0; b < nbranches; ++b) {
+                const Long64_t* boffsets =
+                    reinterpret_cast<const Long64_t*>(offsets[b]);
+                Long64_t index = boffsets ? boffsets[i] : i;
+                char* address = reinterpret_cast<char*>(
+                    addresses[b] + index * strides[b]);
+                static_cast<TBranch*>(branches->UncheckedAt(b))->SetAddress(
+                    address);
+            }
+            Int_t n = tree->Fill();
+            if (n < 0) {
+                return -1;
+            }
+            nbytes += n;
+        }
+        return nbytes;
+    }
+""", ["rootpy_fill_arrays"])
+
+# NumPy dtypes of the leaf types and the leaf type codes of NumPy dtypes
+_LEAF_DTYPES = {
+    'Bool_t': 'bool',
+    'Char_t': 'i1',
+    'UChar_t': 'u1',
+    'Short_t': 'i2',
+    'UShort_t': 'u2',
+    'Int_t': 'i4',
+    'UInt_t': 'u4',
+    'Long64_t': 'i8',
+    'ULong64_t': 'u8',
+    'Float_t': 'f4',
+    'Double_t': 'f8',
+}
+_DTYPE_CODES = {
+    'bool': 'O',
+    'int8': 'B',
+    'uint8': 'b',
+    'int16': 'S',
+    'uint16': 's',
+    'int32': 'I',
+    'uint32': 'i',
+    'int64': 'L',
+    'uint64': 'l',
+    'float32': 'F',
+    'float64': 'D',
+}
+
+
+def _branch_address(value):
+    # columns stored in a struct are not buffers themselves
+    if isinstance(value, StructColumn):
+        return value.address
+    return value
+
+
+def _jagged(value):
+    """
+    Return (values, offsets) for a variable-length column given either as
+    such a tuple or as an object array of arrays
+    """
+    import numpy as np
+    if isinstance(value, tuple):
+        values, offsets = value
+        values = np.asarray(values)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if offsets.ndim != 1 or len(offsets) == 0:
+            raise ValueError("offsets must be a 1-dimensional array")
+        if offsets[-1] > len(values) or np.any(np.diff(offsets) < 0):
+            raise ValueError("offsets are not consistent with the values")
+        return values, offsets
+    lengths = np.fromiter(map(len, value), dtype=np.int64, count=len(value))
+    offsets = np.zeros(len(value) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if len(value):
+        values = np.concatenate([np.asarray(v) for v in value])
+    else:
+        values = np.empty(0)
+    return values, offsets
+
+
 class BaseTree(NamedObject):
 
     DRAW_PATTERN = re.compile(
@@ -55,9 +154,12 @@ class BaseTree(NamedObject):
             # only set _buffer if model was not specified in the __init__
             self._buffer = TreeBuffer()
         self.read_branches_on_demand = False
+        self.on_demand_learn_entries = 100
         self._branch_cache = {}
         self._current_entry = 0
         self._always_read = []
+        self._column_cache = None
+        self._selection_index = None
         self.userdata = UserData()
         self._inited = True
 
@@ -222,7 +324,7 @@ class BaseTree(NamedObject):
                         "Attempting to create two branches "
                         "with the same name: `{0}`".format(name))
                 if isinstance(value, Scalar):
-                    self.Branch(name, value,
+                    self.Branch(name, _branch_address(value),
                         '{0}/{1}'.format(
                             name, value.type))
                 elif isinstance(value, Array):
@@ -236,7 +338,7 @@ class BaseTree(NamedObject):
             for name in branches:
                 value = treebuffer[name]
                 if self.has_branch(name):
-                    self.SetBranchAddress(name, value)
+                    self.SetBranchAddress(name, _branch_address(value))
                 elif not ignore_missing:
                     raise ValueError(
                         "Attempting to set address for "
@@ -407,6 +509,28 @@ class BaseTree(NamedObject):
         """
         Iterator over the entries in the Tree.
         """
+        return self._iter_entries(range(self.GetEntries()))
+
+    def iterselected(self, selection):
+        """
+        Iterate over the entries passing a selection. The selection is
+        evaluated once before the iteration (or looked up in the selection
+        index, see ``use_selection_index``) so only the passing entries are
+        read.
+
+        Parameters
+        ----------
+        selection : str or rootpy.tree.cut.Cut
+            The selection.
+        """
+        if self._selection_index is not None:
+            entries = self._selection_index.entries(self, selection)
+        else:
+            from .entrylist import evaluate_selection
+            entries = evaluate_selection(self, selection)
+        return self._iter_entries(entries)
+
+    def _iter_entries(self, entries):
         if not self._buffer:
             self.create_buffer()
         if self.read_branches_on_demand:
@@ -426,34 +550,88 @@ class BaseTree(NamedObject):
                 # add branches that we should always read to cache
                 self.AddBranchToCache(branch)
 
-            for i in range(self.GetEntries()):
-                # Only increment current entry.
-                # getattr on a branch will then GetEntry on only that branch
-                # see ``TreeBuffer.get_with_read_if_cached``.
-                self._current_entry = i
-                self.LoadTree(i)
-                for attr in self._always_read:
-                    # Always read branched in ``self._always_read`` since
-                    # these branches may never be getattr'd but the TreeBuffer
-                    # should always be updated to reflect their current values.
-                    # This is useful if you are iterating over an input tree
-                    # and writing to an output tree that shares the same
-                    # TreeBuffer but you don't getattr on all branches of the
-                    # input tree in the logic that determines which entries
-                    # to keep.
-                    self._branch_cache[attr].GetEntry(i)
-                self._buffer._entry.set(i)
-                yield self._buffer
-                self._buffer.next_entry()
-                self._buffer.reset_collections()
+            learn_entries = self.on_demand_learn_entries
+            bulk = False
+            try:
+                for n, i in enumerate(entries):
+                    i = int(i)
+                    # Only set the current entry.
+                    # getattr on a branch will then GetEntry on only that
+                    # branch see ``TreeBuffer.get_with_read_if_cached``.
+                    self._current_entry = i
+                    self._buffer._current_entry = i
+                    self.LoadTree(i)
+                    if bulk:
+                        # only the branches accessed so far are active
+                        super(BaseTree, self).GetEntry(i)
+                    else:
+                        for attr in self._always_read:
+                            # Always read branched in ``self._always_read``
+                            # since these branches may never be getattr'd but
+                            # the TreeBuffer should always be updated to
+                            # reflect their current values. This is useful if
+                            # you are iterating over an input tree and writing
+                            # to an output tree that shares the same
+                            # TreeBuffer but you don't getattr on all branches
+                            # of the input tree in the logic that determines
+                            # which entries to keep.
+                            self._branch_cache[attr].GetEntry(i)
+                    self._buffer._entry.set(i)
+                    yield self._buffer
+                    self._buffer.reset_collections()
+                    if learn_entries and n + 1 == learn_entries:
+                        self._read_accessed_in_bulk()
+                        bulk = True
+            finally:
+                # activate the branches that were never accessed again
+                for name in self._buffer._inactive_branches:
+                    self.SetBranchStatus(name, 1)
+                self._buffer._inactive_branches = set()
+                self._buffer._bulk_branches = None
         else:
-            for i in range(self.GetEntries()):
+            for i in entries:
+                i = int(i)
                 # Read all activated branches (can be slow!).
                 super(BaseTree, self).GetEntry(i)
                 self._buffer._entry.set(i)
                 yield self._buffer
                 self._buffer.reset_collections()
 
+    def _read_accessed_in_bulk(self):
+        """
+        End the learning phase of the on-demand iteration: deactivate the
+        branches that were never accessed and read the others with a single
+        TTree::GetEntry for each following entry, which is much cheaper than
+        a Python call per branch and entry.
+        """
+        accessed = set(self._buffer._branch_cache)
+        accessed.update(self._always_read)
+        # the counts of variable-length arrays must be read with the arrays
+        for name in list(accessed):
+            accessed.update(self._leaf_count_names(name))
+        inactive = [name for name in self.iterbranchnames()
+                    if name not in accessed and self.GetBranchStatus(name)]
+        for name in inactive:
+            self.SetBranchStatus(name, 0)
+        log.debug("reading {0:d} accessed branches in bulk and deactivating "
+                  "{1:d} other branches".format(len(accessed), len(inactive)))
+        self._buffer.read_in_bulk(accessed, inactive)
+
+    def _leaf_count_names(self, name):
+        """
+        Return the names of the branches holding the lengths of the
+        variable-length arrays in a branch
+        """
+        branch = self.GetBranch(name)
+        if not branch:
+            return []
+        names = []
+        for leaf in branch.GetListOfLeaves():
+            leaf_count = leaf.GetLeafCount()
+            if leaf_count:
+                names.append(leaf_count.GetBranch().GetName())
+        return names
+
     def __setattr__(self, attr, value):
         if '_inited' not in self.__dict__ or attr in self.__dict__:
             return super(BaseTree, self).__setattr__(attr, value)
@@ -618,7 +796,10 @@ class BaseTree(NamedObject):
             self.SetWeight(weight)
             entries = hist.Integral()
         elif cut:
-            entries = super(BaseTree, self).GetEntries(str(cut))
+            if self._selection_index is not None:
+                entries = self._selection_index.count(self, cut)
+            else:
+                entries = super(BaseTree, self).GetEntries(str(cut))
         else:
             entries = super(BaseTree, self).GetEntries()
         if weighted:
@@ -627,9 +808,22 @@ class BaseTree(NamedObject):
 
     def GetMaximum(self, expression, cut=None):
         """
-        TODO: we need a better way of determining the maximum value of an
-        expression.
+        Return the maximum value of an expression over the entries passing a
+        cut. All entries are read in chunks with root_numpy if it is
+        available. Otherwise only the first 10000 selected values are used.
+        Raise a ValueError if no entries pass the cut.
         """
+        try:
+            import root_numpy
+        except ImportError:
+            pass
+        else:
+            from .reduce import Max
+            maximum = self.reduce(
+                {'max': Max(expression, cut=cut)})['max']
+            if maximum is None:
+                raise ValueError("no entries pass the cut")
+            return maximum
         if cut:
             self.Draw(expression, cut, 'goff')
         else:
@@ -641,9 +835,22 @@ class BaseTree(NamedObject):
 
     def GetMinimum(self, expression, cut=None):
         """
-        TODO: we need a better way of determining the minimum value of an
-        expression.
+        Return the minimum value of an expression over the entries passing a
+        cut. All entries are read in chunks with root_numpy if it is
+        available. Otherwise only the first 10000 selected values are used.
+        Raise a ValueError if no entries pass the cut.
         """
+        try:
+            import root_numpy
+        except ImportError:
+            pass
+        else:
+            from .reduce import Min
+            minimum = self.reduce(
+                {'min': Min(expression, cut=cut)})['min']
+            if minimum is None:
+                raise ValueError("no entries pass the cut")
+            return minimum
         if cut:
             self.Draw(expression, cut, "goff")
         else:
@@ -653,12 +860,70 @@ class BaseTree(NamedObject):
         vals = [vals[i] for i in range(min(n, 10000))]
         return min(vals)
 
-    def CopyTree(self, selection, *args, **kwargs):
+    def CopyTree(self, selection, option='', nentries=None, firstentry=0):
         """
         Copy the tree while supporting a rootpy.tree.cut.Cut selection in
-        addition to a simple string.
+        addition to a simple string. ``nentries`` and ``firstentry`` are
+        entry numbers of this tree, also when the indexed entries of the
+        selection are copied (see ``use_selection_index``).
+        """
+        with self._indexed(selection) as entries:
+            if nentries is None and not firstentry:
+                return super(BaseTree, self).CopyTree(str(selection), option)
+            if entries is None:
+                if nentries is None:
+                    nentries = max(self.GetEntries() - firstentry, 0)
+            else:
+                # the positions of the range of entries in the entry list
+                import numpy as np
+                start = int(np.searchsorted(entries, firstentry))
+                if nentries is None:
+                    stop = len(entries)
+                else:
+                    stop = int(np.searchsorted(entries, firstentry + nentries))
+                nentries, firstentry = stop - start, start
+            return super(BaseTree, self).CopyTree(
+                str(selection), option, nentries, firstentry)
+
+    def use_selection_index(self, index=True):
+        """
+        Look up the entries passing selections in an index instead of
+        evaluating the selections over all entries in ``Draw``, ``CopyTree``,
+        ``GetEntries(cut)`` and ``iterselected``.
+
+        Parameters
+        ----------
+
+        index : SelectionIndex or bool, optional (default=True)
+            The :class:`rootpy.tree.entrylist.SelectionIndex` to use. If True
+            then an index in the rootpy user data directory is used and if
+            False or None then the index is disabled.
+
+        """
+        if index is True:
+            from .entrylist import SelectionIndex
+            index = SelectionIndex()
+        elif index is False:
+            index = None
+        self._selection_index = index
+
+    @contextmanager
+    def _indexed(self, selection):
         """
-        return super(BaseTree, self).CopyTree(str(selection), *args, **kwargs)
+        Restrict this tree to the indexed entries passing a selection and
+        yield their entry numbers, or None if the selection is not indexed
+        """
+        index = self._selection_index
+        if (index is None or not str(selection) or self.GetEntryList() or
+                index.key(self, selection) is None):
+            yield None
+            return
+        entries = index.entries(self, selection)
+        self.SetEntryList(index.entrylist(self, selection))
+        try:
+            yield entries
+        finally:
+            self.SetEntryList(None)
 
     def reset_branch_values(self):
         """
@@ -814,7 +1079,8 @@ class BaseTree(NamedObject):
             else:
                 context = do_nothing()
             with context:
-                super(BaseTree, self).Draw(expression, selection, options)
+                with self._indexed(selection):
+                    super(BaseTree, self).Draw(expression, selection, options)
 
         if hist is None:
             # Retrieve histogram made by TTree.Draw
@@ -855,13 +1121,70 @@ class BaseTree(NamedObject):
                 pad.Update()
         return hist
 
+    def use_column_cache(self, cache=True):
+        """
+        Read the branches of this tree through a column cache in
+        ``to_array``. Branches are decompressed once and later read from
+        memory-mapped files.
+
+        Parameters
+        ----------
+
+        cache : ColumnCache or bool, optional (default=True)
+            The :class:`rootpy.tree.cache.ColumnCache` to use. If True then a
+            cache in the rootpy user data directory is used and if False or
+            None then the cache is disabled.
+
+        """
+        if cache is True:
+            from .cache import ColumnCache
+            cache = ColumnCache()
+        elif cache is False:
+            cache = None
+        self._column_cache = cache
+
     def to_array(self, *args, **kwargs):
         """
         Convert this tree into a NumPy structured array
         """
+        if self._column_cache is not None:
+            return self._column_cache.to_array(self, *args, **kwargs)
         from root_numpy import tree2array
         return tree2array(self, *args, **kwargs)
 
+    def to_csv(self, stream=None, **kwargs):
+        """
+        Write this tree as CSV, reading it in chunks of entries. This is much
+        faster than ``csv`` for large trees. See
+        :func:`rootpy.tree.export.export_csv` for the arguments.
+        """
+        from .export import export_csv
+        return export_csv(self, stream, **kwargs)
+
+    def to_columns(self, path, **kwargs):
+        """
+        Write this tree as a directory of memory-mappable ``.npy`` files, one
+        per branch. See :func:`rootpy.tree.export.export_columns` for the
+        arguments.
+        """
+        from .export import export_columns
+        return export_columns(self, path, **kwargs)
+
+    def reduce(self, reductions, **kwargs):
+        """
+        Compute several counts, sums, means, minima and maxima of this tree
+        in a single pass over its entries, e.g.::
+
+            from rootpy.tree.reduce import Count, Sum, Max
+            tree.reduce({'n': Count('pt > 20'),
+                         'sumw': Sum('weight', 'pt > 20'),
+                         'max_pt': Max('pt')})
+
+        See :func:`rootpy.tree.reduce.reduce` for the arguments.
+        """
+        from .reduce import reduce
+        return reduce(self, reductions, **kwargs)
+
 
 @snake_case_methods
 class Tree(BaseTree, QROOT.TTree):
@@ -880,17 +1203,21 @@ class Tree(BaseTree, QROOT.TTree):
 
     model : TreeModel, optional (default=None)
         If specified then this TreeModel will be used to create the branches
+
+    struct : bool, optional (default=False)
+        If True then the scalar columns of the model are stored in a single
+        compiled struct instead of separate arrays (see ``TreeModel``).
     """
     _ROOT = QROOT.TTree
 
     @method_file_check
-    def __init__(self, name=None, title=None, model=None):
+    def __init__(self, name=None, title=None, model=None, struct=False):
         super(Tree, self).__init__(name=name, title=title)
         self._buffer = TreeBuffer()
         if model is not None:
             if not issubclass(model, TreeModel):
                 raise TypeError("the model must subclass TreeModel")
-            self.set_buffer(model(), create_branches=True)
+            self.set_buffer(model(struct=struct), create_branches=True)
         self._post_init()
 
     def Fill(self, reset=False):
@@ -908,6 +1235,176 @@ class Tree(BaseTree, QROOT.TTree):
         if reset:
             self._buffer.reset()
 
+    def fill_arrays(self, arrays, length_names=None):
+        """
+        Fill many entries at once from NumPy arrays
+
+        The branch addresses are pointed at the rows of the arrays by a
+        compiled loop that calls TTree::Fill for each entry, so no Python
+        code runs per entry.
+
+        Parameters
+        ----------
+        arrays : dict
+            A dict mapping branch names to arrays with one row per entry.
+            Arrays of shape (N,) fill scalar branches and arrays of shape
+            (N, k) fill fixed-length array branches. Variable-length arrays
+            are given either as a tuple ``(values, offsets)``, where the
+            values of entry ``i`` are ``values[offsets[i]:offsets[i + 1]]``,
+            or as an object array of arrays. Missing branches are created
+            with a type matching the array. Branches of the tree that are
+            not in ``arrays`` are filled with the current values in the
+            buffer.
+
+        length_names : dict, optional (default=None)
+            The names of the branches holding the lengths of new
+            variable-length arrays. The default for a branch ``x`` is
+            ``n_x``. The length branches are filled automatically.
+
+        Returns
+        -------
+        nbytes : int
+            The number of bytes written, as returned by TTree::Fill.
+        """
+        import numpy as np
+        if length_names is None:
+            length_names = {}
+        columns = OrderedDict()
+        lengths = OrderedDict()
+        nentries = None
+        for name, value in arrays.items():
+            offsets = None
+            if isinstance(value, tuple) or (
+                    isinstance(value, np.ndarray) and value.dtype == object):
+                value, offsets = _jagged(value)
+                size = len(offsets) - 1
+            else:
+                value = np.asarray(value)
+                if value.ndim not in (1, 2):
+                    raise ValueError(
+                        "array for branch `{0}` must be 1 or "
+                        "2-dimensional".format(name))
+                size = len(value)
+            if nentries is None:
+                nentries = size
+            elif size != nentries:
+                raise ValueError(
+                    "array for branch `{0}` has {1:d} entries but "
+                    "expected {2:d}".format(name, size, nentries))
+            columns[name] = (value, offsets)
+        if nentries is None:
+            return 0
+        # create missing branches and find the length branches
+        for name, (value, offsets) in columns.items():
+            branch = self.GetBranch(name)
+            if offsets is not None:
+                if branch:
+                    leaf_count = branch.GetLeaf(name).GetLeafCount()
+                    if not leaf_count:
+                        raise TypeError(
+                            "branch `{0}` is not a variable-length "
+                            "array".format(name))
+                    length_name = leaf_count.GetBranch().GetName()
+                else:
+                    length_name = length_names.get(name, 'n_' + name)
+                counts = np.diff(offsets)
+                if length_name in lengths:
+                    if not np.array_equal(lengths[length_name], counts):
+                        raise ValueError(
+                            "arrays sharing the length branch `{0}` have "
+                            "different lengths".format(length_name))
+                else:
+                    lengths[length_name] = counts
+                    if not self.GetBranch(length_name):
+                        self.Branch(length_name, np.zeros(1, dtype=np.int32),
+                                    '{0}/I'.format(length_name)).ResetAddress()
+            if branch:
+                continue
+            code = _DTYPE_CODES.get(value.dtype.name)
+            if code is None:
+                raise TypeError(
+                    "array for branch `{0}` has unsupported dtype "
+                    "`{1}`".format(name, value.dtype))
+            if offsets is not None:
+                leaflist = '{0}[{1}]/{2}'.format(
+                    name, length_names.get(name, 'n_' + name), code)
+            elif value.ndim == 2:
+                leaflist = '{0}[{1:d}]/{2}'.format(
+                    name, value.shape[1], code)
+            else:
+                leaflist = '{0}/{1}'.format(name, code)
+            # the address is set for each entry when filling
+            self.Branch(name, np.zeros(max(value[:1].size, 1),
+                                       dtype=value.dtype),
+                        leaflist).ResetAddress()
+        for length_name, counts in lengths.items():
+            if length_name in columns:
+                if not np.array_equal(columns[length_name][0], counts):
+                    raise ValueError(
+                        "the values of branch `{0}` do not match the lengths "
+                        "of the arrays".format(length_name))
+                del columns[length_name]
+            columns[length_name] = (counts, None)
+        # convert to the leaf types and collect the addresses
+        branches = ROOT.TObjArray()
+        keep = []
+        addresses = np.empty(len(columns), dtype=np.int64)
+        strides = np.empty(len(columns), dtype=np.int64)
+        offsets_addresses = np.zeros(len(columns), dtype=np.int64)
+        for i, (name, (value, offsets)) in enumerate(columns.items()):
+            branch = self.GetBranch(name)
+            leaf = branch.GetLeaf(name)
+            dtype = _LEAF_DTYPES.get(leaf.GetTypeName())
+            if dtype is None:
+                raise TypeError(
+                    "branch `{0}` of type `{1}` cannot be filled from an "
+                    "array".format(name, leaf.GetTypeName()))
+            value = np.ascontiguousarray(value, dtype=dtype)
+            if offsets is None:
+                if value.ndim == 2 and value.shape[1] != leaf.GetLen():
+                    raise ValueError(
+                        "branch `{0}` holds {1:d} values per entry but the "
+                        "array has {2:d}".format(
+                            name, leaf.GetLen(), value.shape[1]))
+                strides[i] = value.strides[0]
+            else:
+                strides[i] = value.itemsize
+                offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+                offsets_addresses[i] = offsets.ctypes.data
+                keep.append(offsets)
+            if not len(value):
+                # never dereferenced but must be a valid address
+                value = np.zeros(1, dtype=dtype)
+            addresses[i] = value.ctypes.data
+            keep.append(value)
+            branches.Add(branch)
+        try:
+            nbytes = C.rootpy_fill_arrays(
+                self, branches, addresses, strides, offsets_addresses,
+                nentries)
+        finally:
+            # do not leave any branch pointing at the arrays
+            for name in columns:
+                if name in self._buffer:
+                    self.SetBranchAddress(
+                        name, _branch_address(self._buffer[name]))
+                else:
+                    self.GetBranch(name).ResetAddress()
+        if nbytes < 0:
+            raise IOError("failed to fill tree `{0}`".format(self.GetName()))
+        return nbytes
+
+    def extend(self, array, length_names=None):
+        """
+        Fill many entries at once from a NumPy structured array, such as
+        those returned by ``to_array``. Subarray fields fill fixed-length
+        array branches and fields of object arrays fill variable-length
+        array branches. See ``fill_arrays``.
+        """
+        arrays = OrderedDict(
+            (name, array[name]) for name in array.dtype.names)
+        return self.fill_arrays(arrays, length_names=length_names)
+
 
 @snake_case_methods
 class Ntuple(BaseTree, QROOT.TNtuple):
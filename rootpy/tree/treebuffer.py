@@ -36,13 +36,20 @@ class TreeBuffer(OrderedDict):
                  ignore_unsupported=False):
         super(TreeBuffer, self).__init__()
         self._fixed_names = {}
+        # maps branch names to [branch, entry last read]
         self._branch_cache = {}
-        self._branch_cache_event = {}
+        # branches read by TTree::GetEntry after the learning phase
+        self._bulk_branches = None
+        self._inactive_branches = set()
+        # a LoopProfile timing the branches read on demand
+        self._profile = None
         self._tree = tree
         self._ignore_unsupported = ignore_unsupported
         self._current_entry = 0
         self._collections = {}
         self._objects = []
+        # scalar columns stored in a struct by column name
+        self._struct_members = {}
         self._entry = Int(0)
         self.__process(branches)
         self._inited = True
@@ -140,40 +147,78 @@ class TreeBuffer(OrderedDict):
                 raise TypeError(
                     "cannot reset object of type `{0}`".format(type(value)))
 
+    def add_struct_member(self, name, column):
+        """
+        Access the StructColumn ``name`` directly on attribute access
+        """
+        self._struct_members[name] = column
+
     def update(self, branches=None):
         if isinstance(branches, TreeBuffer):
             self._entry = branches._entry
             for name, value in branches.items():
                 super(TreeBuffer, self).__setitem__(name, value)
             self._fixed_names.update(branches._fixed_names)
+            self._struct_members.update(
+                (name, column)
+                for name, column in branches._struct_members.items()
+                if name in branches)
         else:
             self.__process(branches)
 
     def set_tree(self, tree=None):
         self._branch_cache = {}
-        self._branch_cache_event = {}
+        self._bulk_branches = None
+        self._inactive_branches = set()
+        # a LoopProfile timing the branches read on demand
+        self._profile = None
         self._tree = tree
         self._current_entry = 0
 
     def next_entry(self):
-        super(TreeBuffer, self).__setattr__('_branch_cache_event', {})
         self._current_entry += 1
 
+    def read_in_bulk(self, branches, inactive):
+        """
+        Stop reading ``branches`` on demand since they are now read for each
+        entry by TTree::GetEntry. ``inactive`` are the branches that were
+        deactivated since they were never accessed. Such a branch is
+        activated again when it is first accessed.
+        """
+        self._bulk_branches = set(branches)
+        self._inactive_branches = set(inactive)
+
     def get_with_read_if_cached(self, attr):
         if self._tree is not None:
-            try:
-                branch = self._branch_cache[attr]
-            except KeyError:
-                # branch is being accessed for the first time
-                branch = self._tree.GetBranch(attr)
-                if not branch:
-                    raise AttributeError
-                self._branch_cache[attr] = branch
-                self._tree.AddBranchToCache(branch)
-            if branch not in self._branch_cache_event:
-                # branch is being accessed for the first time in this entry
-                branch.GetEntry(self._current_entry)
-                self._branch_cache_event[branch] = None
+            bulk = self._bulk_branches
+            if bulk is None or attr not in bulk:
+                try:
+                    slot = self._branch_cache[attr]
+                except KeyError:
+                    # branch is being accessed for the first time
+                    branch = self._tree.GetBranch(attr)
+                    if not branch:
+                        raise AttributeError
+                    slot = self._branch_cache[attr] = [branch, -1]
+                    self._tree.AddBranchToCache(branch)
+                    if attr in self._inactive_branches:
+                        # read by TTree::GetEntry from the next entry on
+                        # together with the lengths of its arrays
+                        for name in ([attr] +
+                                     self._tree._leaf_count_names(attr)):
+                            if name in self._inactive_branches:
+                                self._inactive_branches.discard(name)
+                                self._tree.SetBranchStatus(name, 1)
+                                bulk.add(name)
+                if slot[1] != self._current_entry:
+                    # branch is being accessed for the first time in this
+                    # entry
+                    if self._profile is None:
+                        slot[0].GetEntry(self._current_entry)
+                    else:
+                        self._profile.read_branch(
+                            slot[0], self._current_entry)
+                    slot[1] = self._current_entry
         return super(TreeBuffer, self).__getitem__(attr)
 
     def __setitem__(self, name, value):
@@ -197,6 +242,10 @@ class TreeBuffer(OrderedDict):
         # any normal attributes are handled normally
         if '_inited' not in self.__dict__ or attr in self.__dict__:
             return super(TreeBuffer, self).__setattr__(attr, value)
+        name = self._fixed_names.get(attr, attr)
+        if name in self._struct_members:
+            self._struct_members[name].set(value)
+            return
         elif attr in self:
             variable = self.get_with_read_if_cached(attr)
             if isinstance(variable, (Scalar, Array)):
@@ -223,6 +272,9 @@ class TreeBuffer(OrderedDict):
                     self.__class__.__name__, attr))
         if attr in self._fixed_names:
             attr = self._fixed_names[attr]
+        if attr in self._struct_members and self._tree is None:
+            # read the struct member directly
+            return self._struct_members[attr].value
         try:
             variable = self.get_with_read_if_cached(attr)
             if isinstance(variable, Scalar):
@@ -2,6 +2,7 @@ from __future__ import absolute_import, print_function
 
 import sys
 import inspect
+import hashlib
 import types
 if sys.version_info[0] < 3:
     from cStringIO import StringIO
@@ -11,7 +12,7 @@ else:
 import ROOT
 
 from .. import log; log = log[__name__]
-from .treetypes import Column
+from .treetypes import Column, BaseScalar, StructColumn, struct_memory
 from .treebuffer import TreeBuffer
 
 __all__ = [
@@ -121,19 +122,28 @@ class TreeModelMeta(type):
 
     def to_struct(cls, name=None):
         """
-        Convert the TreeModel into a compiled C struct
+        Convert the scalar columns of the TreeModel into a compiled C struct
+        and return the struct class or None if there are no scalar columns
+        or the compilation failed. Unless a name is given, the struct name is
+        unique for the names and types of the columns.
         """
-        if name is None:
-            name = cls.__name__
-        basic_attrs = dict([(attr_name, value)
-                            for attr_name, value in cls.get_attrs()
-                            if isinstance(value, Column)])
+        basic_attrs = [(attr_name, value)
+                       for attr_name, value in cls.get_attrs()
+                       if isinstance(value, Column) and
+                       issubclass(value.type, BaseScalar)]
         if not basic_attrs:
             return None
-        src = 'struct {0} {{'.format(name)
-        for attr_name, value in basic_attrs.items():
-            src += '{0} {1};'.format(value.type.typename, attr_name)
-        src += '};'
+        members = ''.join(
+            '{0} {1};'.format(value.type.typename, attr_name)
+            for attr_name, value in basic_attrs)
+        if name is None:
+            name = '{0}_{1}'.format(
+                cls.__name__,
+                hashlib.sha1(members.encode('utf-8')).hexdigest()[:8])
+        struct = getattr(ROOT, name, None)
+        if struct is not None:
+            return struct
+        src = 'struct {0} {{{1}}};'.format(name, members)
         if ROOT.gROOT.ProcessLine(src) != 0:
             return None
         return getattr(ROOT, name, None)
@@ -149,13 +159,34 @@ class TreeModelMeta(type):
 
 
 # TreeModel.__new__
-def __new__(cls):
+def __new__(cls, struct=False):
     """
     Return a TreeBuffer for this TreeModel
+
+    If ``struct`` is True then all scalar columns are stored in a single
+    compiled struct (see ``to_struct``) instead of separate arrays. The
+    branch addresses point into the struct, so the values of an entry are
+    contiguous in memory, and attribute access on the TreeBuffer reads and
+    writes the mapped memory of the struct members directly.
     """
     treebuffer = TreeBuffer()
+    instance = None
+    if struct:
+        struct_cls = cls.to_struct()
+        if struct_cls is None:
+            log.warning(
+                "unable to compile a struct for {0}; "
+                "using separate columns".format(cls.__name__))
+        else:
+            instance = struct_cls()
+            memory = struct_memory(instance)
     for name, attr in cls.get_attrs():
-        treebuffer[name] = attr()
+        value = attr()
+        if (instance is not None and isinstance(attr, Column) and
+                isinstance(value, BaseScalar)):
+            value = StructColumn(instance, name, value, memory)
+            treebuffer.add_struct_member(name, value)
+        treebuffer[name] = value
     return treebuffer
 
 
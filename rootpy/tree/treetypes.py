@@ -3,12 +3,15 @@ Wrappers for basic types that are compatible with ROOT TTrees
 """
 from __future__ import absolute_import
 
+import ctypes
 import itertools
 from array import array
 import sys
 if sys.version_info[0] >= 3:
     long = int
 
+import ROOT
+
 from ..extern.six.moves import range
 from .. import register
 
@@ -189,6 +192,79 @@ class BaseScalar(Scalar, array):
         return other / self.value
 
 
+# the ctypes of the members of structs holding scalar columns
+_STRUCT_CTYPES = {
+    'Bool_t': ctypes.c_bool,
+    'Char_t': ctypes.c_byte,
+    'UChar_t': ctypes.c_ubyte,
+    'Short_t': ctypes.c_short,
+    'UShort_t': ctypes.c_ushort,
+    'Int_t': ctypes.c_int,
+    'UInt_t': ctypes.c_uint,
+    'Long64_t': ctypes.c_longlong,
+    'ULong64_t': ctypes.c_ulonglong,
+    'Float_t': ctypes.c_float,
+    'Double_t': ctypes.c_double,
+}
+
+
+def struct_memory(struct):
+    """
+    Map the memory of an instance of a compiled struct as a ctypes char
+    array. The array does not keep the struct alive.
+    """
+    cls = ROOT.TClass.GetClass(struct.__class__.__name__)
+    address = ROOT.AddressOf(struct)[0]
+    return (ctypes.c_char * cls.Size()).from_address(address)
+
+
+class StructColumn(Scalar):
+    """
+    A scalar stored as a member of a compiled struct that holds all scalar
+    columns of a TreeModel (see ``TreeModel(struct=True)``). The branch
+    address points at the member of the struct. The value is read and
+    written through a ctypes view of the member in the mapped memory of the
+    struct (see ``struct_memory``) instead of the PyROOT proxy.
+    """
+    def __init__(self, struct, name, scalar, memory=None):
+        if memory is None:
+            memory = struct_memory(struct)
+        self.struct = struct
+        self.name = name
+        self.type = scalar.type
+        self.typename = scalar.typename
+        self.convert = scalar.convert
+        self.default = scalar.default
+        self.resetable = scalar.resetable
+        self.address = ROOT.AddressOf(struct, name)
+        offset = ROOT.TClass.GetClass(
+            struct.__class__.__name__).GetDataMemberOffset(name)
+        self._member = _STRUCT_CTYPES[self.typename].from_buffer(
+            memory, offset)
+        self.set(self.default)
+
+    @property
+    def value(self):
+        """The current value"""
+        return self._member.value
+
+    def set(self, value):
+        """Set the value"""
+        if isinstance(value, Scalar):
+            value = value.value
+        self._member.value = self.convert(value)
+
+    def reset(self):
+        """Reset the value to the default"""
+        if self.resetable:
+            self.set(self.default)
+
+    def __repr__(self):
+        return "{0}({1}, {2}) at {3}".format(
+            self.__class__.__name__, self.typename, repr(self.value),
+            hex(id(self)))
+
+
 class Array(object):
 
     def __init__(self, resetable=True, length_name=None):
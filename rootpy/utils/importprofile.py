@@ -0,0 +1,176 @@
+"""
+Measure the time spent importing modules and running rootpy's class
+decorators.
+
+This file is executed as a script in a fresh interpreter by
+``rootpy import-profile`` so that nothing is imported before the
+measurement starts. It must therefore not import rootpy at module level.
+"""
+from __future__ import absolute_import, print_function
+
+import sys
+import json
+import time
+
+try:
+    import builtins
+except ImportError:  # will be 2.x series
+    import __builtin__ as builtins
+
+__all__ = [
+    'profile_imports',
+    'print_profile',
+]
+
+# (module, attribute) of the decorators and registration functions that are
+# timed. An attribute of the form "Class.method" times a method.
+DECORATORS = [
+    ('rootpy.decorators', 'snake_case_methods'),
+    ('rootpy.decorators', 'resolve_snake_case_methods'),
+    ('rootpy', 'register.__call__'),
+    ('rootpy.utils.hook', 'classhook'),
+]
+
+
+def _timed(func, name, stats):
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            entry = stats.setdefault(name, [0, 0.])
+            entry[0] += 1
+            entry[1] += time.time() - start
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def _patch_decorator(module, attr, stats):
+    obj_name, _, method = attr.partition('.')
+    name = '{0}.{1}'.format(module.__name__, attr)
+    if method:
+        owner = getattr(module, obj_name, None)
+        func = owner and owner.__dict__.get(method)
+        if func is not None:
+            setattr(owner, method, _timed(func, name, stats))
+    else:
+        func = getattr(module, obj_name, None)
+        if func is not None:
+            setattr(module, obj_name, _timed(func, name, stats))
+
+
+def _absolute_name(name, globals, level):
+    if level == 0 or not globals:
+        return name
+    package = globals.get('__package__') or globals.get('__name__', '')
+    base = package.rsplit('.', level - 1)[0]
+    return '{0}.{1}'.format(base, name) if name else base
+
+
+def profile_imports(modules):
+    """
+    Import ``modules`` and return the time spent importing each module that
+    was imported as a consequence and in each of the timed decorators.
+
+    Returns
+    -------
+
+    profile : dict
+        ``modules`` maps module names to ``[cumulative seconds, self
+        seconds]`` and ``decorators`` maps decorator names to
+        ``[calls, seconds]``. ``total`` is the total time in seconds.
+
+    """
+    module_stats = {}
+    decorator_stats = {}
+    pending = {}
+    for module, attr in DECORATORS:
+        pending.setdefault(module, []).append(attr)
+    # the import time of the children of each module being imported
+    stack = []
+    orig_import = builtins.__import__
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name in sys.modules:
+            return orig_import(name, globals, locals, fromlist, level)
+        before = set(sys.modules)
+        stack.append(0.)
+        start = time.time()
+        try:
+            return orig_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.time() - start
+            children = stack.pop()
+            new = set(sys.modules) - before
+            if new:
+                # attribute the time to the requested module or else to the
+                # outermost new module
+                full_name = _absolute_name(name, globals, level)
+                requested = [module_name for module_name in new
+                             if module_name == full_name or
+                             module_name.startswith(full_name + '.')]
+                name = min(requested or new, key=len)
+                module_stats[name] = [elapsed, elapsed - children]
+                if stack:
+                    stack[-1] += elapsed
+                for module_name in new & set(pending):
+                    for attr in pending.pop(module_name):
+                        _patch_decorator(sys.modules[module_name], attr,
+                                         decorator_stats)
+            elif stack:
+                stack[-1] += elapsed
+
+    builtins.__import__ = timed_import
+    start = time.time()
+    try:
+        for module in modules:
+            __import__(module)
+    finally:
+        builtins.__import__ = orig_import
+    return dict(total=time.time() - start,
+                modules=module_stats,
+                decorators=decorator_stats)
+
+
+def print_profile(profile, sort='self', limit=30, out=None):
+    """
+    Print the result of :func:`profile_imports` as tables.
+    """
+    out = out or sys.stdout
+    column = 1 if sort == 'self' else 0
+    rows = sorted(profile['modules'].items(),
+                  key=lambda item: item[1][column], reverse=True)
+    if limit:
+        rows = rows[:limit]
+    print("total import time: {0:.3f} s".format(profile['total']), file=out)
+    print("", file=out)
+    print("{0:>10} {1:>10}  {2}".format("cumul [s]", "self [s]", "module"),
+          file=out)
+    for name, (cumulative, self_time) in rows:
+        print("{0:10.4f} {1:10.4f}  {2}".format(
+            cumulative, self_time, name), file=out)
+    if profile['decorators']:
+        print("", file=out)
+        print("{0:>10} {1:>10}  {2}".format("calls", "time [s]", "decorator"),
+              file=out)
+        rows = sorted(profile['decorators'].items(),
+                      key=lambda item: item[1][1], reverse=True)
+        for name, (calls, seconds) in rows:
+            print("{0:10d} {1:10.4f}  {2}".format(calls, seconds, name),
+                  file=out)
+
+
+if __name__ == '__main__':
+    # usage: importprofile.py [--json] module [module ...]
+    args = sys.argv[1:]
+    as_json = '--json' in args
+    if as_json:
+        args.remove('--json')
+    # do not let the directory of this file shadow top-level modules
+    sys.path.pop(0)
+    result = profile_imports(args or ['rootpy'])
+    if as_json:
+        json.dump(result, sys.stdout)
+    else:
+        print_profile(result)
@@ -47,6 +47,9 @@ SYMBOLS_TO_LIB = dict(
 # If you encounter problems with particular symbols, add them to this set.
 SLOW = set("".split())
 
+# Libraries known to be loaded, to avoid querying gSystem on every lookup
+LOADED_LIBS = set()
+
 
 @Facade(__name__, expose_internal=False)
 class QuickROOT(object):
@@ -56,7 +59,7 @@ class QuickROOT(object):
                 "Tried to quickly load {0} which is always slow".format(symbol))
 
         lib = SYMBOLS_TO_LIB.get(symbol, None)
-        if lib:
+        if lib and lib not in LOADED_LIBS:
             # Load() doesn't cost anything if the library is already loaded
             libname = "lib{0}".format(lib)
             if libname not in _gSystem.GetLibraries():
@@ -75,6 +78,7 @@ class QuickROOT(object):
                         raise RuntimeError(
                             "Unable to load {0} (required by {1})".format(
                                 libname, symbol))
+            LOADED_LIBS.add(lib)
 
         try:
             thing = Quick(symbol)
@@ -0,0 +1,24 @@
+import sys
+import json
+import subprocess
+from os.path import splitext
+
+from rootpy.utils import importprofile
+from nose.tools import assert_true
+
+
+def test_import_profile():
+    # run in a fresh interpreter where the module is not yet imported
+    script = splitext(importprofile.__file__)[0] + '.py'
+    output = subprocess.check_output(
+        [sys.executable, script, '--json', 'xml.dom.minidom'])
+    profile = json.loads(output.decode('utf-8'))
+    assert_true('xml.dom.minidom' in profile['modules'])
+    for cumulative, self_time in profile['modules'].values():
+        assert_true(cumulative >= self_time >= 0)
+    assert_true(profile['total'] > 0)
+
+
+if __name__ == "__main__":
+    import nose
+    nose.runmodule()